@@ -1,27 +1,29 @@
-import requests
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+import sys
+from pathlib import Path
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.embedding import EmbeddingClient
+from common.embed_cache import EmbeddingCache
+from common.ingest import IncrementalIndexer
+from common.local_store import make_client
+from common.metrics import METRICS, multi_metric_config, query_all_metrics, vector_name
 
 # --- 1. 初始化連線 ---
 print(">>> 正在連接到 Qdrant 伺服器...")
-client = QdrantClient(url="http://localhost:6333")
+client = make_client("http://localhost:6333")  # RAG_VECTOR_BACKEND=local 時改用本機 NumPy 後端
 
 # --- 2. Embedding 函數化 ---
+embedder = EmbeddingClient(batch_size=32, cache=EmbeddingCache())
+
 def get_embedding(text_list):
     """
-    將文字列表轉換為向量列表
+    將文字列表轉換為向量列表 (共用連線池 + 微批次)
     """
-    url = "https://ws-04.wade0426.me/embed"
-    data = {
-        "texts": text_list,
-        "normalize": True,
-        "batch_size": 32
-    }
-    response = requests.post(url, json=data)
-    if response.status_code == 200:
-        return response.json()['embeddings']
-    else:
-        print(f"!!! API 請求失敗：{response.status_code}")
+    try:
+        return embedder.embed(text_list)
+    except Exception as e:
+        print(f"!!! API 請求失敗：{e}")
         return None
 
 # --- 3. 動態計算維度 (不寫死) ---
@@ -34,12 +36,9 @@ else:
     raise Exception("無法取得測試向量，請檢查 API 連線。")
 
 # --- 4. 準備 Collection 與資料度量 ---
-# 定義三種度量方式
-metrics = {
-    "Cosine": Distance.COSINE,
-    "Dot": Distance.DOT,
-    "Euclidean": Distance.EUCLID
-}
+# 定義三種度量方式 (同一個 collection 內以 named vectors 區分)
+metrics = METRICS
+col_name = "collection_multi_metric"
 
 data_source = [
     {"text": "人工智慧很有趣", "category": "AI"},
@@ -49,32 +48,21 @@ data_source = [
     {"text": "Python 是開發 AI 的首選語言", "category": "Programming"}
 ]
 
-# 批次取得所有資料的向量
 all_texts = [item["text"] for item in data_source]
-all_embeddings = get_embedding(all_texts)
 
-# --- 5. 批次建立與上傳 ---
-for name, dist_type in metrics.items():
-    col_name = f"collection_{name.lower()}"
-    
-    # 建立/重置 Collection
-    if client.collection_exists(col_name):
-        client.delete_collection(col_name)
-    
-    print(f">>> 建立 Collection: {col_name} (度量: {name}, 維度: {dynamic_size})")
-    client.create_collection(
-        collection_name=col_name,
-        vectors_config=VectorParams(size=dynamic_size, distance=dist_type),
-    )
-    
-    # 批次封裝 (Batching)
-    points = [
-        PointStruct(id=i+1, vector=all_embeddings[i], payload=data_source[i])
-        for i in range(len(data_source))
-    ]
-    
-    # 單次批次上傳
-    client.upsert(collection_name=col_name, points=points)
+# --- 5. 增量建立與上傳 (單一 collection，一次上傳涵蓋三種度量) ---
+# Collection 不存在才建立；資料未變動時不重新上傳 (Embedding 模型或維度變動時整個重建)
+indexer = IncrementalIndexer(
+    client, col_name, embedder.embed,
+    vector_names=[vector_name(m) for m in metrics],
+    config=f"{embedder.model}/{dynamic_size}"
+)
+indexer.ensure_collection(multi_metric_config(dynamic_size, metrics))
+
+# 以固定 ID 批次上傳，只處理新增 / 變動的資料
+stats = indexer.sync_source("data_source", all_texts, payloads=data_source)
+indexer.save_manifest()
+print(f">>> Collection: {col_name} (度量: {', '.join(metrics)}, 維度: {dynamic_size}) 新增 {stats['added']} / 刪除 {stats['deleted']}")
 
 # --- 6. 三種度量結果比較展示 ---
 query_text = "AI開發，與學習python"
@@ -84,25 +72,24 @@ print("="*60)
 
 query_vector = get_embedding([query_text])[0]
 
-for name in metrics.keys():
-    col_name = f"collection_{name.lower()}"
-    
-    # 搜尋：不限單一分類，涵蓋 AI、Database、Programming
-    search_result = client.query_points(
-        collection_name=col_name,
-        query=query_vector,
-        query_filter=Filter(
-            should=[
-                FieldCondition(key="category", match=MatchValue(value="AI")),
-                FieldCondition(key="category", match=MatchValue(value="Database")),
-                FieldCondition(key="category", match=MatchValue(value="Programming"))
-            ]
-        ),
-        limit=3
-    )
-    
+# 搜尋：不限單一分類，涵蓋 AI、Database、Programming；三種度量一次批次查詢
+all_results = query_all_metrics(
+    client, col_name, query_vector,
+    limit=3,
+    query_filter=Filter(
+        should=[
+            FieldCondition(key="category", match=MatchValue(value="AI")),
+            FieldCondition(key="category", match=MatchValue(value="Database")),
+            FieldCondition(key="category", match=MatchValue(value="Programming"))
+        ]
+    ),
+    metrics=metrics
+)
+
+for name, points in all_results.items():
     print(f"\n【度量模式：{name}】")
-    for p in search_result.points:
+    for p in points:
         print(f" -> 分數: {p.score:8.4f} | 分類: {p.payload['category']:12} | 內容: {p.payload['text']}")
 
+print(f"\n>>> Embedding 快取統計：{embedder.cache.stats()}")
 print("\n>>> 所有流程已完成。")
\ No newline at end of file
@@ -1,33 +1,40 @@
-import requests
 import os
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.embedding import EmbeddingClient
+from common.chunking import Chunker
+from common.embed_cache import EmbeddingCache
+from common.ingest import IncrementalIndexer
+from common.local_store import make_client
+from common.metrics import METRICS, multi_metric_config, query_all_metrics, vector_name
 
 # --- 1. 初始化與 API 設定 ---
-client = QdrantClient(url="http://localhost:6333")
+client = make_client("http://localhost:6333")  # RAG_VECTOR_BACKEND=local 時改用本機 NumPy 後端
+
+embedder = EmbeddingClient(batch_size=32, cache=EmbeddingCache())
 
 def get_embedding(text_list):
-    url = "https://ws-04.wade0426.me/embed"
-    res = requests.post(url, json={"texts": text_list, "normalize": True, "batch_size": 32})
-    return res.json()['embeddings'] if res.status_code == 200 else None
+    try:
+        return embedder.embed(text_list)
+    except Exception:
+        return None
 
 # 動態偵測維度
 dynamic_size = len(get_embedding(["Dimension Check"])[0])
 
 # --- 2. 定義長文本切塊邏輯 (針對 text.txt) ---
-def fixed_size_chunking(text, size=80):
+fixed_chunker = Chunker("fixed", size=80)
+sliding_chunker = Chunker("sliding", size=80, overlap=35)
+
+def fixed_size_chunking(text):
     """固定長度：直接每 size 個字切一段"""
-    return [text[i:i+size] for i in range(0, len(text), size)]
+    return fixed_chunker.split(text)
 
-def sliding_window_chunking(text, size=80, overlap=35):
+def sliding_window_chunking(text):
     """滑動視窗：移動步長為 (size - overlap)，確保內容重疊"""
-    chunks = []
-    start = 0
-    while start < len(text):
-        chunks.append(text[start:start+size])
-        start += (size - overlap)
-        if start >= len(text): break
-    return chunks
+    return sliding_chunker.split(text)
 
 # --- 3. 執行長文本處理與物理內容印出 ---
 with open("text.txt", "r", encoding="utf-8") as f:
@@ -61,26 +68,29 @@ for c in f_chunks: all_payloads.append({"text": c, "method": "Fixed", "src": "te
 for c in s_chunks: all_payloads.append({"text": c, "method": "Sliding", "src": "text.txt"})
 for s in table_summaries: all_payloads.append({"text": s["text"], "method": "Summary", "src": s["src"]})
 
-# 一次性取得所有 Embedding
-chunk_embeddings = get_embedding([d["text"] for d in all_payloads])
-
-# 建立三種度量衡 Collection
-metrics = {"Cosine": Distance.COSINE, "Dot": Distance.DOT, "Euclidean": Distance.EUCLID}
-
-for name, dist_type in metrics.items():
-    col_name = f"cw02_final_{name.lower()}"
-    if client.collection_exists(col_name):
-        client.delete_collection(col_name)
-    
-    client.create_collection(
-        collection_name=col_name,
-        vectors_config=VectorParams(size=dynamic_size, distance=dist_type)
-    )
-    
-    # 批次嵌入 (Batching)
-    points = [PointStruct(id=i, vector=chunk_embeddings[i], payload=all_payloads[i]) for i in range(len(all_payloads))]
-    client.upsert(collection_name=col_name, points=points)
-    print(f">>> {col_name} (度量:{name}) 批次嵌入成功。")
+# 依 (來源, 方法) 分組，作為增量匯入的來源單位
+groups = {}
+for d in all_payloads:
+    groups.setdefault(f"{d['src']}:{d['method']}", []).append(d)
+
+# 建立單一 Collection，以 named vectors 同時涵蓋三種度量衡
+metrics = METRICS
+col_name = "cw02_final_multi_metric"
+# Embedding 模型、維度或切塊設定變動時 manifest 失效，整個重建
+indexer = IncrementalIndexer(
+    client, col_name, embedder.embed,
+    vector_names=[vector_name(m) for m in metrics],
+    config=f"{embedder.model}/{dynamic_size}/{fixed_chunker.signature}/{sliding_chunker.signature}"
+)
+indexer.ensure_collection(multi_metric_config(dynamic_size, metrics))
+
+# 增量嵌入：只上傳新增 / 變動的切塊，並刪除過期的 point
+added = 0
+for source, items in groups.items():
+    added += indexer.sync_source(source, [d["text"] for d in items], payloads=items)["added"]
+indexer.prune(groups.keys())
+indexer.save_manifest()
+print(f">>> {col_name} (度量:{', '.join(metrics)}) 增量嵌入完成，新增 {added} 筆。")
 
 # --- 6. 搜尋測試與召回對比 ---
 query_text = "台中科大的旗艦計畫內容與就業率數據為何？"
@@ -90,10 +100,10 @@ print("\n" + "#"*60)
 print(f"綜合查詢測試：{query_text}")
 print("#"*60)
 
-for m_name in metrics.keys():
-    # 增加 limit 到 4，確保能看到不同的 Method
-    res = client.query_points(collection_name=f"cw02_final_{m_name.lower()}", query=query_v, limit=4)
+# 增加 limit 到 4，確保能看到不同的 Method；三種度量一次批次查詢
+all_results = query_all_metrics(client, col_name, query_v, limit=4, metrics=metrics)
+for m_name, points in all_results.items():
     print(f"\n【度量模式：{m_name}】")
-    for p in res.points:
+    for p in points:
         print(f" -> 分數: {p.score:.4f} | 方法: {p.payload['method']:8} | 來源: {p.payload['src']:15}")
         print(f"    內容: {p.payload['text'][:50]}...")
\ No newline at end of file
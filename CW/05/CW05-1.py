@@ -1,18 +1,21 @@
-import pdfplumber
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.convert_cache import CachedConverter
+from common.converters import stream_markdown
 
 def convert_with_pdfplumber(input_pdf, output_md):
-    with pdfplumber.open(input_pdf) as pdf:
-        full_text = ""
-        for page in pdf.pages:
-            # 提取每一頁的文字
-            text = page.extract_text()
-            if text:
-                full_text += text + "\n\n--- PAGE BREAK ---\n\n"
-        
-        # 寫入 Markdown 檔案
-        with open(output_md, "w", encoding="utf-8") as f:
-            f.write(full_text)
-    print(f"pdfplumber 轉換完成：{output_md}")
+    # 逐頁擷取、逐頁寫檔並釋放頁面快取，上千頁的文件記憶體也維持平穩
+    # 以 (頁面雜湊, 轉換器, 參數) 快取；修改過的 PDF 只重新擷取變動的頁
+    converter = CachedConverter("pdfplumber")
+    start, first_page = time.perf_counter(), None
+    for page_no, text in stream_markdown(converter.iter_pages(input_pdf), output_md, converter.page_separator):
+        # 每一頁在此即可交給切塊 / 嵌入，不必等整份文件完成
+        if first_page is None:
+            first_page = time.perf_counter() - start
+    print(f"pdfplumber 轉換完成：{output_md} (第一頁 {first_page or 0:.2f}s 可用，共 {time.perf_counter() - start:.2f}s)")
 
 # 執行
-convert_with_pdfplumber("example.pdf", "output_pdfplumber.md")
\ No newline at end of file
+convert_with_pdfplumber("example.pdf", "output_pdfplumber.md")
@@ -1,16 +1,17 @@
-from docling.document_converter import DocumentConverter
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.convert_cache import CachedConverter
+from common.converters import stream_markdown
 
 def convert_with_docling(input_pdf, output_md):
-    converter = DocumentConverter()
-    # 執行轉換
-    result = converter.convert(input_pdf)
-    
-    # 匯出為 Markdown 格式
-    markdown_content = result.document.export_to_markdown()
-    
-    with open(output_md, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
+    # 以頁窗 (page_range) 分段轉換並逐頁寫檔，不在記憶體中組出整份 Markdown
+    # 結果依頁面內容快取，重跑時不再重新解析
+    converter = CachedConverter("docling")
+    for page_no, markdown_content in stream_markdown(converter.iter_pages(input_pdf), output_md, converter.page_separator):
+        pass  # 每一頁在此即可交給切塊 / 嵌入
     print(f"Docling 轉換完成：{output_md}")
 
 # 執行
-convert_with_docling("example.pdf", "output_docling.md")
\ No newline at end of file
+convert_with_docling("example.pdf", "output_docling.md")
@@ -1,13 +1,16 @@
-from markitdown import MarkItDown
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.convert_cache import CachedConverter
 
 def convert_with_markitdown(input_pdf, output_md):
-    md = MarkItDown()
-    # 執行轉換
-    result = md.convert(input_pdf)
+    # 執行轉換 (結果依檔案內容快取，重跑時不再重新解析)
+    text_content = CachedConverter("markitdown")(input_pdf)
     
     # 取得轉換後的文字內容
     with open(output_md, "w", encoding="utf-8") as f:
-        f.write(result.text_content)
+        f.write(text_content)
     print(f"Markitdown 轉換完成：{output_md}")
 
 # 執行
@@ -1,20 +1,14 @@
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, RapidOcrOptions
-from docling.document_converter import DocumentConverter, PdfFormatOption
+import sys
+from pathlib import Path
 
-# 設定 OCR 引擎為 RapidOCR
-pipeline_options = PdfPipelineOptions()
-pipeline_options.do_ocr = True
-pipeline_options.ocr_options = RapidOcrOptions() # 指定使用 RapidOCR
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.convert_cache import CachedConverter
 
-converter = DocumentConverter(
-    format_options={
-        InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-    }
-)
+# 設定 OCR 引擎為 RapidOCR (Docling + RapidOcrOptions)，結果依檔案內容逐頁快取
+converter = CachedConverter("rapidocr")
 
 # 轉換您提供的範例文件
-result_rapid = converter.convert("sample_table.pdf")
+markdown_rapid = converter("sample_table.pdf")
 
 print("--- RapidOCR Output ---")
-print(result_rapid.document.export_to_markdown())
\ No newline at end of file
+print(markdown_rapid)
\ No newline at end of file
@@ -1,17 +1,21 @@
-import time
-import requests
+import sys
 from pathlib import Path
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
 from openai import OpenAI
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.asr_client import AsrClient, AsrTimeout
+
 # 1. API 基礎配置
 ASR_BASE = "https://3090api.huannago.com"
 LLM_BASE = "https://ws-02.wade0426.me/v1" #
 MODEL_NAME = "google/gemma-3-27b-it"       #
 AUTH = ("nutc2504", "nutc2504")
+ASR_CONCURRENCY = 4   # 多個音檔時同時上傳 / 輪詢的數量
 
 client = OpenAI(api_key="YOUR_API_KEY", base_url=LLM_BASE)
+asr = AsrClient(base_url=ASR_BASE, auth=AUTH, concurrency=ASR_CONCURRENCY)
 
 class AgentState(TypedDict):
     wav_path: str
@@ -23,26 +27,12 @@ class AgentState(TypedDict):
 
 # 2. 定義功能節點 (Nodes)
 def asr_node(state: AgentState):
-    """執行 ASR 轉錄 (整合 Requests 腳本)"""
+    """執行 ASR 轉錄：退避輪詢、TXT / SRT 同時下載；批次模式已預先轉錄時直接沿用"""
     print("--- [Node] 執行 ASR 語音辨識 ---")
-    create_url = f"{ASR_BASE}/api/v1/subtitle/tasks"
-    with open(state["wav_path"], "rb") as f:
-        r = requests.post(create_url, files={"audio": f}, timeout=60, auth=AUTH)
-    r.raise_for_status()
-    task_id = r.json()["id"]
-    
-    def wait_download(url: str):
-        for _ in range(600):
-            resp = requests.get(url, timeout=(5, 60), auth=AUTH)
-            if resp.status_code == 200: return resp.text
-            time.sleep(2)
-        return ""
-    
-    # 同時獲取 TXT 與 SRT 分別給摘要與逐字稿使用
-    return {
-        "raw_txt": wait_download(f"{ASR_BASE}/api/v1/subtitle/tasks/{task_id}/subtitle?type=TXT"),
-        "raw_srt": wait_download(f"{ASR_BASE}/api/v1/subtitle/tasks/{task_id}/subtitle?type=SRT")
-    }
+    if state.get("raw_txt") is not None:
+        return {}
+    result = asr.transcribe(state["wav_path"])
+    return {"raw_txt": result["txt"], "raw_srt": result["srt"]}
 
 def summarizer_node(state: AgentState):
     """生成重點摘要 (嚴格遵守截圖左側格式)"""
@@ -122,12 +112,27 @@ app = workflow.compile()
 
 # 4. 執行與輸出
 if __name__ == "__main__":
-    # 使用你的特定檔案路徑
-    config = {"wav_path": "/home/pc-49/Downloads/Podcast_EP14_30s.wav"}
-    result = app.invoke(config)
-    
-    # 輸出成 Markdown 檔案
-    output_path = Path("Meeting_Analysis_Report.md")
-    output_path.write_text(result["final_output"], encoding="utf-8")
-    
-    print(f"\n✅ 處理完成！結果已儲存至：{output_path}")
\ No newline at end of file
+    # 使用你的特定檔案路徑；可在命令列一次給多個音檔
+    wav_paths = sys.argv[1:] or ["/home/pc-49/Downloads/Podcast_EP14_30s.wav"]
+
+    if len(wav_paths) == 1:
+        try:
+            result = app.invoke({"wav_path": wav_paths[0]})
+        except AsrTimeout as e:
+            sys.exit(f"❌ 轉錄失敗 {wav_paths[0]}: {e}")
+        
+        # 輸出成 Markdown 檔案
+        output_path = Path("Meeting_Analysis_Report.md")
+        output_path.write_text(result["final_output"], encoding="utf-8")
+        
+        print(f"\n✅ 處理完成！結果已儲存至：{output_path}")
+    else:
+        # 批次：所有音檔的上傳與輪詢並行進行 (最多 ASR_CONCURRENCY 個)，再逐一產出報告
+        for t in asr.transcribe_many(wav_paths):
+            if "error" in t:
+                print(f"❌ 轉錄失敗 {t['wav_path']}: {t['error']}")
+                continue
+            result = app.invoke({"wav_path": t["wav_path"], "raw_txt": t["txt"], "raw_srt": t["srt"]})
+            output_path = Path(f"{Path(t['wav_path']).stem}_Meeting_Analysis_Report.md")
+            output_path.write_text(result["final_output"], encoding="utf-8")
+            print(f"✅ {t['wav_path']} (轉錄 {t['seconds']} 秒) 結果已儲存至：{output_path}")
\ No newline at end of file
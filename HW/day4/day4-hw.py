@@ -1,36 +1,87 @@
 import os
+import sys
 import base64
 import operator
-import requests
 import json
+import time
 from datetime import datetime
+from pathlib import Path
 from typing import Annotated, List, TypedDict, Literal
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
-from playwright.sync_api import sync_playwright
+from langgraph.types import Send
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.llm_cache import LLMCache, CachedChatModel
+from common.browser_pool import BrowserPool, downscale
+from common.page_cache import PageCache, normalize_url, summary_kind
+from common.http import make_session
+from common.embedding import EmbeddingClient
+from common.embed_cache import EmbeddingCache
+from common.evidence_store import EvidenceStore, estimate_tokens
 
 # --- 1. 核心模型初始化 ---
 # 請確保 base_url 與 api_key 正確無誤
-llm = ChatOpenAI(
+# temperature=0 的呼叫以 (base_url, model, messages, 參數) 快取，重跑時不再重複付費
+llm = CachedChatModel(ChatOpenAI(
     base_url="https://ws-05.huannago.com/v1", 
     api_key="YOUR_API_KEY", 
     model="google/gemma-3-27b-it",
     temperature=0
-)
+), LLMCache())
+
+# 每輪產生多個互補的搜尋詞並行搜尋；讀取網頁以 Send 分支並行，同時執行的分支數受 READ_CONCURRENCY 限制
+QUERIES_PER_ROUND = 3
+READS_PER_ROUND = 4
+READ_CONCURRENCY = 4
+search_session = make_session(pool_size=QUERIES_PER_ROUND)
+
+# 常駐的瀏覽器 context 池：跨輪次共用，第一次讀網頁時才啟動 Chromium
+browser_pool = BrowserPool(size=READ_CONCURRENCY)
+# 網頁文字 / 截圖 / 摘要以網址快取 (各有 TTL)，重複查到同一來源時不再重新載入與摘要
+page_cache = PageCache()
+MAX_TEXT_CHARS = 6000  # 送進模型的主文字數上限
+
+# 增量證據庫：讀取分支寫入時以 Embedding 去重、逐來源滾動壓縮；planner / final 只拿 token 預算內的內容
+PLANNER_TOKEN_BUDGET = 1500
+FINAL_TOKEN_BUDGET = 4000
+embedder = EmbeddingClient(batch_size=32, cache=EmbeddingCache())
+
+def compress_source(text: str) -> str:
+    return llm.invoke(f"請將以下同一來源的證據壓縮成條列重點，保留所有日期、數字、版本與出處性質 (官方 / 傳聞)，刪除重複與無關敘述：\n{text}").content
+
+evidence = EvidenceStore(embedder.embed, compress=compress_source)
+prompt_log = []  # 每次 planner / final 呼叫的 prompt token 數，比較壓縮前後
+
+def log_prompt(stage: str, current_round: int, prompt: str, context: str, knowledge_base: list):
+    """記錄 prompt token 數，並估算改用完整 knowledge_base 時的大小"""
+    tokens = estimate_tokens(prompt)
+    raw = tokens - estimate_tokens(context) + estimate_tokens("\n".join(knowledge_base))
+    prompt_log.append({"stage": stage, "round": current_round, "tokens": tokens, "raw_tokens": raw})
+    print(f"🧮 [Prompt] {stage} 第 {current_round} 輪：約 {tokens} tokens (完整知識庫版本約 {raw} tokens)")
 
 # --- 2. 定義狀態 ---
 class AgentState(TypedDict):
     input: str
-    queries: List[str]
+    queries: Annotated[list, operator.add]    # 所有輪次用過的搜尋詞
+    round_queries: List[str]                  # 本輪的搜尋詞
     knowledge_base: Annotated[list, operator.add]
-    search_results: List[dict]
+    search_results: List[dict]                # 本輪要讀取的網頁 (已跨輪去重)
+    seen_urls: Annotated[list, operator.add]  # 已讀過的正規化網址
     is_sufficient: bool
     round: int
     missing_info: str
     final_answer: str
 
+class ReadState(TypedDict):
+    """單一讀取分支 (Send) 的輸入"""
+    input: str
+    target: dict
+
 # --- 3. 核心工具函數 ---
 
 def search_searxng(query: str):
@@ -39,45 +90,46 @@ def search_searxng(query: str):
     clean_query = query.strip().split('\n')[0].replace('*', '').replace('"', '')
     params = {"q": clean_query, "format": "json", "language": "zh-TW"}
     try:
-        response = requests.get(url, params=params, timeout=15)
+        response = search_session.get(url, params=params, timeout=15)
         return response.json().get('results', [])[:5]
     except Exception as e:
         print(f"🌐 搜尋引擎連接失敗: {e}")
         return []
 
+def load_page(url: str):
+    """分層擷取：先取 DOM 主文，文字不足或圖片為主時才附上縮圖後的截圖；結果依網址快取"""
+    page = page_cache.get_json(url, "page")
+    if page is None:
+        fetched = browser_pool.fetch(url, screenshot="auto")
+        page = {k: fetched[k] for k in ("final_url", "title", "text", "image_ratio")}
+        page["image"] = page["mime"] = None
+        if fetched["screenshot"]:
+            image, page["mime"] = downscale(fetched["screenshot"])
+            page["image"] = base64.b64encode(image).decode('utf-8')
+        page_cache.put_json(url, "page", page)
+    return page
+
 def vlm_read_website(url: str, title: str, original_q: str):
-    """強化版視覺網頁讀取：模擬真實瀏覽器行為，解決截圖空白問題"""
+    """強化版網頁讀取：文字優先、必要時才送截圖給 VLM；網頁與摘要皆有快取"""
+    kind = summary_kind(original_q)
+    cached = page_cache.get(url, kind)
+    if cached is not None:
+        return cached
     try:
-        with sync_playwright() as p:
-            # 模擬真實瀏覽器環境，避開部分防爬蟲機制
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-                viewport={'width': 1280, 'height': 800}
-            )
-            page = context.new_page()
-            
-            # 延長超時時間並等待 DOM 加載
-            page.goto(url, wait_until="domcontentloaded", timeout=45000)
-            page.wait_for_timeout(3000) # 給予額外渲染時間
-            
-            # 自動向下滾動觸發懶加載 (Lazy Loading)
-            page.mouse.wheel(0, 800)
-            page.wait_for_timeout(1000)
-
-            screenshot_b64 = base64.b64encode(page.screenshot(full_page=False)).decode('utf-8')
-            browser.close()
-
-            # 指引 VLM 進行嚴謹的事實提取
-            msg = [
-                {"role": "user", "content": [
-                    {"type": "text", "text": f"網頁標題：{title}\n用戶問題：{original_q}\n請依據『調查員原則』提取證據：\n1. 找出所有具體日期與版本數據。\n2. 識別官方公告與傳聞的區別。\n3. 若提到『延期』，請找原始日期與新日期。"},
-                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{screenshot_b64}"}}
-                ]}
-            ]
-            return llm.invoke(msg).content
+        page = load_page(url)
+
+        # 指引 VLM 進行嚴謹的事實提取
+        instruction = f"網頁標題：{title}\n用戶問題：{original_q}\n請依據『調查員原則』提取證據：\n1. 找出所有具體日期與版本數據。\n2. 識別官方公告與傳聞的區別。\n3. 若提到『延期』，請找原始日期與新日期。"
+        content = [{"type": "text", "text": instruction}]
+        if page["text"]:
+            content.append({"type": "text", "text": f"網頁主文：\n{page['text'][:MAX_TEXT_CHARS]}"})
+        if page["image"]:
+            content.append({"type": "image_url", "image_url": {"url": f"data:{page['mime']};base64,{page['image']}"}})
+        summary = llm.invoke([{"role": "user", "content": content}]).content
+        page_cache.put(url, kind, summary)
+        return summary
     except Exception as e:
-        return f"視覺讀取失敗 (來源: {url}): {str(e)}"
+        return f"網頁讀取失敗 (來源: {url}): {str(e)}"
 
 # --- 4. 嚴謹節點實作 ---
 
@@ -90,7 +142,7 @@ def planner_node(state: AgentState):
     if current_round >= MAX_ROUNDS: return {"is_sufficient": True}
     if not state.get("knowledge_base"): return {"is_sufficient": False, "round": current_round + 1}
     
-    context = "\n".join(state["knowledge_base"])
+    context = evidence.view(PLANNER_TOKEN_BUDGET)
     prompt = f"""使用者問題：{state['input']}
     現有資料內容：{context}
     
@@ -99,6 +151,7 @@ def planner_node(state: AgentState):
     2. 是否能排除媒體猜測並形成完整時間軸？
     如果已足以結案，請回覆 'DONE'。
     否則，請簡短描述『還缺少的特定拼圖』。"""
+    log_prompt("planner", current_round, prompt, context, state["knowledge_base"])
     
     res = llm.invoke(prompt).content
     if "DONE" in res.upper():
@@ -111,6 +164,7 @@ def query_gen_node(state: AgentState):
     """
     究極嚴謹版關鍵字生成
     導入：多方求證、結構化思考、懷疑論、時效性
+    每輪產生 QUERIES_PER_ROUND 個互補的搜尋詞，分別切入不同面向
     """
     history = ", ".join(state.get("queries", []))
     missing = state.get("missing_info", "基礎背景事實")
@@ -123,37 +177,65 @@ def query_gen_node(state: AgentState):
     - **時效性**：確保搜尋詞能涵蓋最新的動態與歷史的節點。
     
     任務：針對問題『{state['input']}』，補足缺失資訊：『{missing}』。
-    要求：僅輸出一個精確的搜尋關鍵字，禁止 Markdown、引號或任何解釋。"""
+    要求：輸出 {QUERIES_PER_ROUND} 個互補的精確搜尋關鍵字 (例如：官方來源、反向證據、時間軸)，每行一個，禁止 Markdown、引號、編號或任何解釋。"""
 
     res = llm.invoke([
         SystemMessage(content=system_prompt),
-        HumanMessage(content=f"已嘗試過的關鍵字：[{history}]。請給出下一個搜尋方向。")
+        HumanMessage(content=f"已嘗試過的關鍵字：[{history}]。請給出下一輪的搜尋方向。")
     ]).content
 
-    query = res.strip().split('\n')[0].replace('*', '').replace('"', '').replace('搜尋關鍵字：', '')
-    print(f"🔑 [調查級搜尋]：{query}")
-    return {"queries": [query]}
+    queries = []
+    for line in res.strip().split('\n'):
+        query = line.strip().lstrip('-•0123456789.、) ').replace('*', '').replace('"', '').replace('搜尋關鍵字：', '').strip()
+        if query and query not in queries and query not in state.get("queries", []):
+            queries.append(query)
+    queries = queries[:QUERIES_PER_ROUND] or [state['input']]
+    for query in queries:
+        print(f"🔑 [調查級搜尋]：{query}")
+    return {"queries": queries, "round_queries": queries}
 
 def search_tool_node(state: AgentState):
-    return {"search_results": search_searxng(state["queries"][-1])}
+    """本輪搜尋詞並行送出；結果依正規化網址跨輪去重，輪流從各搜尋詞的結果取用"""
+    queries = state["round_queries"]
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        per_query = list(pool.map(search_searxng, queries))
+
+    seen = set(state.get("seen_urls", []))
+    targets = []
+    for group in zip_longest(*per_query):
+        for result in group:
+            if not result or not result.get('url'):
+                continue
+            key = normalize_url(result['url'])
+            if key not in seen:
+                seen.add(key)
+                targets.append(result)
+    targets = targets[:READS_PER_ROUND]
+    print(f"🔎 [搜尋] {len(queries)} 組關鍵字，{sum(map(len, per_query))} 筆結果，{len(targets)} 個新來源")
+
+    update = {"search_results": targets, "seen_urls": [normalize_url(t['url']) for t in targets]}
+    if not targets:
+        update["knowledge_base"] = ["(此輪搜尋未獲取新的有效網頁)"]
+    return update
 
-def vlm_processing_node(state: AgentState):
-    new_info = []
-    results = state.get("search_results", [])
-    if not results:
-        return {"knowledge_base": ["(此輪搜尋未獲取有效網頁)"]}
+def route_reads(state: AgentState):
+    """每個待讀網頁各開一個 Send 分支；沒有新來源時直接回到 planner"""
+    targets = state.get("search_results", [])
+    if not targets:
+        return "planner"
+    return [Send("vlm_processing", {"input": state["input"], "target": t}) for t in targets]
 
-    for i in range(min(2, len(results))):
-        target = results[i]
-        print(f"📸 [視覺查證] 正在讀取：{target.get('title')[:20]}...")
-        summary = vlm_read_website(target['url'], target.get('title', '無標題'), state['input'])
-        new_info.append(f"【來源】: {target['url']}\n【事實摘要】: {summary}\n")
-    return {"knowledge_base": new_info}
+def vlm_processing_node(state: ReadState):
+    target = state["target"]
+    print(f"📸 [視覺查證] 正在讀取：{target.get('title', '無標題')[:20]}...")
+    summary = vlm_read_website(target['url'], target.get('title', '無標題'), state['input'])
+    evidence.add(target['url'], summary)
+    return {"knowledge_base": [f"【來源】: {target['url']}\n【事實摘要】: {summary}\n"]}
 
 def final_answer_node(state: AgentState):
     """最終彙整：執行邏輯推理與時間軸排序"""
     print(f"\n🏁 [Final Report] 正在產出嚴謹報告...")
-    context = "\n".join(state.get("knowledge_base", []))
+    context = evidence.view(FINAL_TOKEN_BUDGET)
     
     prompt = f"""
     你是專業調查分析師。請根據以下蒐集到的零散資訊，為用戶問題『{state['input']}』產出報告。
@@ -166,6 +248,7 @@ def final_answer_node(state: AgentState):
     查證資料內容：
     {context}
     """
+    log_prompt("final", state.get("round", 0), prompt, context, state.get("knowledge_base", []))
     res = llm.invoke(prompt).content
     return {"final_answer": res}
 
@@ -184,7 +267,7 @@ workflow.add_conditional_edges(
     {"end": "final_answer", "search": "query_gen"}
 )
 workflow.add_edge("query_gen", "search_tool")
-workflow.add_edge("search_tool", "vlm_processing")
+workflow.add_conditional_edges("search_tool", route_reads, ["vlm_processing", "planner"])
 workflow.add_edge("vlm_processing", "planner")
 workflow.add_edge("final_answer", END)
 
@@ -199,17 +282,26 @@ if __name__ == "__main__":
         if user_q.lower() == 'q': break
         
         try:
+            evidence.reset()
+            prompt_log.clear()
+            start = time.perf_counter()
             final_state = app.invoke({
                 "input": user_q, 
                 "knowledge_base": [], 
                 "queries": [], 
+                "round_queries": [],
+                "seen_urls": [],
                 "round": 0,
                 "missing_info": "",
                 "final_answer": ""
-            })
+            }, {"max_concurrency": READ_CONCURRENCY})
             
             print("\n" + "—"*50)
             print(f"🎯 【最終調查報告】\n\n{final_state.get('final_answer')}")
             print("—"*50)
+            print(f"⏱️ 調查耗時 {time.perf_counter() - start:.1f} 秒，讀取 {len(final_state.get('seen_urls', []))} 個來源")
+            print(f"📦 網頁快取：{page_cache.stats()}")
+            saved = sum(p["raw_tokens"] - p["tokens"] for p in prompt_log)
+            print(f"🗜️ 證據庫：{evidence.stats()}，planner / final prompt 共約 {sum(p['tokens'] for p in prompt_log)} tokens (省下約 {saved} tokens)")
         except Exception as e:
             print(f"🔥 系統執行中斷: {e}")
\ No newline at end of file
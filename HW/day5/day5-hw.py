@@ -1,14 +1,21 @@
 import os
+import sys
 import uuid
 import pandas as pd
-import requests
-import time
 import re
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from qdrant_client.models import Distance, VectorParams, QueryRequest
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter, CharacterTextSplitter
-from langchain_experimental.text_splitter import SemanticChunker
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.embedding import EmbeddingClient
+from common.chunking import Chunker
+from common.embed_cache import EmbeddingCache
+from common.http import make_session
+from common.ingest import IncrementalIndexer
+from common.local_store import make_client
+from common.semantic_chunking import SemanticSplitter
+from common.timing import StageTimer
 
 # === 0. 配置與初始化 ===
 STUDENT_ID = "1111232041"
@@ -16,59 +23,80 @@ EMBED_API_URL = "https://ws-04.wade0426.me/embed"
 SUBMIT_URL = "https://hw-01.wade0426.me/submit_answer"
 CHUNK_SIZE = 300
 CHUNK_OVERLAP = 50
+QUERY_BATCH_SIZE = 64   # 每次 query_batch_points 的問題數
+SCORE_WORKERS = 8       # 同時送出評分的請求數
 
-client = QdrantClient(url="http://localhost:6333")
-
-class CustomEmbeddings:
-    def embed_documents(self, texts): return get_embeddings(texts)
-    def embed_query(self, text): return get_embeddings([text])[0]
+client = make_client("http://localhost:6333")  # RAG_VECTOR_BACKEND=local 時改用本機 NumPy 後端
+embedder = EmbeddingClient(url=EMBED_API_URL, timeout=60, retries=5, cache=EmbeddingCache())
+submit_session = make_session(pool_size=SCORE_WORKERS, retries=3)
 
 def get_embeddings(texts):
     if not texts: return []
-    payload = {"texts": texts, "normalize": True}
-    for i in range(5):
-        try:
-            response = requests.post(EMBED_API_URL, json=payload, timeout=60)
-            if response.status_code == 200:
-                return response.json()['embeddings']
-        except:
-            time.sleep(2)
-    return [[0] * 4096]
+    try:
+        return embedder.embed(texts)
+    except Exception:
+        return [[0] * 4096]
 
 def submit_and_get_score(q_id, answer):
     payload = {"q_id": q_id, "student_answer": answer}
     try:
-        response = requests.post(SUBMIT_URL, json=payload, timeout=20)
+        response = submit_session.post(SUBMIT_URL, json=payload, timeout=20)
         return response.json().get("score", 0) if response.status_code == 200 else 0
     except:
         return 0
 
+def score_all(q_ids, answers):
+    """以執行緒池並行評分 (連線池 + 自動重試)，結果順序與輸入相同"""
+    with ThreadPoolExecutor(max_workers=SCORE_WORKERS) as pool:
+        return list(pool.map(submit_and_get_score, q_ids, answers))
+
+def search_top1(coll_name, q_vectors):
+    """批次檢索：每 QUERY_BATCH_SIZE 個問題一次 query_batch_points，回傳每題的最佳 hit (或 None)"""
+    hits = []
+    for start in range(0, len(q_vectors), QUERY_BATCH_SIZE):
+        requests = [
+            QueryRequest(query=v, limit=1, with_payload=True)
+            for v in q_vectors[start:start + QUERY_BATCH_SIZE]
+        ]
+        for res in client.query_batch_points(collection_name=coll_name, requests=requests):
+            hits.append(res.points[0] if res.points else None)
+    return hits
+
 # === 2. 切塊邏輯 (解決 TypeError 與 POINTS 5 問題) ===
-def get_chunks(method, content, embeddings_tool):
+def get_chunks_many(method, contents):
+    """一次處理多個檔案，回傳與 contents 對齊的切塊列表"""
+    # 與原本 CharacterTextSplitter(separator="") / RecursiveCharacterTextSplitter 的切塊結果相同
     if method == "固定大小":
-        splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=0, separator="")
-        return [d.page_content for d in splitter.create_documents([content])]
+        chunker = Chunker("fixed", size=CHUNK_SIZE, strip=True)
+        return [chunker.split(c) for c in contents]
     
     elif method == "滑動視窗":
-        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        return [d.page_content for d in splitter.create_documents([content])]
+        chunker = Chunker("recursive", size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        return [chunker.split(c) for c in contents]
     
     elif method == "語義切塊":
         # 💡 解決方案：不使用 sentence_splitter 參數，改為預先手動分句
         # 使用正則表達式按中文標點符號切分
-        sentences = re.split(r'(?<=[。！？\n])', content)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        per_file = []
+        for content in contents:
+            sentences = re.split(r'(?<=[。！？\n])', content)
+            per_file.append([s.strip() for s in sentences if s.strip()])
         
-        sem_splitter = SemanticChunker(
-            embeddings_tool, 
-            breakpoint_threshold_type="percentile",
-            breakpoint_threshold_amount=50
+        # 切點規則與 SemanticChunker(percentile, 50) 相同；
+        # 所有檔案的句子一次批次嵌入 (走 Embedding 快取)，距離與門檻以 NumPy 計算
+        sem_splitter = SemanticSplitter(
+            embedder.embed,
+            threshold_type="percentile",
+            threshold_amount=50
         )
+        all_sentences = [s for sentences in per_file for s in sentences]
+        docs = sem_splitter.split_many(all_sentences)
         
-        # 傳入句子列表 (list of strings) 而非單一長字串
-        # 這樣 Chunker 會針對這些句子進行語義聚合
-        docs = sem_splitter.create_documents(sentences)
-        return [d.page_content for d in docs]
+        results, pos = [], 0
+        for sentences in per_file:
+            results.append([c for chunks in docs[pos:pos + len(sentences)] for c in chunks])
+            pos += len(sentences)
+        return results
 
 # === 3. 主執行流程 ===
 def run_evaluation():
@@ -85,64 +113,47 @@ def run_evaluation():
     
     results_for_csv = []
     summary_data = []
-    embeddings_tool = CustomEmbeddings()
+    timer = StageTimer()
 
     print(f"📡 正在獲取 {len(q_texts)} 個問題的向量...")
-    all_q_vectors = get_embeddings(q_texts)
+    with timer.stage("embed_questions"):
+        all_q_vectors = get_embeddings(q_texts)
 
     for method_zh, coll_name in methods_config.items():
         print(f"\n🛠️ 處理方法: [{method_zh}]")
         
-        if client.collection_exists(coll_name):
-            client.delete_collection(coll_name)
-            time.sleep(1)
-        client.create_collection(
-            collection_name=coll_name,
-            vectors_config=VectorParams(size=4096, distance=Distance.COSINE)
+        # 增量匯入：資料檔未變動時不重新切塊、嵌入與上傳
+        indexer = IncrementalIndexer(
+            client, coll_name, embedder.embed,
+            config=f"{embedder.model}/{method_zh}/{CHUNK_SIZE}/{CHUNK_OVERLAP}"
         )
-        time.sleep(1)
-
-        method_chunks = []
-        chunk_source_map = {}
-        for file_name in data_files:
-            if os.path.exists(file_name):
-                with open(file_name, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    chunks = get_chunks(method_zh, content, embeddings_tool)
-                    for c in chunks:
-                        method_chunks.append(c)
-                        chunk_source_map[c] = file_name
+        indexer.ensure_collection(VectorParams(size=4096, distance=Distance.COSINE))
+        with timer.stage(f"index:{method_zh}"):
+            stats = indexer.sync_files(
+                [f for f in data_files if os.path.exists(f)],
+                lambda contents: get_chunks_many(method_zh, contents),
+                batched=True
+            )
         
-        print(f"   📊 POINTS 數量: {len(method_chunks)}")
+        print(f"   📊 POINTS 數量: {indexer.point_count()} "
+              f"(新增 {stats['added']} / 刪除 {stats['deleted']}，耗時 {stats['seconds']} 秒)")
 
-        if method_chunks:
-            chunk_vectors = get_embeddings(method_chunks)
-            points = [
-                PointStruct(
-                    id=uuid.uuid4().hex, 
-                    vector=chunk_vectors[i], 
-                    payload={"text": method_chunks[i], "source": chunk_source_map[method_chunks[i]]}
-                ) for i in range(len(method_chunks))
-            ]
-            client.upsert(collection_name=coll_name, points=points)
+        # 所有問題一次批次檢索，再並行評分
+        with timer.stage(f"search:{method_zh}"):
+            hits = search_top1(coll_name, all_q_vectors)
+        answered = [(q_ids[i], hit) for i, hit in enumerate(hits) if hit is not None]
+        with timer.stage(f"score:{method_zh}"):
+            method_scores = score_all([q for q, _ in answered], [hit.payload['text'] for _, hit in answered])
 
-        method_scores = []
-        for i, q_vec in enumerate(all_q_vectors):
-            search_res = client.query_points(collection_name=coll_name, query=q_vec, limit=1).points
-            if search_res:
-                hit = search_res[0]
-                retrieved_text = hit.payload['text']
-                score = submit_and_get_score(q_ids[i], retrieved_text)
-                method_scores.append(score)
-                
-                results_for_csv.append({
-                    "id": uuid.uuid4().hex[:8],
-                    "q_id": q_ids[i],
-                    "method": method_zh,
-                    "retrieve_text": retrieved_text,
-                    "score": score,
-                    "source": hit.payload['source']
-                })
+        for (q_id, hit), score in zip(answered, method_scores):
+            results_for_csv.append({
+                "id": uuid.uuid4().hex[:8],
+                "q_id": q_id,
+                "method": method_zh,
+                "retrieve_text": hit.payload['text'],
+                "score": score,
+                "source": hit.payload['source']
+            })
         
         avg = sum(method_scores)/len(method_scores) if method_scores else 0
         summary_data.append({"方法": method_zh, "平均分數": f"{avg:.4f}"})
@@ -151,8 +162,12 @@ def run_evaluation():
     output_name = f"day5/{STUDENT_ID}_RAG_HW_01.csv"
     os.makedirs("day5", exist_ok=True)
     pd.DataFrame(results_for_csv).to_csv(output_name, index=False, encoding="utf-8-sig")
+    timing_name = output_name.replace(".csv", "_timings.json")
+    timer.save(timing_name)
     print(f"\n✅ 全部完成！結果已儲存至: {output_name}")
+    print(f"⏱️ 各階段耗時 (秒)：{timer.summary()} -> {timing_name}")
     print(pd.DataFrame(summary_data))
+    print(f"📦 Embedding 快取統計：{embedder.cache.stats()}")
 
 if __name__ == "__main__":
     run_evaluation()
\ No newline at end of file
@@ -1,11 +1,20 @@
 import os
+import sys
 import pandas as pd
-import requests
 import numpy as np
-import torch
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from qdrant_client import QdrantClient
-from rank_bm25 import BM25Okapi
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.embedding import EmbeddingClient
+from common.embed_cache import EmbeddingCache
+from common.bm25 import BM25Index
+from common.fusion import reciprocal_rank_fusion
+from common.timing import LatencyTracker
+from common import model_server
+from common.http import make_session
+from common.llm_cache import LLMCache, cached_chat_completion
 
 # --- 配置區 ---
 EMBED_URL = "https://ws-04.wade0426.me/embed"
@@ -14,61 +23,88 @@ QDRANT_URL = "http://localhost:6333"
 COLLECTION_NAME = "nutc_water_qa"  # 請確認您的 Collection 名稱
 MODEL_NAME = "gemma-3-27b-it"
 RERANKER_PATH = "./"  # 指向您上傳 Qwen3-Reranker 檔案的資料夾
+RERANKER_BACKEND = "torch"  # torch / int8 (CPU 動態量化) / onnx (需 optimum[onnxruntime])
+TOP_K = 10            # 每一路 (向量 / BM25) 取回的筆數
+CANDIDATE_BUDGET = 12 # RRF 融合後送進 Reranker 的候選上限
 
 class WaterAdvancedRAG:
     def __init__(self, kb_file):
         # 1. 初始化 Qdrant 與 BM25
         self.client = QdrantClient(url=QDRANT_URL)
+        self.embedder = EmbeddingClient(url=EMBED_URL, task_description="檢索台水常見問題", cache=EmbeddingCache())
+        self.session = make_session()
+        self.llm_cache = LLMCache()
         self.df = pd.read_csv(kb_file)
         self.answers = self.df['answer'].tolist()
-        tokenized_corpus = [str(a).split() for a in self.answers]
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        # 以去除空白差異後的內容對應 CSV 列號 (collection 由其他腳本建立，payload 沒有列號)
+        self.doc_ids = {self._doc_key(a): i for i, a in enumerate(self.answers)}
+        self.unmatched_dense = 0
+        # 中文字元 n-gram 斷詞；索引以內容雜湊存於 .cache/bm25，內容未變時直接 mmap 載入
+        self.bm25 = BM25Index.load_or_build([str(a) for a in self.answers], name=COLLECTION_NAME)
         
-        # 2. 載入 Qwen3-Reranker 模型
-        print("正在載入 Qwen3-Reranker 模型...")
-        self.re_tokenizer = AutoTokenizer.from_pretrained(RERANKER_PATH)
-        self.re_model = AutoModelForSequenceClassification.from_pretrained(RERANKER_PATH)
-        self.re_model.eval()
+        # 2. Qwen3-Reranker：模型伺服器在線時共用其已載入的模型，否則第一次 rerank 時才載入
+        self.reranker = model_server.reranker(RERANKER_PATH, backend=RERANKER_BACKEND)
         
         self.history = []
+        self.pool = ThreadPoolExecutor(max_workers=2)  # 向量 / BM25 兩路並行
+        self.latency = LatencyTracker()
+
+    @staticmethod
+    def _doc_key(text):
+        return " ".join(str(text).split())
 
     def get_embedding(self, text):
-        """技術：呼叫 Embedding API"""
-        payload = {"texts": [text], "task_description": "檢索台水常見問題", "normalize": True}
-        res = requests.post(EMBED_URL, json=payload).json()
-        return res["embeddings"][0]
+        """技術：呼叫 Embedding API (共用連線池)"""
+        return self.embedder.embed_one(text)
 
     def query_rewrite(self, query):
         """技術 1: Query Rewrite (Gemma-3)"""
         if not self.history: return query
         prompt = f"對話歷史：{self.history[-1]['q']} -> {self.history[-1]['a']}\n當前問題：{query}\n請改寫成完整查詢語句："
-        payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt}]}
-        res = requests.post(VLM_URL, json=payload).json()
+        payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt}], "temperature": 0}
+        res = cached_chat_completion(self.session, VLM_URL, payload, self.llm_cache)
         return res['choices'][0]['message']['content']
 
-    def hybrid_search(self, query_text, top_k=10):
-        """技術 2: Hybrid Search (Qdrant + BM25)"""
-        # 向量檢索
-        query_vec = self.get_embedding(query_text)
-        search_result = self.client.query_points(collection_name=COLLECTION_NAME, query=query_vec, limit=top_k).points
-        vector_contexts = [hit.payload['answer'] for hit in search_result if hit.payload]
-        
-        # 關鍵字檢索
-        bm25_hits = self.bm25.get_top_n(query_text.split(), self.answers, n=top_k)
-        
-        # 合併候選清單
-        return list(dict.fromkeys(vector_contexts + bm25_hits))
+    def dense_search(self, query_text, top_k=TOP_K):
+        """
+        向量檢索：回傳 [(doc_id, score)]，doc_id 為知識庫 CSV 的列號
+        payload 對應不到 CSV 的命中 (collection 過期或內容不同) 仍保留，以答案文字作為 doc_id
+        """
+        with self.latency.measure("dense"):
+            query_vec = self.get_embedding(query_text)
+            points = self.client.query_points(collection_name=COLLECTION_NAME, query=query_vec, limit=top_k).points
+        hits, unmatched = [], 0
+        for p in points:
+            answer = (p.payload or {}).get('answer')
+            if answer is None:
+                continue
+            doc_id = self.doc_ids.get(self._doc_key(answer))
+            if doc_id is None:
+                doc_id = str(answer)
+                unmatched += 1
+            hits.append((doc_id, p.score))
+        if unmatched:
+            self.unmatched_dense += unmatched
+            print(f"⚠️ 向量檢索有 {unmatched}/{len(hits)} 筆無法對應知識庫 CSV，以原文加入候選 (collection 可能需要重建)")
+        return hits
+
+    def sparse_search(self, query_text, top_k=TOP_K):
+        """關鍵字檢索：BM25 回傳 [(doc_id, score)]"""
+        with self.latency.measure("sparse"):
+            return self.bm25.search(query_text, k=top_k)
+
+    def hybrid_search(self, query_text, top_k=TOP_K, budget=CANDIDATE_BUDGET):
+        """技術 2: Hybrid Search (Qdrant + BM25 並行，RRF 以文件 id 融合)"""
+        with self.latency.measure("hybrid"):
+            dense = self.pool.submit(self.dense_search, query_text, top_k)
+            sparse = self.pool.submit(self.sparse_search, query_text, top_k)
+            fused = reciprocal_rank_fusion([dense.result(), sparse.result()], limit=budget)
+        return [self.answers[i] if isinstance(i, int) else i for i, _ in fused]
 
     def rerank(self, query, contexts, top_n=3):
-        """技術 3: Qwen3-Reranker 精確重排"""
-        if not contexts: return []
-        pairs = [[query, ctx] for ctx in contexts]
-        inputs = self.re_tokenizer(pairs, padding=True, truncation=True, return_tensors="pt", max_length=512)
-        
-        with torch.no_grad():
-            scores = self.re_model(**inputs).logits.view(-1,).float()
-            best_indices = torch.argsort(scores, descending=True)[:top_n]
-            return [contexts[i] for i in best_indices]
+        """技術 3: Qwen3-Reranker 精確重排 (長度分桶 micro-batch + 分數快取)"""
+        with self.latency.measure("rerank"):
+            return self.reranker.rerank(query, contexts, top_n=top_n)
 
     def generate_answer(self, user_query):
         # 進階 RAG 流程
@@ -79,8 +115,8 @@ class WaterAdvancedRAG:
         # 生成回答
         context_str = "\n".join([f"- {c}" for c in final_contexts])
         prompt = f"參考資料：\n{context_str}\n問題：{user_query}\n請專業回答："
-        payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt}]}
-        res = requests.post(VLM_URL, json=payload).json()
+        payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt}], "temperature": 0}
+        res = cached_chat_completion(self.session, VLM_URL, payload, self.llm_cache)
         answer = res['choices'][0]['message']['content']
         
         self.history.append({"q": user_query, "a": answer})
@@ -107,6 +143,10 @@ def main():
     
     pd.DataFrame(results).to_csv("day6_HW_questions.csv", index=False, encoding='utf-8-sig')
     print("成功！已產出包含 Reranker 優化的結果檔案。")
+    print(f"檢索延遲 (ms)：{bot.latency.summary()}")
+    print(f"LLM 快取統計：{bot.llm_cache.stats()}")
+    if bot.unmatched_dense:
+        print(f"⚠️ 共 {bot.unmatched_dense} 筆向量命中無法對應知識庫 CSV")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,24 +1,27 @@
 import os
+import sys
 import logging
 import pandas as pd
 import numpy as np
+from functools import partial
+from pathlib import Path
 from openai import OpenAI
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
-from sentence_transformers import SentenceTransformer
-
-# Docling & VLM 相關
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import VlmPipelineOptions
-from docling.datamodel.pipeline_options_vlm_model import ApiVlmOptions, ResponseFormat
-from docling.pipeline.vlm_pipeline import VlmPipeline
+from qdrant_client.models import VectorParams, Distance
 
 # DeepEval 相關
 from deepeval.models import DeepEvalBaseLLM
 from deepeval.metrics import FaithfulnessMetric, AnswerRelevancyMetric
 from deepeval.test_case import LLMTestCase
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.chunking import Chunker
+from common.pipeline import StreamingUpserter
+from common import model_server
+from common.local_encoder import LocalEncoder
+from common.convert_farm import ConversionFarm
+from common.convert_cache import cached_converter
+
 # ==========================================
 # 1. 系統配置模組
 # ==========================================
@@ -33,9 +36,16 @@ class AppConfig:
     QDRANT_HOST = "localhost"
     QDRANT_PORT = 6333
     COLLECTION_NAME = "secure_hw_rag"
+    EMBED_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
     SAFETY_THRESHOLD = 0.28 # 降低閾值以抓出 2.pdf
+    CONVERT_WORKERS = 4       # 同時轉換的文件數 (行程池)
+    VLM_PAGE_CONCURRENCY = 4  # 每份文件同時送往 VLM 的頁數
     CHUNK_SIZE = 600
     CHUNK_OVERLAP = 60
+    EMBED_BATCH_SIZE = 1024  # 每次 encode 呼叫的切塊數 (可跨文件)
+    ENCODE_BATCH_SIZE = 64   # SentenceTransformer 內部 batch_size
+    ENCODE_PROCESSES = 0     # >1 時以多行程池編碼 (多核心 CPU)
+    UPSERT_BATCH_SIZE = 256
 
 # ==========================================
 # 2. Qdrant 向量資料庫模組 (餘弦相似度)
@@ -43,7 +53,11 @@ class AppConfig:
 class VectorEngine:
     def __init__(self):
         self.client = QdrantClient(url=f"http://{AppConfig.QDRANT_HOST}:{AppConfig.QDRANT_PORT}")
-        self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        # 模型伺服器在線時走 HTTP；否則第一次 encode 時才載入 SentenceTransformer
+        self.model = model_server.encoder(AppConfig.EMBED_MODEL)
+        self.encoder = LocalEncoder(
+            self.model, batch_size=AppConfig.ENCODE_BATCH_SIZE, processes=AppConfig.ENCODE_PROCESSES
+        )
         self._init_collection()
 
     def _init_collection(self):
@@ -54,34 +68,46 @@ class VectorEngine:
             )
 
     def split_text(self, text):
-        """簡單切塊邏輯"""
-        return [text[i:i + AppConfig.CHUNK_SIZE] for i in range(0, len(text), AppConfig.CHUNK_SIZE - AppConfig.CHUNK_OVERLAP)]
+        """滑動視窗切塊 (步長 CHUNK_SIZE - CHUNK_OVERLAP)"""
+        return Chunker("sliding", size=AppConfig.CHUNK_SIZE, overlap=AppConfig.CHUNK_OVERLAP).split(text)
+
+    def upsert_documents(self, docs):
+        """
+        串流匯入多份文件 [(file_name, text)]：切塊 → 跨文件大批 encode (float32) → 分批 upsert
+        嵌入與上傳同時進行，回傳含 chunks/sec 的統計
+        """
+        records = (
+            (hash(f"{file_name}_{i}") % 10**8, chunk, {"source": file_name, "content": chunk})
+            for file_name, text in docs
+            for i, chunk in enumerate(self.split_text(text))
+        )
+        upserter = StreamingUpserter(
+            self.client, AppConfig.COLLECTION_NAME, self.encoder,
+            batch_size=AppConfig.EMBED_BATCH_SIZE, upsert_batch_size=AppConfig.UPSERT_BATCH_SIZE
+        )
+        stats = upserter.run(records)
+        stats["encode"] = self.encoder.stats()
+        return stats
 
     def upsert_document(self, file_name, text):
-        chunks = self.split_text(text)
-        points = []
-        for i, chunk in enumerate(chunks):
-            vector = self.model.encode(chunk).tolist()
-            points.append(PointStruct(
-                id=hash(f"{file_name}_{i}") % 10**8,
-                vector=vector,
-                payload={"source": file_name, "content": chunk}
-            ))
-        self.client.upsert(collection_name=AppConfig.COLLECTION_NAME, points=points)
+        return self.upsert_documents([(file_name, text)])
 
 # ==========================================
 # 3. 安全過濾與 IDP 處理模組
 # ==========================================
 class SecureProcessor:
     def __init__(self):
-        opts = VlmPipelineOptions(enable_remote_services=True)
-        opts.vlm_options = ApiVlmOptions(
-            url=f"{AppConfig.VLM_URL}/chat/completions",
-            params=dict(model=AppConfig.VLM_MODEL, max_tokens=4096),
-            response_format=ResponseFormat.MARKDOWN,
-        )
-        self.converter = DocumentConverter(
-            format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=opts, pipeline_cls=VlmPipeline)}
+        # Docling + VLM 轉換器在轉換農場的每個子行程內各建立一次；結果依內容雜湊逐頁快取
+        self.farm = ConversionFarm(
+            partial(
+                cached_converter,
+                "docling",
+                vlm_url=f"{AppConfig.VLM_URL}/chat/completions",
+                vlm_model=AppConfig.VLM_MODEL,
+                max_tokens=4096,
+                page_concurrency=AppConfig.VLM_PAGE_CONCURRENCY,
+            ),
+            max_workers=AppConfig.CONVERT_WORKERS,
         )
 
     def scan_for_injection(self, text):
@@ -121,23 +147,43 @@ def main():
     files = ["1.pdf", "2.pdf", "3.pdf", "4.png", "5.docx"]
     safe_files = []
 
-    # --- Step 1: 解析、掃描並存入 Qdrant ---
-    for f in files:
-        logger.info(f"[*] 正在處理解析並掃描: {f}")
+    # --- Step 1: 並行解析，每完成一份就掃描；各檔案的錯誤個別處理 ---
+    safe_docs = []
+    for result in processor.farm.convert_iter(files):
+        f = result["path"]
+        if result["error"]:
+            logger.error(f"解析 {f} 出錯: {result['error']}")
+            continue
         try:
-            result = processor.converter.convert(f)
-            md_content = result.document.export_to_markdown()
+            md_content = result["markdown"]
             risk_score = processor.scan_for_injection(md_content)
-            
-            if risk_score >= AppConfig.SAFETY_THRESHOLD:
-                logger.warning(f"❌ [攔截成功] {f} 風險分數: {risk_score:.2f}。拒絕存入向量庫。")
-                continue
-            
-            db.upsert_document(f, md_content)
-            safe_files.append(f)
-            logger.info(f"✅ [安全] {f} 已成功存入 Qdrant (使用餘弦相似度)。")
         except Exception as e:
-            logger.error(f"解析 {f} 出錯: {e}")
+            logger.error(f"掃描 {f} 出錯: {e}")
+            continue
+
+        if risk_score >= AppConfig.SAFETY_THRESHOLD:
+            logger.warning(f"❌ [攔截成功] {f} 風險分數: {risk_score:.2f}。拒絕存入向量庫。")
+            continue
+        logger.info(f"✅ [安全] {f} 通過掃描，等待批次嵌入。")
+        safe_docs.append((f, md_content))
+
+    # 切塊跨文件合併成大批 encode；upsert_documents 返回時所有切塊都已寫入 Qdrant
+    try:
+        stats = db.upsert_documents(safe_docs)
+        safe_files.extend(f for f, _ in safe_docs)
+        logger.info(f"📦 已存入 {stats['points']} 個切塊 (使用餘弦相似度)，"
+                    f"編碼 {stats['encode']['chunks_per_sec']} chunks/s，整體 {stats['points_per_sec']} chunks/s。")
+    except Exception as e:
+        # 整批失敗時逐份重試 (point id 固定，重寫不會重複)，只有成功寫入的檔案才算安全
+        logger.error(f"批次存入 Qdrant 出錯: {e}，改為逐份存入")
+        for f, md_content in safe_docs:
+            try:
+                stats = db.upsert_document(f, md_content)
+                safe_files.append(f)
+                logger.info(f"📦 {f} 已存入 {stats['points']} 個切塊")
+            except Exception as e:
+                logger.error(f"存入 {f} 出錯: {e}")
+    logger.info(f"📄 轉換統計：{processor.farm.summary()}")
 
     # --- Step 2: RAG 問答與 DeepEval 驗證 ---
     df_qa = pd.read_csv("questions_answer.csv").head(5)
@@ -0,0 +1,73 @@
+"""
+ASR 批次轉錄比較：原本的逐檔同步流程 (固定 2 秒輪詢、TXT 後才 SRT) vs common.asr_client.AsrClient 各並行數
+以本機 stub 伺服器 (common.asr_stub) 模擬辨識時間，不需真的 ASR 服務
+用法：python benchmarks/bench_asr.py [--files 16] [--delay 3] [--concurrency 1 4 16]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from common.asr_client import AsrClient
+from common.asr_stub import start_stub
+
+
+def baseline(base_url: str, wav_paths):
+    """day3 原本的寫法：逐檔上傳，TXT 與 SRT 依序以固定 2 秒間隔輪詢"""
+    def wait_download(url: str):
+        for _ in range(600):
+            resp = requests.get(url, timeout=(5, 60))
+            if resp.status_code == 200:
+                return resp.text
+            time.sleep(2)
+        return ""
+
+    for wav_path in wav_paths:
+        with open(wav_path, "rb") as f:
+            r = requests.post(f"{base_url}/api/v1/subtitle/tasks", files={"audio": f}, timeout=60)
+        task_id = r.json()["id"]
+        wait_download(f"{base_url}/api/v1/subtitle/tasks/{task_id}/subtitle?type=TXT")
+        wait_download(f"{base_url}/api/v1/subtitle/tasks/{task_id}/subtitle?type=SRT")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=3.0, help="stub 伺服器每個任務的辨識秒數")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_paths = []
+        for i in range(args.files):
+            path = Path(tmp) / f"clip_{i}.wav"
+            path.write_bytes(b"RIFF" + bytes(32 * 1024))
+            wav_paths.append(str(path))
+
+        print(f"{'方法':<20}{'秒':>9}{'檔/分鐘':>10}{'輪詢次數':>10}")
+        runs = [] if args.skip_baseline else [("baseline", None)]
+        runs += [(f"async c={c}", c) for c in args.concurrency]
+        for name, concurrency in runs:
+            server = start_stub(delay=args.delay)
+            start = time.perf_counter()
+            if concurrency is None:
+                baseline(server.url, wav_paths)
+            else:
+                results = AsrClient(base_url=server.url, concurrency=concurrency).transcribe_many(wav_paths)
+                errors = [r for r in results if "error" in r]
+                if errors:
+                    print(f"  {len(errors)} 個失敗：{errors[0]['error']}")
+            seconds = time.perf_counter() - start
+            stats = server.stats()
+            server.shutdown()
+            print(f"{name:<20}{seconds:>9.2f}{args.files / seconds * 60:>10.1f}{stats['polls']:>10}")
+
+
+if __name__ == "__main__":
+    main()
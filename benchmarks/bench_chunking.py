@@ -0,0 +1,59 @@
+"""
+切塊吞吐量比較：common.chunking.Chunker vs LangChain splitters
+用法：python benchmarks/bench_chunking.py [--repeat 200]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from common.chunking import Chunker
+
+SAMPLES = ["CW/02/text.txt", "CW/03/data_01.txt", "CW/03/data_02.txt", "CW/03/data_03.txt"]
+
+
+def load_corpus(repeat: int) -> str:
+    text = "\n\n".join((ROOT / p).read_text(encoding="utf-8") for p in SAMPLES)
+    return text * repeat
+
+
+def bench(name: str, fn, text: str, rounds: int = 3):
+    best, n = float("inf"), 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        n = fn(text)
+        best = min(best, time.perf_counter() - start)
+    mb = len(text.encode("utf-8")) / 1e6
+    print(f"{name:<36} {n:>8} 塊  {best * 1000:>9.1f} ms  {mb / best:>8.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    text = load_corpus(args.repeat)
+    print(f"語料大小：{len(text):,} 字元\n")
+
+    bench("Chunker fixed (300)", lambda t: sum(1 for _ in Chunker("fixed", 300).spans(t)), text)
+    bench("Chunker sliding (300/50)", lambda t: sum(1 for _ in Chunker("sliding", 300, 50).spans(t)), text)
+    bench("Chunker recursive (400/80)", lambda t: sum(1 for _ in Chunker("recursive", 400, 80).spans(t)), text)
+    bench("Chunker sentence (300)", lambda t: sum(1 for _ in Chunker("sentence", 300).spans(t)), text)
+
+    try:
+        from langchain_text_splitters import CharacterTextSplitter, RecursiveCharacterTextSplitter
+    except ImportError:
+        print("\n(未安裝 langchain_text_splitters，略過對照組)")
+        return
+    fixed = CharacterTextSplitter(chunk_size=300, chunk_overlap=0, separator="")
+    recursive = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=80)
+    bench("LangChain CharacterTextSplitter (300)", lambda t: len(fixed.split_text(t)), text)
+    bench("LangChain Recursive (400/80)", lambda t: len(recursive.split_text(t)), text)
+
+    same = recursive.split_text(text[:200_000]) == Chunker("recursive", 400, 80).split(text[:200_000])
+    print(f"\nrecursive 切塊結果與 LangChain 一致：{same}")
+
+
+if __name__ == "__main__":
+    main()
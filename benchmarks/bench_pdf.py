@@ -0,0 +1,101 @@
+"""
+PDF 解析比較：各轉換器 (含逐頁路由 auto) 在 repo 範例 PDF 上的 pages/s、峰值記憶體與輸出保真度
+每個 (轉換器, 檔案) 在獨立子行程執行，峰值 RSS 不受其他轉換器影響
+用法：python benchmarks/bench_pdf.py [--converters pdfplumber docling auto] [--reference docling] [--out result.json]
+"""
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from common.bm25 import cjk_tokenize
+
+SAMPLES = ["CW/05/example.pdf", "CW/06/sample_table.pdf", "HW/day7/1.pdf", "HW/day7/2.pdf", "HW/day7/3.pdf"]
+DEFAULT_CONVERTERS = ["pdfplumber", "markitdown", "docling", "rapidocr", "auto"]
+
+
+def _measure(name: str, path: str) -> dict:
+    sys.path.append(str(ROOT))
+    from common.converters import CONVERTERS
+    import pypdfium2 as pdfium
+
+    try:
+        start = time.perf_counter()
+        converter = CONVERTERS[name]()
+        init_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        markdown = converter(path)
+        seconds = time.perf_counter() - start
+    except ImportError as e:
+        return {"skipped": f"未安裝：{e.name}"}
+    except Exception as e:
+        return {"error": repr(e)}
+    doc = pdfium.PdfDocument(path)
+    pages = len(doc)
+    doc.close()
+    return {
+        "pages": pages,
+        "init_seconds": round(init_seconds, 3),
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(pages / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "plan": getattr(converter, "last_plan", None),
+        "markdown": markdown,
+    }
+
+
+def token_f1(output: str, reference: str) -> float:
+    """以英數單字 / 中文單字計算的 bag-of-tokens F1，衡量與參考輸出的內容重疊"""
+    a, b = Counter(cjk_tokenize(output, (1,))), Counter(cjk_tokenize(reference, (1,)))
+    overlap = sum((a & b).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(a.values()), overlap / sum(b.values())
+    return round(2 * precision * recall / (precision + recall), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--converters", nargs="+", default=DEFAULT_CONVERTERS)
+    parser.add_argument("--files", nargs="+", default=SAMPLES)
+    parser.add_argument("--reference", default="docling", help="保真度比較的參考轉換器")
+    parser.add_argument("--out", help="將完整結果存成 JSON")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for rel in args.files:
+        path = str(ROOT / rel)
+        for name in dict.fromkeys(args.converters + [args.reference]):
+            with ctx.Pool(1) as pool:
+                results[(rel, name)] = pool.apply(_measure, (name, path))
+
+    print(f"{'檔案':<24}{'轉換器':<12}{'頁數':>5}{'秒':>9}{'pages/s':>9}{'峰值MB':>9}{'F1':>7}")
+    for (rel, name), r in results.items():
+        if name not in args.converters:
+            continue
+        if "pages" not in r:
+            print(f"{rel:<24}{name:<12}  {r.get('skipped') or r.get('error')}")
+            continue
+        ref = results.get((rel, args.reference), {}).get("markdown")
+        f1 = token_f1(r["markdown"], ref) if ref is not None else "-"
+        print(f"{rel:<24}{name:<12}{r['pages']:>5}{r['seconds']:>9.2f}{r['pages_per_sec']:>9.2f}"
+              f"{r['peak_rss_mb']:>9.1f}{f1:>7}")
+        if r.get("plan"):
+            print(f"{'':<24}└ 路由：{r['plan']}")
+
+    if args.out:
+        rows = [{"file": rel, "converter": name, **{k: v for k, v in r.items() if k != "markdown"}}
+                for (rel, name), r in results.items()]
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
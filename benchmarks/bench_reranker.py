@@ -0,0 +1,81 @@
+"""
+Reranker 推論比較：原本的單批 fp32 (補齊到最長) vs common.reranker.Reranker 各後端
+用法：python benchmarks/bench_reranker.py --model HW/day6 [--candidates 12] [--batch-size 16] [--onnx]
+"""
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from common.reranker import Reranker, load_cross_encoder
+
+KB_FILE = ROOT / "HW/day6/questions_answer.csv - questions_answer.csv"
+
+
+def load_workload(candidates: int):
+    """每個問題配上 candidates 筆知識庫答案 (輪替取用)，模擬 hybrid_search 的候選"""
+    with open(KB_FILE, encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    answers = [r["answer"] for r in rows]
+    return [
+        (r["questions"], [answers[(i + j) % len(answers)] for j in range(candidates)])
+        for i, r in enumerate(rows)
+    ]
+
+
+def baseline(tokenizer, model):
+    """day6 原本的寫法：整批補齊到最長、no_grad、fp32"""
+    def score(query, docs):
+        inputs = tokenizer([[query, d] for d in docs], padding=True, truncation=True, return_tensors="pt", max_length=512)
+        with torch.no_grad():
+            return model(**inputs).logits.view(-1).float().tolist()
+    return score
+
+
+def bench(name: str, score_fn, workload, rounds: int = 2):
+    score_fn(*workload[0])  # 暖機
+    latencies = []
+    for _ in range(rounds):
+        for query, docs in workload:
+            start = time.perf_counter()
+            score_fn(query, docs)
+            latencies.append(time.perf_counter() - start)
+    lat = np.asarray(latencies) * 1000
+    pairs = sum(len(d) for _, d in workload) * rounds
+    print(f"{name:<28} {pairs / (lat.sum() / 1000):>9.1f} pairs/s  "
+          f"p50 {np.percentile(lat, 50):>8.1f} ms  p95 {np.percentile(lat, 95):>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True, help="Qwen3-Reranker 模型資料夾")
+    parser.add_argument("--candidates", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--onnx", action="store_true", help="一併測試 ONNX Runtime 後端")
+    args = parser.parse_args()
+
+    workload = load_workload(args.candidates)
+    print(f"{len(workload)} 個查詢 × {args.candidates} 個候選，torch threads={torch.get_num_threads()}\n")
+
+    tokenizer, model = load_cross_encoder(args.model, "torch")
+    bench("baseline (padded fp32)", baseline(tokenizer, model), workload)
+
+    backends = ["torch", "int8"] + (["onnx"] if args.onnx else [])
+    for backend in backends:
+        # cache_size=0 關閉分數快取，只比較推論本身
+        rr = Reranker(*load_cross_encoder(args.model, backend), batch_size=args.batch_size, cache_size=0)
+        bench(f"Reranker {backend}", rr.score, workload)
+
+    cached = Reranker(tokenizer, model, batch_size=args.batch_size)
+    bench("Reranker torch + 分數快取", cached.score, workload)
+    print(f"\n分數快取：{cached.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""CW / HW 各腳本共用的 RAG 工具模組"""
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# --- 1. 預設配置 ---
+ASR_BASE = "https://3090api.huannago.com"
+CONCURRENCY = 4            # 同時進行 (上傳 + 輪詢) 的音檔數
+POLL_INITIAL = 2.0         # 第一次未完成後的等待秒數 (= 原本的固定間隔，輪詢次數不會多於原本)
+POLL_MAX = 8.0             # 等待間隔上限 (也決定任務完成後最多多等的時間)
+POLL_BACKOFF = 1.5         # 每次未完成時等待時間的倍率
+POLL_JITTER = 0.25         # 每次等待再隨機拉長 0 ~ 25%
+POLL_TIMEOUT = 1200.0      # 單一字幕最長等待秒數 (原本 600 次 x 2 秒)
+UPLOAD_TIMEOUT = 60.0
+FORMATS = ("TXT", "SRT")
+
+
+def backoff_delays(
+    initial: float = POLL_INITIAL, maximum: float = POLL_MAX, factor: float = POLL_BACKOFF, jitter: float = POLL_JITTER
+):
+    """
+    指數退避 + jitter：第 n 次等待 d * uniform(1, 1 + jitter)，d = min(maximum, initial * factor^n)；
+    間隔只會比 initial 長，輪詢次數不超過固定間隔輪詢；jitter 讓多個任務錯開請求
+    """
+    delay = initial
+    while True:
+        yield delay * random.uniform(1, 1 + jitter)
+        delay = min(maximum, delay * factor)
+
+
+class AsrTimeout(TimeoutError):
+    """字幕在 poll_timeout 內未完成"""
+
+    def __init__(self, task_id: str, fmt: str):
+        super().__init__(f"ASR 任務 {task_id} 的 {fmt} 字幕逾時未完成")
+        self.task_id = task_id
+
+
+class AsrClient:
+    """
+    非同步 ASR 任務用戶端 (httpx.AsyncClient)：
+    - 上傳音檔建立任務後以指數退避 + jitter 輪詢，完成後 TXT 與 SRT 同時下載
+    - transcribe_many 以 TaskGroup + Semaphore 並行處理多個音檔，同時進行數受 concurrency 限制
+    - 單一音檔失敗只回傳 {wav_path, error}，不影響其他音檔；逾時為 {wav_path, task_id, error: "timeout"}
+    """
+
+    def __init__(
+        self,
+        base_url: str = ASR_BASE,
+        auth: Optional[Tuple[str, str]] = None,
+        concurrency: int = CONCURRENCY,
+        poll_timeout: float = POLL_TIMEOUT,
+        formats: Sequence[str] = FORMATS,
+        poll_initial: float = POLL_INITIAL,
+        poll_max: float = POLL_MAX,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.auth = auth
+        self.concurrency = concurrency
+        self.poll_timeout = poll_timeout
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.formats = tuple(formats)
+        self.polls = 0
+
+    def _client(self):
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.concurrency * (1 + len(self.formats)))
+        return httpx.AsyncClient(
+            base_url=self.base_url, auth=self.auth, limits=limits, timeout=httpx.Timeout(UPLOAD_TIMEOUT, connect=5)
+        )
+
+    # --- 2. 單一音檔 ---
+    async def _create_task(self, client, wav_path: str) -> str:
+        audio = await asyncio.to_thread(Path(wav_path).read_bytes)
+        r = await client.post("/api/v1/subtitle/tasks", files={"audio": (Path(wav_path).name, audio)})
+        r.raise_for_status()
+        return r.json()["id"]
+
+    async def _wait_download(self, client, task_id: str, fmt: str, deadline: float) -> str:
+        """字幕未完成時 (非 200) 依退避間隔重試；認證失敗直接拋出，超過 deadline (monotonic) 拋出 AsrTimeout"""
+        for delay in backoff_delays(self.poll_initial, self.poll_max):
+            self.polls += 1
+            r = await client.get(f"/api/v1/subtitle/tasks/{task_id}/subtitle", params={"type": fmt})
+            if r.status_code == 200:
+                return r.text
+            if r.status_code in (401, 403):
+                r.raise_for_status()
+            if time.monotonic() + delay > deadline:
+                raise AsrTimeout(task_id, fmt)
+            await asyncio.sleep(delay)
+
+    async def _transcribe(self, client, wav_path: str) -> Dict:
+        start = time.perf_counter()
+        task_id = await self._create_task(client, wav_path)
+        # 同一任務的各格式同時完成：只以第一種格式輪詢是否完成，完成後其餘格式同時下載 (各自仍有退避重試)
+        # 所有格式共用同一個 deadline；第一種格式逾時即拋出 AsrTimeout，最長等待維持 poll_timeout
+        deadline = time.monotonic() + self.poll_timeout
+        first = await self._wait_download(client, task_id, self.formats[0], deadline)
+        rest = await asyncio.gather(
+            *(self._wait_download(client, task_id, fmt, deadline) for fmt in self.formats[1:])
+        )
+        texts = [first, *rest]
+        result = {"wav_path": wav_path, "task_id": task_id, "seconds": round(time.perf_counter() - start, 3)}
+        result.update({fmt.lower(): text for fmt, text in zip(self.formats, texts)})
+        return result
+
+    async def atranscribe(self, wav_path: str) -> Dict:
+        """回傳 {wav_path, task_id, txt, srt, seconds}；逾時拋出 AsrTimeout"""
+        async with self._client() as client:
+            return await self._transcribe(client, wav_path)
+
+    # --- 3. 批次 ---
+    async def atranscribe_many(self, wav_paths: Sequence[str]) -> List[Dict]:
+        """結果順序與輸入相同；失敗的音檔為 {wav_path, error}"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: List[Optional[Dict]] = [None] * len(wav_paths)
+
+        async def run(i: int, wav_path: str, client):
+            async with semaphore:
+                try:
+                    results[i] = await self._transcribe(client, wav_path)
+                except AsrTimeout as e:
+                    results[i] = {"wav_path": wav_path, "task_id": e.task_id, "error": "timeout"}
+                except Exception as e:
+                    results[i] = {"wav_path": wav_path, "error": repr(e)}
+
+        async with self._client() as client:
+            async with asyncio.TaskGroup() as tg:
+                for i, wav_path in enumerate(wav_paths):
+                    tg.create_task(run(i, wav_path, client))
+        return results
+
+    def transcribe(self, wav_path: str) -> Dict:
+        return asyncio.run(self.atranscribe(wav_path))
+
+    def transcribe_many(self, wav_paths: Sequence[str]) -> List[Dict]:
+        return asyncio.run(self.atranscribe_many(list(wav_paths)))
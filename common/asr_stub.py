@@ -0,0 +1,103 @@
+"""
+本機 ASR 測試伺服器：模擬字幕任務 API (建立任務 -> 處理中回 404 -> 完成後回傳 TXT / SRT)
+
+啟動：python -m common.asr_stub [--port 8766] [--delay 3]
+程式內使用：server = start_stub(delay=1.0)；AsrClient(base_url=server.url)；結束時 server.shutdown()
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# --- 1. 預設配置 ---
+HOST = "127.0.0.1"
+PORT = 8766
+DELAY = 3.0   # 任務建立後幾秒完成 (模擬辨識時間)
+
+SRT_TEMPLATE = "1\n00:00:00,000 --> 00:00:05,000\n{text}\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, body: str, content_type: str = "text/plain; charset=utf-8"):
+        raw = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        if self.path != "/api/v1/subtitle/tasks":
+            return self._reply(404, "not found")
+        size = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(size)
+        task_id = uuid.uuid4().hex
+        server = self.server
+        with server.lock:
+            server.tasks[task_id] = {"ready_at": time.monotonic() + server.delay, "bytes": size}
+            server.created += 1
+        self._reply(200, json.dumps({"id": task_id}), "application/json")
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        segments = parts.path.strip("/").split("/")
+        # /api/v1/subtitle/tasks/<id>/subtitle?type=TXT|SRT
+        if len(segments) != 6 or segments[:4] != ["api", "v1", "subtitle", "tasks"] or segments[5] != "subtitle":
+            return self._reply(404, "not found")
+        server = self.server
+        with server.lock:
+            server.polls += 1
+            task = server.tasks.get(segments[4])
+        if task is None or time.monotonic() < task["ready_at"]:
+            return self._reply(404, "processing")
+        text = f"stub transcript {segments[4][:8]} ({task['bytes']} bytes)"
+        fmt = parse_qs(parts.query).get("type", ["TXT"])[0].upper()
+        self._reply(200, SRT_TEMPLATE.format(text=text) if fmt == "SRT" else text)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = HOST, port: int = PORT, delay: float = DELAY):
+        super().__init__((host, port), _Handler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.created = 0
+        self.polls = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"tasks": self.created, "polls": self.polls}
+
+
+def start_stub(port: int = 0, delay: float = DELAY) -> StubServer:
+    """在背景執行緒啟動 (port=0 由系統指定空閒埠)"""
+    server = StubServer(port=port, delay=delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--delay", type=float, default=DELAY)
+    args = parser.parse_args()
+    server = StubServer(port=args.port, delay=args.delay)
+    print(f"ASR stub 伺服器：{server.url} (每個任務 {args.delay} 秒後完成)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# --- 1. 預設配置 (k1 / b / epsilon 與 rank_bm25.BM25Okapi 相同) ---
+CACHE_DIR = Path(__file__).resolve().parents[1] / ".cache" / "bm25"
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+NGRAMS = (1, 2)
+
+_TOKEN = re.compile(r"[a-z0-9]+|[㐀-鿿豈-﫿]+")
+_CJK = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+def cjk_tokenize(text: str, ngrams: Sequence[int] = NGRAMS) -> List[str]:
+    """英數字以單字為單位；中文字串產生字元 n-gram (預設 unigram + bigram)"""
+    tokens: List[str] = []
+    for run in _TOKEN.findall(str(text).lower()):
+        if not _CJK.match(run):
+            tokens.append(run)
+            continue
+        for n in ngrams:
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+    return tokens
+
+
+class BM25Index:
+    """
+    以 CSR (term -> docs) 陣列儲存預先算好的 BM25 權重：
+    - 查詢 = 取出查詢詞對應的列，np.bincount 加總成文件分數，再以 argpartition 取 top-k
+    - save() / load() 以 .npy 儲存，載入時 memory-map，啟動幾乎不需時間
+    """
+
+    def __init__(self, vocab: dict, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                 num_docs: int, tokenizer: Callable[[str], List[str]] = cjk_tokenize):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.num_docs = num_docs
+        self.tokenizer = tokenizer
+
+    # --- 2. 建立索引 ---
+    @classmethod
+    def build(cls, docs: Sequence[str], k1: float = K1, b: float = B, epsilon: float = EPSILON,
+              tokenizer: Callable[[str], List[str]] = cjk_tokenize) -> "BM25Index":
+        tokenized = [tokenizer(d) for d in docs]
+        num_docs = len(tokenized)
+        doc_len = np.array([len(t) for t in tokenized], dtype=np.float32)
+        avgdl = float(doc_len.mean()) if num_docs and doc_len.sum() else 1.0
+
+        postings: dict = {}
+        for doc_id, tokens in enumerate(tokenized):
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        # idf 與 BM25Okapi 相同：負值以平均 idf * epsilon 取代
+        idf = {t: math.log(num_docs - len(p) + 0.5) - math.log(len(p) + 0.5) for t, p in postings.items()}
+        floor = epsilon * (sum(idf.values()) / len(idf)) if idf else 0.0
+        idf = {t: (v if v >= 0 else floor) for t, v in idf.items()}
+
+        vocab = {t: i for i, t in enumerate(sorted(postings))}
+        indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for t, i in vocab.items():
+            indptr[i + 1] = len(postings[t])
+        np.cumsum(indptr, out=indptr)
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=np.float32)
+        norm = k1 * (1 - b + b * doc_len / avgdl)
+        for t, i in vocab.items():
+            ids, tfs = zip(*postings[t])
+            ids = np.asarray(ids, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            s, e = indptr[i], indptr[i + 1]
+            indices[s:e] = ids
+            data[s:e] = idf[t] * tfs * (k1 + 1) / (tfs + norm[ids])
+        return cls(vocab, indptr, indices, data, num_docs, tokenizer)
+
+    # --- 3. 查詢 ---
+    def scores(self, query: str) -> np.ndarray:
+        """所有文件的 BM25 分數 (重複的查詢詞會重複計分，與 BM25Okapi 相同)"""
+        term_ids = [self.vocab[t] for t in self.tokenizer(query) if t in self.vocab]
+        if not term_ids:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        rows = [slice(self.indptr[i], self.indptr[i + 1]) for i in term_ids]
+        idx = np.concatenate([self.indices[r] for r in rows])
+        w = np.concatenate([self.data[r] for r in rows])
+        return np.bincount(idx, weights=w, minlength=self.num_docs).astype(np.float32)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """回傳分數 > 0 的前 k 筆 (doc_id, score)，依分數遞減"""
+        scores = self.scores(query)
+        k = min(k, self.num_docs)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    # --- 4. 儲存 / 載入 ---
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "indptr.npy", self.indptr)
+        np.save(path / "indices.npy", self.indices)
+        np.save(path / "data.npy", self.data)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"num_docs": self.num_docs, "vocab": self.vocab}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, tokenizer: Callable[[str], List[str]] = cjk_tokenize) -> "BM25Index":
+        path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(path / f"{name}.npy", mmap_mode="r") for name in ("indptr", "indices", "data")]
+        return cls(meta["vocab"], *arrays, num_docs=meta["num_docs"], tokenizer=tokenizer)
+
+    @classmethod
+    def load_or_build(cls, docs: Sequence[str], cache_dir=CACHE_DIR, k1: float = K1, b: float = B,
+                      tokenizer: Callable[[str], List[str]] = cjk_tokenize, name: Optional[str] = None) -> "BM25Index":
+        """以文件內容 + 參數的雜湊作為索引目錄；內容未變時直接 mmap 載入"""
+        h = hashlib.sha256(json.dumps([k1, b, getattr(tokenizer, "__name__", ""), list(map(str, docs))],
+                                      ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+        path = Path(cache_dir) / (f"{name}-{h}" if name else h)
+        if (path / "meta.json").exists():
+            return cls.load(path, tokenizer)
+        index = cls.build(docs, k1=k1, b=b, tokenizer=tokenizer)
+        index.save(path)
+        return index
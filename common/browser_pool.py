@@ -0,0 +1,216 @@
+import asyncio
+import atexit
+import io
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+# --- 1. 預設配置 ---
+POOL_SIZE = 4                  # 同時載入的頁面數 (= browser context 數)
+NAV_TIMEOUT_MS = 30_000
+NETWORK_IDLE_TIMEOUT_MS = 5_000  # 等不到 networkidle 時 (長輪詢 / 廣告) 不視為失敗
+READY_SELECTOR = "article, main, [role=main], body"
+VIEWPORT = {"width": 1280, "height": 800}
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+)
+FULL_PAGE_MAX_HEIGHT = 4000   # 整頁截圖的高度上限 (px)
+MIN_TEXT_CHARS = 500           # DOM 文字少於此字數視為擷取失敗，改用截圖
+IMAGE_HEAVY_RATIO = 0.4        # 首屏被圖片覆蓋的比例超過此值時另附截圖
+IMAGE_MAX_WIDTH = 1024         # 送給 VLM 前縮圖的寬度上限
+IMAGE_FORMAT = "WEBP"          # 縮圖格式 (WEBP / JPEG)
+IMAGE_QUALITY = 70
+BLOCKED_RESOURCE_TYPES = {"font", "media"}
+BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "google-analytics.com", "googletagmanager.com",
+    "facebook.net", "scorecardresearch.com", "adservice.google.com", "hotjar.com",
+)
+
+
+# 類 readability 的主文擷取：優先取 article / main，去掉導覽、頁尾、側欄等雜訊；
+# 同時估算首屏被圖片 (img / canvas / video / svg) 覆蓋的比例
+EXTRACT_JS = """
+() => {
+    const root = document.querySelector('article') || document.querySelector('main, [role=main]') || document.body;
+    const clone = root.cloneNode(true);
+    clone.querySelectorAll('script, style, noscript, nav, header, footer, aside, form, iframe, [role=navigation], [aria-hidden=true]')
+        .forEach(el => el.remove());
+    // 放到畫面外再讀 innerText：脫離文件的節點沒有排版，區塊間不會換行
+    clone.style.cssText = 'position:absolute;left:-99999px;top:0;width:' + root.clientWidth + 'px';
+    document.body.appendChild(clone);
+    const text = (clone.innerText || '').replace(/\\n\\s*\\n+/g, '\\n').trim();
+    clone.remove();
+    const vw = window.innerWidth, vh = window.innerHeight;
+    let covered = 0;
+    for (const el of document.querySelectorAll('img, picture, canvas, video, svg')) {
+        const r = el.getBoundingClientRect();
+        const w = Math.max(0, Math.min(r.right, vw) - Math.max(r.left, 0));
+        const h = Math.max(0, Math.min(r.bottom, vh) - Math.max(r.top, 0));
+        if (w * h >= 100 * 100) covered += w * h;
+    }
+    return {text, image_ratio: Math.min(1, covered / (vw * vh))};
+}
+"""
+
+
+def downscale(image: bytes, max_width: int = IMAGE_MAX_WIDTH, fmt: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY) -> Tuple[bytes, str]:
+    """縮圖並轉成 WebP / JPEG，回傳 (bytes, MIME)；未安裝 Pillow 時原樣回傳 (截圖本身已是 JPEG)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return image, "image/jpeg"
+    img = Image.open(io.BytesIO(image)).convert("RGB")
+    if img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, quality=quality)
+    return buf.getvalue(), f"image/{fmt.lower()}"
+
+
+def needs_screenshot(text: str, image_ratio: float) -> Optional[str]:
+    """分層擷取的判斷：None = 文字即可；"viewport" = 文字擷取失敗；"full_page" = 圖片為主的頁面"""
+    if image_ratio >= IMAGE_HEAVY_RATIO:
+        return "full_page"
+    if len(text) < MIN_TEXT_CHARS:
+        return "viewport"
+    return None
+
+
+def _is_tracker(url: str) -> bool:
+    host = urlparse(url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in BLOCKED_HOSTS)
+
+
+class BrowserPool:
+    """
+    常駐的 headless Chromium + browser context 池 (async Playwright)：
+    - 在背景執行緒的 event loop 中執行，同步程式 (LangGraph 節點) 可直接呼叫 fetch / fetch_many
+    - 同時載入的頁數受 size 限制；以 networkidle + selector 判斷就緒，取代固定 sleep
+    - 封鎖字型、影音與追蹤器請求以縮短載入時間
+    - 先擷取 DOM 主文；screenshot="auto" 時只有文字不足或圖片為主的頁面才截圖
+    """
+
+    def __init__(self, size: int = POOL_SIZE, block_resources: bool = True, headless: bool = True):
+        self.size = size
+        self.block_resources = block_resources
+        self.headless = headless
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._started = False
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    # --- 2. 啟動 / 關閉 (第一次使用時才啟動瀏覽器) ---
+    async def _start(self):
+        from playwright.async_api import async_playwright
+
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(headless=self.headless)
+        self._contexts: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.size):
+            context = await self._browser.new_context(user_agent=USER_AGENT, viewport=VIEWPORT)
+            if self.block_resources:
+                await context.route("**/*", self._route)
+            await self._contexts.put(context)
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if not self._started:
+                self._run(self._start())
+                self._started = True
+
+    async def _route(self, route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or _is_tracker(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _close(self):
+        await self._browser.close()
+        await self._pw.stop()
+
+    def close(self):
+        if self._started:
+            self._started = False
+            try:
+                self._run(self._close())
+            except Exception:
+                pass
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # --- 3. 載入頁面 ---
+    async def _fetch(self, url: str, screenshot: Union[bool, str] = "auto") -> Dict:
+        context = await self._contexts.get()
+        page = await context.new_page()
+        start = time.perf_counter()
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=NAV_TIMEOUT_MS)
+            await page.wait_for_selector(READY_SELECTOR, state="attached", timeout=NAV_TIMEOUT_MS)
+            await self._settle(page)
+            # 向下捲動觸發懶加載，再等網路靜止
+            await page.mouse.wheel(0, VIEWPORT["height"])
+            await self._settle(page)
+            await page.mouse.wheel(0, -VIEWPORT["height"])
+            extracted = await page.evaluate(EXTRACT_JS)
+
+            if screenshot == "auto":
+                shot = needs_screenshot(extracted["text"], extracted["image_ratio"])
+            else:
+                shot = "viewport" if screenshot else None
+            image = None
+            if shot:
+                image = await self._screenshot(page, full_page=shot == "full_page")
+            return {
+                "url": url,
+                "final_url": page.url,
+                "title": await page.title(),
+                "text": extracted["text"],
+                "image_ratio": round(extracted["image_ratio"], 3),
+                "screenshot": image,  # JPEG bytes；不需截圖時為 None
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+        finally:
+            await page.close()
+            await self._contexts.put(context)
+
+    @staticmethod
+    async def _screenshot(page, full_page: bool) -> bytes:
+        # scale="css" 避免高 DPI 放大；整頁截圖限制高度，避免無限捲動頁產生超長圖
+        options = {"type": "jpeg", "quality": 80, "scale": "css"}
+        if full_page:
+            height = await page.evaluate("document.documentElement.scrollHeight")
+            clip = {"x": 0, "y": 0, "width": VIEWPORT["width"], "height": min(height, FULL_PAGE_MAX_HEIGHT)}
+            return await page.screenshot(full_page=True, clip=clip, **options)
+        return await page.screenshot(**options)
+
+    @staticmethod
+    async def _settle(page):
+        try:
+            await page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT_MS)
+        except Exception:
+            pass
+
+    async def _fetch_many(self, urls: Sequence[str], screenshot: Union[bool, str]) -> List[Optional[Dict]]:
+        results = await asyncio.gather(*(self._fetch(u, screenshot) for u in urls), return_exceptions=True)
+        return [r if not isinstance(r, BaseException) else {"url": u, "error": repr(r)} for u, r in zip(urls, results)]
+
+    def fetch(self, url: str, screenshot: Union[bool, str] = "auto") -> Dict:
+        """
+        載入單一網址，回傳 {url, final_url, title, text, image_ratio, screenshot(bytes 或 None), seconds}；
+        screenshot："auto" 依 needs_screenshot 決定 / True 一律截首屏 / False 只取文字。失敗時拋出例外
+        """
+        self._ensure_started()
+        return self._run(self._fetch(url, screenshot))
+
+    def fetch_many(self, urls: Sequence[str], screenshot: Union[bool, str] = "auto") -> List[Dict]:
+        """並行載入多個網址 (最多 size 個同時進行)；失敗的網址回傳 {url, error}"""
+        self._ensure_started()
+        return self._run(self._fetch_many(list(urls), screenshot))
@@ -0,0 +1,245 @@
+import codecs
+import mmap
+import re
+from collections import deque
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# --- 1. 預設配置 ---
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")          # 與 LangChain RecursiveCharacterTextSplitter 相同
+CJK_SEPARATORS = ("\n\n", "\n", "。", "！", "？", "；", "，", " ", "")
+SENTENCE_END = re.compile(r"[。！？!?\n]+")            # 與 day5 語義切塊的分句規則相同
+BLOCK_BYTES = 1 << 20                                  # 串流讀檔時每次解碼的位元組數
+
+Span = Tuple[int, int]
+STRATEGIES = ("fixed", "sliding", "recursive", "sentence")
+
+
+def _strip(text: str, start: int, end: int) -> Optional[Span]:
+    """以位移調整取代 str.strip()，全空白時回傳 None"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+# --- 2. 各切塊策略 (只產生 (start, end)，不複製字串) ---
+def fixed_spans(start: int, end: int, size: int) -> Iterator[Span]:
+    for s in range(start, end, size):
+        yield s, min(s + size, end)
+
+
+def sliding_spans(start: int, end: int, size: int, overlap: int) -> Iterator[Span]:
+    """滑動視窗：步長 size - overlap，最後一塊若已被前一塊完整涵蓋則不再產生"""
+    step = size - overlap
+    s = start
+    while s < end and (s == start or s + overlap < end):
+        yield s, min(s + size, end)
+        s += step
+
+
+def _sentences(text: str, start: int, end: int) -> Iterator[Span]:
+    pos = start
+    for m in SENTENCE_END.finditer(text, start, end):
+        sentence = _strip(text, pos, m.end())
+        pos = m.end()
+        if sentence:
+            yield sentence
+    tail = _strip(text, pos, end)
+    if tail:
+        yield tail
+
+
+def sentence_spans(text: str, start: int, end: int, size: Optional[int] = None) -> Iterator[Span]:
+    """依句尾標點切句；給定 size 時將相鄰句子合併到不超過 size"""
+    cur = None
+    for s, e in _sentences(text, start, end):
+        if size is None:
+            yield s, e
+        elif cur is None:
+            cur = [s, e]
+        elif e - cur[0] > size:
+            yield cur[0], cur[1]
+            cur = [s, e]
+        else:
+            cur[1] = e
+    if cur is not None:
+        yield cur[0], cur[1]
+
+
+def _merge(text: str, pieces: Sequence[Span], size: int, overlap: int, out: List[Span]):
+    # 與 LangChain TextSplitter._merge_splits 相同的合併規則 (keep_separator=True，分隔符長度為 0)
+    cur: deque = deque()
+    total = 0
+    for s, e in pieces:
+        n = e - s
+        if total + n > size and cur:
+            span = _strip(text, cur[0][0], cur[-1][1])
+            if span:
+                out.append(span)
+            while total > overlap or (total + n > size and total > 0):
+                ps, pe = cur.popleft()
+                total -= pe - ps
+        cur.append((s, e))
+        total += n
+    if cur:
+        span = _strip(text, cur[0][0], cur[-1][1])
+        if span:
+            out.append(span)
+
+
+def recursive_spans(
+    text: str, start: int, end: int, size: int, overlap: int, separators: Sequence[str] = DEFAULT_SEPARATORS
+) -> List[Span]:
+    """與 RecursiveCharacterTextSplitter 相同的切塊結果，但以位移表示"""
+    out: List[Span] = []
+    _recursive(text, start, end, size, overlap, list(separators), out)
+    return out
+
+
+def _recursive(text: str, start: int, end: int, size: int, overlap: int, separators: List[str], out: List[Span]):
+    separator, rest = separators[-1], []
+    for i, sep in enumerate(separators):
+        if not sep:
+            separator = sep
+            break
+        if text.find(sep, start, end) != -1:
+            separator, rest = sep, separators[i + 1:]
+            break
+
+    if not separator:
+        # 逐字切分再合併，等同滑動視窗；直接以算術產生，不建立逐字列表
+        for s, e in sliding_spans(start, end, size, overlap):
+            span = _strip(text, s, e)
+            if span:
+                out.append(span)
+        return
+
+    # 分隔符附在下一段的開頭 (keep_separator=True)
+    pieces, pos = [], start
+    for m in _find_all(text, separator, start, end):
+        if m > pos:
+            pieces.append((pos, m))
+        pos = m
+    if end > pos:
+        pieces.append((pos, end))
+
+    good: List[Span] = []
+    for s, e in pieces:
+        if e - s < size:
+            good.append((s, e))
+            continue
+        if good:
+            _merge(text, good, size, overlap, out)
+            good = []
+        if not rest:
+            out.append((s, e))
+        else:
+            _recursive(text, s, e, size, overlap, rest, out)
+    if good:
+        _merge(text, good, size, overlap, out)
+
+
+def _find_all(text: str, sep: str, start: int, end: int) -> Iterator[int]:
+    """不重疊地找出 sep 在 text[start:end] 中的所有位置 (同 re.split 的行為)"""
+    i = text.find(sep, start, end)
+    while i != -1:
+        yield i
+        i = text.find(sep, i + len(sep), end)
+
+
+# --- 3. 統一入口 ---
+class Chunker:
+    """
+    可抽換策略的切塊器：fixed / sliding / recursive / sentence
+    - spans()：惰性產生 (start, end)，不複製字串
+    - iter_file()：以 mmap + 增量解碼串流讀檔，超大檔案不需整份載入
+    """
+
+    def __init__(
+        self,
+        strategy: str = "fixed",
+        size: int = 300,
+        overlap: int = 0,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+        strip: Optional[bool] = None,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的切塊策略：{strategy}，可用：{STRATEGIES}")
+        if overlap >= size:
+            raise ValueError("overlap 必須小於 size")
+        self.strategy = strategy
+        self.size = size
+        self.overlap = overlap
+        self.separators = tuple(separators)
+        # recursive / sentence 與 LangChain 一樣會去除頭尾空白；fixed / sliding 預設保留原文
+        self.strip = strategy in ("recursive", "sentence") if strip is None else strip
+
+    @property
+    def signature(self) -> str:
+        """切塊設定字串，可作為增量匯入 manifest 的 config"""
+        return f"{self.strategy}/{self.size}/{self.overlap}/{int(self.strip)}/{'|'.join(map(repr, self.separators))}"
+
+    def spans(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Span]:
+        end = len(text) if end is None else end
+        if self.strategy == "fixed":
+            raw = fixed_spans(start, end, self.size)
+        elif self.strategy == "sliding":
+            raw = sliding_spans(start, end, self.size, self.overlap)
+        elif self.strategy == "recursive":
+            yield from recursive_spans(text, start, end, self.size, self.overlap, self.separators)
+            return
+        else:
+            yield from sentence_spans(text, start, end, self.size)
+            return
+        for s, e in raw:
+            span = _strip(text, s, e) if self.strip else (s, e)
+            if span:
+                yield span
+
+    def split(self, text: str) -> List[str]:
+        """相容舊介面：回傳切塊字串列表"""
+        return [text[s:e] for s, e in self.spans(text)]
+
+    def __call__(self, text: str) -> List[str]:
+        return self.split(text)
+
+    def iter_file(self, path, encoding: str = "utf-8", block_bytes: int = BLOCK_BYTES) -> Iterator[Tuple[int, int, str]]:
+        """
+        串流切塊，產生 (start, end, chunk)，位移為整份檔案的字元位置。
+        緩衝區只保留「尚未確定的最後幾塊 + 新讀入的區塊」，記憶體與檔案大小無關。
+        recursive 策略的分隔符是依緩衝區內容選擇，區塊邊界附近的切點可能與整份處理略有差異。
+        """
+        base, buf = 0, ""
+        for block, is_last in _iter_decoded_blocks(path, encoding, block_bytes):
+            buf += block
+            spans = list(self.spans(buf))
+            if is_last:
+                for s, e in spans:
+                    yield base + s, base + e, buf[s:e]
+                return
+            # 最後一塊 (或觸及緩衝區尾端的塊) 可能因後續內容而改變，留待下一輪
+            done = 0
+            for s, e in spans[:-1]:
+                if e >= len(buf):
+                    break
+                yield base + s, base + e, buf[s:e]
+                done += 1
+            carry = spans[done][0] if spans else len(buf)
+            buf = buf[carry:]
+            base += carry
+
+
+def _iter_decoded_blocks(path, encoding: str, block_bytes: int) -> Iterator[Tuple[str, bool]]:
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空檔案無法 mmap
+            yield "", True
+            return
+        with mm:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            size = len(mm)
+            for offset in range(0, size, block_bytes):
+                is_last = offset + block_bytes >= size
+                yield decoder.decode(mm[offset:offset + block_bytes], final=is_last), is_last
@@ -0,0 +1,170 @@
+import hashlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from common.converters import CONVERTERS, Converter, Page
+
+# --- 1. 預設配置 ---
+CACHE_DIR = Path(__file__).resolve().parents[1] / ".cache" / "conversions"
+_CREATION_DATE = re.compile(rb"/CreationDate\([^)]*\)")
+
+
+def _sha256_file(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _key(*parts) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def page_fingerprints(path) -> List[str]:
+    """
+    每頁抽出成單頁 PDF 後取 SHA-256；只改動部分頁面時，其餘頁的指紋不變。
+    PDFium 另存時的 /CreationDate 與 trailer 的 /ID 每次不同，雜湊前先去掉。
+    """
+    import pypdfium2 as pdfium
+
+    src = pdfium.PdfDocument(str(path))
+    try:
+        out = []
+        for i in range(len(src)):
+            single = pdfium.PdfDocument.new()
+            single.import_pages(src, [i])
+            buf = io.BytesIO()
+            single.save(buf)
+            single.close()
+            data = buf.getvalue()
+            data = _CREATION_DATE.sub(b"", data[:data.rfind(b"trailer")])
+            out.append(hashlib.sha256(data).hexdigest())
+        return out
+    finally:
+        src.close()
+
+
+class ConversionCache:
+    """
+    轉換結果快取，鍵為 (檔案 SHA-256, 轉換器名稱, pipeline 參數)：
+    - docs/<key>.md ：整份 Markdown
+    - pages/<key>.md：單頁 Markdown，鍵為 (頁面指紋, 轉換器, 參數)；修改過的 PDF 只重轉變動的頁
+    多個行程可共用同一目錄 (寫入採暫存檔 + rename)
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        (self.cache_dir / "docs").mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / "pages").mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.page_hits = 0
+        self.page_misses = 0
+
+    def _read(self, kind: str, key: str) -> Optional[str]:
+        path = self.cache_dir / kind / f"{key}.md"
+        return path.read_text(encoding="utf-8") if path.exists() else None
+
+    def _write(self, kind: str, key: str, text: str):
+        path = self.cache_dir / kind / f"{key}.md"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def convert(self, path, name: str, options: dict, converter: Converter) -> str:
+        doc_key = _key(_sha256_file(path), name, options)
+        markdown = self._read("docs", doc_key)
+        if markdown is not None:
+            self.hits += 1
+            return markdown
+        self.misses += 1
+
+        if hasattr(converter, "pages") and str(path).lower().endswith(".pdf"):
+            markdown = self._convert_pages(path, name, options, converter)
+        else:
+            markdown = converter(str(path))
+        self._write("docs", doc_key, markdown)
+        return markdown
+
+    def _convert_pages(self, path, name: str, options: dict, converter) -> str:
+        keys = [_key(fp, name, options) for fp in page_fingerprints(path)]
+        pages: Dict[int, str] = {}
+        for n, key in enumerate(keys, start=1):
+            text = self._read("pages", key)
+            if text is not None:
+                pages[n] = text
+        missing = [n for n in range(1, len(keys) + 1) if n not in pages]
+        self.page_hits += len(pages)
+        self.page_misses += len(missing)
+
+        if missing:
+            fresh = converter.pages(str(path), missing)
+            for n in missing:
+                pages[n] = fresh.get(n, "")
+                self._write("pages", keys[n - 1], pages[n])
+        sep = getattr(converter, "page_separator", "\n\n")
+        return sep.join(pages[n] for n in sorted(pages))
+
+    def iter_pages(self, path, name: str, options: dict, converter) -> Iterator[Page]:
+        """
+        串流版本：依頁序交出 (頁碼, Markdown)，已快取的頁直接讀檔，其餘頁由轉換器逐頁產生並寫入快取。
+        不支援逐頁的轉換器 / 非 PDF 檔則整份轉換後當成第 1 頁交出。
+        """
+        if not (hasattr(converter, "pages") and str(path).lower().endswith(".pdf")):
+            yield 1, self.convert(path, name, options, converter)
+            return
+
+        keys = [_key(fp, name, options) for fp in page_fingerprints(path)]
+        cached = {n for n, key in enumerate(keys, start=1) if (self.cache_dir / "pages" / f"{key}.md").exists()}
+        missing = [n for n in range(1, len(keys) + 1) if n not in cached]
+        self.page_hits += len(cached)
+        self.page_misses += len(missing)
+
+        if not missing:
+            fresh = iter(())
+        elif hasattr(converter, "iter_pages"):
+            fresh = converter.iter_pages(str(path), missing)
+        else:
+            fresh = iter(sorted(converter.pages(str(path), missing).items()))
+        for n, key in enumerate(keys, start=1):
+            if n in cached:
+                yield n, self._read("pages", key)
+                continue
+            m, text = next(fresh)
+            assert m == n, f"轉換器交出的頁序不符：預期 {n}，得到 {m}"
+            self._write("pages", key, text)
+            yield n, text
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "page_hits": self.page_hits, "page_misses": self.page_misses}
+
+
+class CachedConverter:
+    """包裝 CONVERTERS[name](**options)，轉換結果經 ConversionCache 快取"""
+
+    def __init__(self, name: str, cache_dir=CACHE_DIR, **options):
+        self.name = name
+        self.options = options
+        self.converter = CONVERTERS[name](**options)
+        self.cache = ConversionCache(cache_dir)
+
+    @property
+    def page_separator(self) -> str:
+        return getattr(self.converter, "page_separator", "\n\n")
+
+    def __call__(self, path: str) -> str:
+        return self.cache.convert(path, self.name, self.options, self.converter)
+
+    def iter_pages(self, path: str) -> Iterator[Page]:
+        return self.cache.iter_pages(path, self.name, self.options, self.converter)
+
+
+def cached_converter(name: str, cache_dir=CACHE_DIR, **options) -> Converter:
+    """可 pickle 的工廠 (搭配 functools.partial)，可直接交給 ConversionFarm"""
+    return CachedConverter(name, cache_dir, **options)
@@ -0,0 +1,124 @@
+"""
+文件轉換農場：以行程池並行轉換多份文件，完成一份就交出一份
+
+命令列：python -m common.convert_farm "CW/05/*.pdf" --converter docling --out-dir out/
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.convert_cache import cached_converter
+from common.converters import CONVERTERS, Converter
+
+logger = logging.getLogger(__name__)
+
+# --- 1. 預設配置 ---
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+SUFFIXES = (".pdf", ".docx", ".pptx", ".html", ".png", ".jpg", ".jpeg")
+
+
+def expand_inputs(inputs: Union[str, Iterable[str]], suffixes=SUFFIXES) -> List[str]:
+    """接受檔案、資料夾或 glob；資料夾只取支援的副檔名，結果去重並維持順序"""
+    if isinstance(inputs, (str, Path)):
+        inputs = [inputs]
+    paths: List[str] = []
+    for item in map(str, inputs):
+        if os.path.isdir(item):
+            paths += sorted(str(p) for p in Path(item).iterdir() if p.suffix.lower() in suffixes)
+        elif glob.has_magic(item):
+            paths += sorted(glob.glob(item, recursive=True))
+        else:
+            paths.append(item)
+    return list(dict.fromkeys(paths))
+
+
+# --- 2. 子行程：每個行程只建立一次轉換器 ---
+_CONVERTER: Optional[Converter] = None
+
+
+def _init_worker(factory: Callable[[], Converter]):
+    global _CONVERTER
+    _CONVERTER = factory()
+
+
+def _convert(path: str) -> dict:
+    start = time.perf_counter()
+    try:
+        markdown = _CONVERTER(path)
+        return {"path": path, "markdown": markdown, "seconds": round(time.perf_counter() - start, 3), "error": None}
+    except Exception as e:
+        return {"path": path, "markdown": None, "seconds": round(time.perf_counter() - start, 3), "error": repr(e)}
+
+
+class ConversionFarm:
+    """
+    - factory：回傳 path -> Markdown 的工廠 (需可 pickle，例如 common.converters 內的函式或其 partial)
+    - convert_iter()：依完成順序產生 {"path", "markdown", "seconds", "error"}，單檔失敗不影響其他檔案
+    """
+
+    def __init__(self, factory: Callable[[], Converter], max_workers: int = MAX_WORKERS):
+        self.factory = factory
+        self.max_workers = max_workers
+        self.results: List[dict] = []
+
+    def convert_iter(self, inputs: Union[str, Iterable[str]]) -> Iterator[dict]:
+        paths = expand_inputs(inputs)
+        self.results = []
+        if not paths:
+            return
+        workers = max(1, min(self.max_workers, len(paths)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.factory,)) as pool:
+            futures = {pool.submit(_convert, p): p for p in paths}
+            for fut in as_completed(futures):
+                try:
+                    result = fut.result()
+                except Exception as e:  # 子行程崩潰或轉換器初始化失敗
+                    result = {"path": futures[fut], "markdown": None, "seconds": 0.0, "error": repr(e)}
+                self.results.append(result)
+                if result["error"]:
+                    logger.error(f"轉換失敗 {result['path']} ({result['seconds']}s)：{result['error']}")
+                else:
+                    logger.info(f"轉換完成 {result['path']} ({result['seconds']}s)")
+                yield result
+
+    def summary(self) -> dict:
+        ok = [r for r in self.results if not r["error"]]
+        return {
+            "documents": len(self.results),
+            "succeeded": len(ok),
+            "failed": [r["path"] for r in self.results if r["error"]],
+            "seconds": {r["path"]: r["seconds"] for r in self.results},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="檔案、資料夾或 glob")
+    parser.add_argument("--converter", choices=sorted(CONVERTERS), default="docling")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--no-cache", action="store_true", help="不使用轉換結果快取")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    factory = CONVERTERS[args.converter] if args.no_cache else partial(cached_converter, args.converter)
+    farm = ConversionFarm(factory, max_workers=args.workers)
+    for result in farm.convert_iter(args.inputs):
+        if result["markdown"] is not None:
+            out = out_dir / f"{Path(result['path']).stem}_{args.converter}.md"
+            out.write_text(result["markdown"], encoding="utf-8")
+    print(farm.summary())
+
+
+if __name__ == "__main__":
+    main()
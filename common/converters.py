@@ -0,0 +1,166 @@
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# 各轉換器的工廠函式：回傳 path -> Markdown 的函式
+# 套件在工廠內才 import，讓轉換農場的每個子行程各自建立一次轉換器
+# 支援逐頁轉換的轉換器另提供 pages(path, page_numbers) -> {頁碼: Markdown}，頁碼從 1 開始
+
+Converter = Callable[[str], str]
+PAGE_BREAK = "\n\n--- PAGE BREAK ---\n\n"
+PAGE_WINDOW = 16    # Docling 串流轉換時每次處理的頁數，決定記憶體上限
+REOPEN_EVERY = 64   # pdfplumber 串流擷取時每幾頁重新開檔一次
+
+Page = Tuple[int, str]  # (頁碼, Markdown)
+
+
+def _runs(page_numbers: Sequence[int]) -> List[tuple]:
+    """[1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]：連續頁合併成一次轉換"""
+    runs: List[list] = []
+    for n in sorted(page_numbers):
+        if runs and n == runs[-1][1] + 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return [tuple(r) for r in runs]
+
+
+class PdfplumberConverter:
+    page_separator = ""  # 每頁已自帶分頁標記
+
+    def __init__(self):
+        import pdfplumber
+        self._open = pdfplumber.open
+
+    def iter_pages(self, path: str, page_numbers: Optional[Iterable[int]] = None) -> Iterator[Page]:
+        """
+        逐頁擷取並立即釋放該頁的解析快取 (page.close())。
+        pdfminer 會把解碼過的內容串流留在已開啟的文件上，因此每 REOPEN_EVERY 頁重新開檔，記憶體不隨頁數增加
+        """
+        if page_numbers is None:
+            with self._open(path) as pdf:
+                page_numbers = range(1, len(pdf.pages) + 1)
+        numbers = iter(page_numbers)
+        while True:
+            batch = list(islice(numbers, REOPEN_EVERY))
+            if not batch:
+                return
+            with self._open(path) as pdf:
+                for n in batch:
+                    page = pdf.pages[n - 1]
+                    text = page.extract_text()
+                    page.close()
+                    yield n, (text + PAGE_BREAK if text else "")
+
+    def pages(self, path: str, page_numbers: Sequence[int]) -> Dict[int, str]:
+        return dict(self.iter_pages(path, page_numbers))
+
+    def __call__(self, path: str) -> str:
+        return "".join(text for _, text in self.iter_pages(path))
+
+
+class DoclingConverter:
+    """
+    - 預設：Docling 標準 PDF pipeline
+    - ocr=True：以 RapidOCR 辨識 (CW06)
+    - vlm_url：以遠端 VLM 逐頁轉 Markdown，page_concurrency 頁同時送出 (HW7)
+    """
+    page_separator = "\n\n"
+
+    def __init__(
+        self,
+        ocr: bool = False,
+        vlm_url: Optional[str] = None,
+        vlm_model: Optional[str] = None,
+        max_tokens: int = 4096,
+        page_concurrency: int = 4,
+    ):
+        from docling.datamodel.base_models import InputFormat
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+
+        if vlm_url:
+            from docling.datamodel.pipeline_options import VlmPipelineOptions
+            from docling.datamodel.pipeline_options_vlm_model import ApiVlmOptions, ResponseFormat
+            from docling.pipeline.vlm_pipeline import VlmPipeline
+
+            opts = VlmPipelineOptions(enable_remote_services=True)
+            opts.vlm_options = ApiVlmOptions(
+                url=vlm_url,
+                params=dict(model=vlm_model, max_tokens=max_tokens),
+                response_format=ResponseFormat.MARKDOWN,
+                concurrency=page_concurrency,
+            )
+            pdf_option = PdfFormatOption(pipeline_options=opts, pipeline_cls=VlmPipeline)
+        elif ocr:
+            from docling.datamodel.pipeline_options import PdfPipelineOptions, RapidOcrOptions
+
+            opts = PdfPipelineOptions()
+            opts.do_ocr = True
+            opts.ocr_options = RapidOcrOptions()
+            pdf_option = PdfFormatOption(pipeline_options=opts)
+        else:
+            pdf_option = None
+        self.converter = DocumentConverter(format_options={InputFormat.PDF: pdf_option} if pdf_option else None)
+
+    def iter_pages(self, path: str, page_numbers: Optional[Sequence[int]] = None, window: int = PAGE_WINDOW) -> Iterator[Page]:
+        """
+        每次只轉換 window 頁 (page_range) 並逐頁匯出，記憶體上限與總頁數無關。
+        跨頁的表格會在頁界被切開，與整份匯出可能略有差異。
+        """
+        if page_numbers is None:
+            import pypdfium2 as pdfium
+            doc = pdfium.PdfDocument(path)
+            page_numbers = range(1, len(doc) + 1)
+            doc.close()
+        for first, last in _runs(page_numbers):
+            for start in range(first, last + 1, window):
+                end = min(start + window - 1, last)
+                doc = self.converter.convert(path, page_range=(start, end)).document
+                for n in range(start, end + 1):
+                    yield n, doc.export_to_markdown(page_no=n)
+                del doc
+
+    def pages(self, path: str, page_numbers: Sequence[int]) -> Dict[int, str]:
+        return dict(self.iter_pages(path, page_numbers))
+
+    def __call__(self, path: str) -> str:
+        return self.converter.convert(path).document.export_to_markdown()
+
+
+def stream_markdown(pages: Iterable[Page], output_md, separator: str = "") -> Iterator[Page]:
+    """邊寫入輸出檔邊交出每一頁，呼叫端可在整份文件完成前就開始切塊 / 嵌入"""
+    with open(output_md, "w", encoding="utf-8") as f:
+        for i, (n, text) in enumerate(pages):
+            f.write(text if i == 0 else separator + text)
+            f.flush()
+            yield n, text
+
+
+def pdfplumber_converter() -> Converter:
+    return PdfplumberConverter()
+
+
+def markitdown_converter() -> Converter:
+    from markitdown import MarkItDown
+
+    md = MarkItDown()
+    return lambda path: md.convert(path).text_content
+
+
+def docling_converter(**options) -> Converter:
+    return DoclingConverter(**options)
+
+
+def auto_converter(**options) -> Converter:
+    """逐頁路由 (common.pdf_router.PageRouter)：文字頁 pdfplumber、表格頁 Docling、掃描頁 OCR"""
+    from common.pdf_router import PageRouter
+    return PageRouter(**options)
+
+
+CONVERTERS = {
+    "pdfplumber": pdfplumber_converter,
+    "markitdown": markitdown_converter,
+    "docling": docling_converter,
+    "rapidocr": partial(docling_converter, ocr=True),  # 工廠需可 pickle 才能送進行程池
+    "auto": auto_converter,
+}
@@ -0,0 +1,211 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# --- 1. 預設配置 ---
+CACHE_DIR = Path(__file__).resolve().parents[1] / ".cache" / "embeddings"
+MAX_ENTRIES = 200_000   # 向量筆數上限，超過時以 LRU 淘汰
+INITIAL_SLOTS = 1024    # 向量檔初始容量，之後倍增
+KEY_BYTES = 16          # 每個 slot 記錄的 key 雜湊長度，讀取時用來驗證
+
+
+def make_key(model: str, normalize: bool, task_description: Optional[str], text: str) -> str:
+    """以 (model, normalize, task_description, text) 的 SHA-256 作為快取鍵"""
+    raw = json.dumps([model, bool(normalize), task_description or "", text], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _key_hash(key: str) -> np.ndarray:
+    return np.frombuffer(hashlib.sha256(key.encode("utf-8")).digest()[:KEY_BYTES], dtype=np.uint8)
+
+
+class EmbeddingCache:
+    """
+    磁碟式 Embedding 快取：
+    - vectors.f32：float32 向量矩陣 (np.memmap)，每筆佔一個 slot
+    - keys.u8：每個 slot 對應 key 的雜湊，與向量同時寫入
+    - index.json：key -> slot 對照表，依最近使用順序排列 (LRU)，flush() 時才寫回
+    slot 可能在 index.json 寫回前就被淘汰重用 (或程式中斷)，因此載入與讀取時
+    都以 keys.u8 驗證 slot 仍屬於該 key，不符者視為未命中
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_entries: int = MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._vec_path = self.cache_dir / "vectors.f32"
+        self._keys_path = self.cache_dir / "keys.u8"
+        self._index_path = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._keys: Optional[np.memmap] = None
+        self._free: List[int] = []   # 驗證失敗而空出的 slot
+        self._next_slot = 0
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load()
+        atexit.register(self.flush)
+
+    # --- 2. 載入與持久化 ---
+    def _load(self):
+        if not self._index_path.exists():
+            return
+        if not self._vec_path.exists():
+            # 只剩 index.json (向量檔被刪除)：視為全新快取
+            print(f"⚠️ 找不到 {self._vec_path}，重建 Embedding 快取")
+            self._keys_path.unlink(missing_ok=True)
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self._index = OrderedDict((k, s) for k, s in meta["entries"])
+        self._capacity = os.path.getsize(self._vec_path) // (4 * self.dim)
+        self._open_vectors()
+
+        # 丟棄 slot 已被其他 key 覆寫的項目 (舊版快取沒有 keys.u8，全部重建)
+        if self._index:
+            slots = np.fromiter(self._index.values(), dtype=np.int64, count=len(self._index))
+            hashes = np.stack([_key_hash(k) for k in self._index])
+            in_range = slots < self._capacity
+            valid = in_range.copy()
+            valid[in_range] = (self._keys[slots[in_range]] == hashes[in_range]).all(axis=1)
+            if not valid.all():
+                self._index = OrderedDict(
+                    (k, s) for (k, s), ok in zip(self._index.items(), valid) if ok)
+                self._dirty = True
+        # 只有從未寫入 (雜湊全為 0) 的 slot 可重新分配；雜湊屬於其他 key 的 slot 可能是
+        # 共用快取目錄的其他行程寫入的，不能覆寫
+        written = self._keys.any(axis=1)
+        used = set(self._index.values())
+        self._next_slot = int(np.flatnonzero(written)[-1]) + 1 if written.any() else 0
+        self._free = [int(s) for s in np.flatnonzero(~written[:self._next_slot]) if s not in used]
+
+    def _open_vectors(self):
+        self._vectors = np.memmap(self._vec_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dim))
+        # keys.u8 的大小跟著向量檔 (不存在或較短時補零，補零的 slot 不會通過驗證)
+        with open(self._keys_path, "ab") as f:
+            f.truncate(self._capacity * KEY_BYTES)
+        self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode="r+", shape=(self._capacity, KEY_BYTES))
+
+    def _ensure_capacity(self, slots: int):
+        if slots <= self._capacity:
+            return
+        new_capacity = max(INITIAL_SLOTS, self._capacity)
+        while new_capacity < slots:
+            new_capacity *= 2
+        new_capacity = min(new_capacity, self.max_entries)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._keys.flush()
+            self._vectors = self._keys = None
+        with open(self._vec_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self._capacity = new_capacity
+        self._open_vectors()
+
+    def flush(self):
+        """寫回向量與索引 (程式結束時自動呼叫)"""
+        with self._lock:
+            if not self._dirty or self.dim is None:
+                return
+            self._vectors.flush()
+            self._keys.flush()
+            tmp = self._index_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "entries": list(self._index.items())}, f)
+            os.replace(tmp, self._index_path)
+            self._dirty = False
+
+    # --- 3. 查詢與寫入 ---
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """回傳已命中的 {key: vector}，並更新 LRU 順序與統計"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                slot = self._index.get(key)
+                if slot is not None and not np.array_equal(self._keys[slot], _key_hash(key)):
+                    # slot 已屬於其他 key (可能是其他行程寫入)，只移除對照，不回收 slot
+                    del self._index[key]
+                    slot = None
+                if slot is None:
+                    self.misses += 1
+                    continue
+                self._index.move_to_end(key)
+                found[key] = self._vectors[slot].tolist()
+                self.hits += 1
+            if found:
+                self._dirty = True
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(next(iter(items.values())))
+            for key, vec in items.items():
+                if len(vec) != self.dim:
+                    raise ValueError(f"向量維度不符：快取為 {self.dim}，收到 {len(vec)}")
+                slot = self._index.get(key)
+                if slot is None:
+                    slot = self._allocate_slot()
+                # 先作廢雜湊再寫向量，中途中斷時 slot 不會被誤認為有效
+                self._keys[slot] = 0
+                self._vectors[slot] = np.asarray(vec, dtype=np.float32)
+                self._keys[slot] = _key_hash(key)
+                self._index[key] = slot
+                self._index.move_to_end(key)
+            self._dirty = True
+
+    def _allocate_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if len(self._index) < self.max_entries and self._next_slot < self.max_entries:
+            slot = self._next_slot
+            self._ensure_capacity(slot + 1)
+            self._next_slot += 1
+            return slot
+        if self._index:
+            # 淘汰最久未使用的一筆，沿用其 slot
+            _, slot = self._index.popitem(last=False)
+            self.evictions += 1
+            return slot
+        # 容量已滿且全部 slot 都屬於其他 key：從頭覆寫 (對方讀取時驗證失敗，只會變成未命中)
+        self._free = list(range(self._capacity))[::-1]
+        return self._free.pop()
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+            self._free = []
+            self._next_slot = 0
+            self._dirty = True
+
+    # --- 4. 統計 ---
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._index)
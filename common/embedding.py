@@ -0,0 +1,151 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from common.embed_cache import EmbeddingCache, make_key
+from common.http import make_session
+
+# --- 1. 預設配置 ---
+EMBED_URL = "https://ws-04.wade0426.me/embed"
+MAX_BATCH_SIZE = 32            # 每批最多幾段文字
+MAX_BATCH_BYTES = 256 * 1024   # 每批 payload 的文字位元組上限 (UTF-8)
+MAX_IN_FLIGHT = 4              # 同時送出的批次數
+
+
+class EmbeddingClient:
+    """
+    共用的 Embedding 用戶端：
+    - 以 requests.Session 維持連線池 (keep-alive)
+    - 依筆數與位元組數切成小批次 (micro-batching)
+    - 以執行緒池同時送出多個批次，結果依輸入順序組回
+    - 可選配 EmbeddingCache，命中的文字不再呼叫 API
+    """
+
+    def __init__(
+        self,
+        url: str = EMBED_URL,
+        normalize: bool = True,
+        task_description: Optional[str] = None,
+        batch_size: int = MAX_BATCH_SIZE,
+        max_batch_bytes: int = MAX_BATCH_BYTES,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        timeout: float = 60,
+        retries: int = 3,
+        cache: Optional[EmbeddingCache] = None,
+        model: Optional[str] = None,
+    ):
+        self.url = url
+        self.model = model or url
+        self.cache = cache
+        self.normalize = normalize
+        self.task_description = task_description
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+
+        # 連線池大小與同時請求數一致，避免連線被丟棄重建
+        self.session = make_session(pool_size=max_in_flight, retries=retries, backoff_factor=1, methods=("POST",))
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    # --- 2. 批次切分 ---
+    def make_batches(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """回傳 [(start, end), ...]，每批同時受筆數與位元組上限限制"""
+        batches = []
+        start, size = 0, 0
+        for i, text in enumerate(texts):
+            n_bytes = len(text.encode("utf-8"))
+            if i > start and (i - start >= self.batch_size or size + n_bytes > self.max_batch_bytes):
+                batches.append((start, i))
+                start, size = i, 0
+            size += n_bytes
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+
+    def _post(self, batch: List[str]) -> List[List[float]]:
+        payload = {"texts": batch, "normalize": self.normalize, "batch_size": len(batch)}
+        if self.task_description:
+            payload["task_description"] = self.task_description
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    # --- 3. 快取查詢 ---
+    def _split_cached(self, texts: List[str]):
+        """回傳 (keys, 已命中 {key: vec}, 需要呼叫 API 的不重複文字)"""
+        keys = [make_key(self.model, self.normalize, self.task_description, t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in found))
+        return keys, found, missing
+
+    def _merge_cached(self, keys, found, missing, vectors):
+        fresh = {
+            make_key(self.model, self.normalize, self.task_description, t): v
+            for t, v in zip(missing, vectors)
+        }
+        self.cache.put_many(fresh)
+        found.update(fresh)
+        return [found[k] for k in keys]
+
+    # --- 4. 同步 API ---
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """將文字列表轉換為向量列表 (順序與輸入相同)"""
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._embed_remote(texts)
+        keys, found, missing = self._split_cached(texts)
+        vectors = self._embed_remote(missing) if missing else []
+        return self._merge_cached(keys, found, missing, vectors)
+
+    def _embed_remote(self, texts: List[str]) -> List[List[float]]:
+        batches = self.make_batches(texts)
+        if len(batches) == 1:
+            return self._post(texts)
+
+        futures = [self._pool.submit(self._post, texts[s:e]) for s, e in batches]
+        vectors: List[List[float]] = [None] * len(texts)
+        for (s, e), fut in zip(batches, futures):
+            vectors[s:e] = fut.result()
+        return vectors
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    # --- 5. asyncio API ---
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """非同步版本：批次在執行緒池中執行，不阻塞 event loop"""
+        if not texts:
+            return []
+        if self.cache is None:
+            return await self._aembed_remote(texts)
+        keys, found, missing = self._split_cached(texts)
+        vectors = await self._aembed_remote(missing) if missing else []
+        return self._merge_cached(keys, found, missing, vectors)
+
+    async def _aembed_remote(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        batches = self.make_batches(texts)
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._pool, self._post, texts[s:e]) for s, e in batches)
+        )
+        vectors: List[List[float]] = []
+        for part in results:
+            vectors.extend(part)
+        return vectors
+
+    async def aembed_one(self, text: str) -> List[float]:
+        return (await self.aembed([text]))[0]
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.flush()
+        self._pool.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
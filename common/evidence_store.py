@@ -0,0 +1,143 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+# --- 1. 預設配置 ---
+DEDUP_THRESHOLD = 0.92       # 與既有事實的 cosine 相似度達此值視為重複
+SOURCE_TOKEN_BUDGET = 400    # 單一來源的事實超過此 token 數時滾動壓縮
+MIN_FACT_CHARS = 8           # 太短的片段 (標題、編號) 不當成獨立事實
+
+_CJK = re.compile(r"[぀-ヿ㐀-鿿豈-﫿＀-￯]")
+_FACT_SPLIT = re.compile(r"\n+|(?<=[。！？；])")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估 token 數：中日文每字約 1 token，其餘約 4 字元 1 token"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_facts(summary: str) -> List[str]:
+    """將摘要切成條列 / 句子層級的事實"""
+    facts = []
+    for part in _FACT_SPLIT.split(summary):
+        fact = part.strip().lstrip("-•*# ").strip()
+        if len(fact) >= MIN_FACT_CHARS:
+            facts.append(fact)
+    return facts
+
+
+class EvidenceStore:
+    """
+    增量式證據庫，取代每輪把完整 knowledge_base 串進 prompt：
+    - 新摘要切成事實後以 Embedding 比對，與既有事實近乎相同者只記一次
+    - 每個來源保留滾動壓縮的摘要 (超過 SOURCE_TOKEN_BUDGET 時以 compress 重新濃縮)
+    - view(budget) 依資訊量挑選來源，組成不超過 token 預算的內容
+    多個讀取分支可同時呼叫 add()
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        compress: Optional[Callable[[str], str]] = None,
+        threshold: float = DEDUP_THRESHOLD,
+        source_budget: int = SOURCE_TOKEN_BUDGET,
+    ):
+        self.embed = embed
+        self.compress = compress
+        self.threshold = threshold
+        self.source_budget = source_budget
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._vectors: Optional[np.ndarray] = None
+            self._texts: set = set()
+            # url -> {"summary": str, "pending": [事實], "facts": int, "compressing": bool}
+            self.sources: Dict[str, dict] = {}
+            self.facts = 0
+            self.duplicates = 0
+
+    # --- 2. 新增證據 ---
+    def _embed(self, facts: List[str]) -> Optional[np.ndarray]:
+        try:
+            vectors = np.asarray(self.embed(facts), dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Embedding 失敗，改以完全相同文字去重: {e}")
+            return None
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def add(self, source: str, summary: str) -> int:
+        """加入一個來源的摘要，回傳新增 (未重複) 的事實數"""
+        facts = split_facts(summary)
+        if not facts:
+            return 0
+        vectors = self._embed(facts)
+
+        with self._lock:
+            entry = self.sources.setdefault(
+                source, {"summary": "", "pending": [], "facts": 0, "compressing": False})
+            added = 0
+            for i, fact in enumerate(facts):
+                if fact in self._texts:
+                    self.duplicates += 1
+                    continue
+                if vectors is not None:
+                    vec = vectors[i:i + 1]
+                    if self._vectors is not None and float((self._vectors @ vec.T).max()) >= self.threshold:
+                        self.duplicates += 1
+                        continue
+                    self._vectors = vec if self._vectors is None else np.vstack([self._vectors, vec])
+                self._texts.add(fact)
+                entry["pending"].append(fact)
+                entry["facts"] += 1
+                added += 1
+            self.facts += added
+            text = self.source_text(source)
+            compress = (self.compress is not None and not entry["compressing"]
+                        and estimate_tokens(text) > self.source_budget)
+            if compress:
+                entry["compressing"] = True
+                taken = len(entry["pending"])
+
+        # 壓縮 (LLM 呼叫) 不持有鎖；完成後才以新摘要取代已壓縮的事實，失敗時保留原事實
+        if compress:
+            try:
+                summary = self.compress(text)
+            except Exception as e:
+                print(f"⚠️ 來源摘要壓縮失敗，保留原事實: {e}")
+                summary = None
+            with self._lock:
+                entry["compressing"] = False
+                if summary is not None:
+                    entry["summary"] = summary
+                    del entry["pending"][:taken]  # 壓縮期間新加入的事實保留
+        return added
+
+    def source_text(self, source: str) -> str:
+        entry = self.sources[source]
+        return "\n".join(([entry["summary"]] if entry["summary"] else []) + entry["pending"])
+
+    # --- 3. 依 token 預算組出內容 ---
+    def view(self, budget_tokens: int) -> str:
+        """依來源的不重複事實數挑選，直到用完預算；輸出維持加入順序"""
+        with self._lock:
+            blocks = {url: f"【來源】: {url}\n【事實摘要】: {self.source_text(url)}"
+                      for url, entry in self.sources.items() if entry["facts"]}
+            ranked = sorted(blocks, key=lambda url: -self.sources[url]["facts"])
+        chosen, used = set(), 0
+        for url in ranked:
+            cost = estimate_tokens(blocks[url])
+            if used + cost <= budget_tokens:
+                chosen.add(url)
+                used += cost
+        lines = [blocks[url] for url in blocks if url in chosen]
+        if len(chosen) < len(blocks):
+            lines.append(f"(另有 {len(blocks) - len(chosen)} 個來源因長度限制省略)")
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {"sources": len(self.sources), "facts": self.facts, "duplicates": self.duplicates}
@@ -0,0 +1,40 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# --- 1. 預設配置 ---
+RRF_K = 60  # Cormack et al. 建議值
+
+Ranking = Sequence[Tuple[Hashable, float]]  # 依分數遞減的 (doc_id, score)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Ranking],
+    k: int = RRF_K,
+    weights: Optional[Sequence[float]] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple[Hashable, float]]:
+    """RRF：score(d) = Σ w_i / (k + rank_i(d))，只看名次，不受各路分數尺度影響"""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[Hashable, float] = {}
+    for ranking, w in zip(rankings, weights):
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + w / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+
+def weighted_score_fusion(
+    rankings: Sequence[Ranking],
+    weights: Optional[Sequence[float]] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple[Hashable, float]]:
+    """各路分數先 min-max 正規化到 [0, 1]，再加權相加"""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[Hashable, float] = {}
+    for ranking, w in zip(rankings, weights):
+        if not ranking:
+            continue
+        scores = [s for _, s in ranking]
+        lo, hi = min(scores), max(scores)
+        span = (hi - lo) or 1.0
+        for doc_id, s in ranking:
+            fused[doc_id] = fused.get(doc_id, 0.0) + w * (s - lo) / span
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)[:limit]
@@ -0,0 +1,25 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(
+    pool_size: int = 8,
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    methods=("GET", "POST"),
+    auth=None,
+) -> requests.Session:
+    """建立具連線池與自動重試 (429 / 5xx，指數退避) 的 requests.Session"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(methods),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.auth = auth
+    return session
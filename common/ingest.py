@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from qdrant_client import models
+
+from common.pipeline import StreamingUpserter
+
+# --- 1. 預設配置 ---
+MANIFEST_DIR = Path(__file__).resolve().parents[1] / ".cache" / "manifests"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def file_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_text(path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def point_id(source: str, index: int, chunk_hash: str) -> str:
+    """由 (來源, 切塊序號, 內容雜湊) 決定的固定 UUID，重跑時 ID 不變"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{index}#{chunk_hash}"))
+
+
+class IncrementalIndexer:
+    """
+    增量且冪等的 Qdrant 匯入：
+    - manifest 記錄每個來源的雜湊與其 point ID
+    - 來源未變動直接跳過；變動時只嵌入 / 上傳新的切塊，並刪除過期的 point
+    - 不再每次 delete_collection 後整批重建
+    """
+
+    def __init__(
+        self,
+        client,
+        collection_name: str,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        config: str = "",
+        manifest_path=None,
+        batch_size: int = 128,
+        vector_names: Optional[List[str]] = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.embed_fn = embed_fn
+        self.config = config  # 切塊參數等設定，變動時視為全部重建
+        self.manifest_path = Path(manifest_path or MANIFEST_DIR / f"{collection_name}.json")
+        self.manifest = self._load_manifest()
+        self.upserter = StreamingUpserter(
+            client, collection_name, embed_fn, batch_size=batch_size, vector_names=vector_names
+        )
+
+    # --- 2. Manifest 讀寫 ---
+    def _load_manifest(self) -> dict:
+        """manifest 不存在或設定不符時回傳空 manifest，並標記 collection 內容不可信 (見 ensure_collection)"""
+        self.manifest_valid = False
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("config") == self.config:
+                self.manifest_valid = True
+                return manifest
+        return {"config": self.config, "sources": {}}
+
+    def save_manifest(self):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(tmp, self.manifest_path)
+
+    # --- 3. Collection ---
+    def ensure_collection(self, vectors_config):
+        """
+        Collection 不存在才建立；若被手動刪除則一併清空 manifest。
+        manifest 遺失或切塊 / 嵌入設定已變動時，既有 point 無法對應 (ID 不同、維度可能不同)，
+        重建 collection 以免殘留舊設定的切塊
+        """
+        exists = self.client.collection_exists(self.collection_name)
+        if exists and not self.manifest_valid:
+            print(f"♻️ {self.collection_name}：manifest 遺失或設定已變動，重建 collection")
+            self.client.delete_collection(self.collection_name)
+            exists = False
+        if not exists:
+            self.client.create_collection(collection_name=self.collection_name, vectors_config=vectors_config)
+            self.manifest = {"config": self.config, "sources": {}}
+        self.manifest_valid = True
+
+    # --- 4. 同步 ---
+    def sync_source(
+        self,
+        source: str,
+        chunks: List[str],
+        payloads: Optional[List[dict]] = None,
+        source_hash: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """將單一來源的切塊同步到 Qdrant，回傳 {"added", "deleted", "kept"}"""
+        source_hash = source_hash or content_hash("\x00".join(chunks))
+        old = self.manifest["sources"].get(source)
+        if old and old["hash"] == source_hash:
+            return {"added": 0, "deleted": 0, "kept": len(old["ids"])}
+
+        payloads = payloads or [{"text": c, "source": source} for c in chunks]
+        ids = [point_id(source, i, content_hash(c)) for i, c in enumerate(chunks)]
+        old_ids = set(old["ids"]) if old else set()
+
+        new_idx = [i for i, pid in enumerate(ids) if pid not in old_ids]
+        if new_idx:
+            # 以串流管線分批嵌入並上傳，嵌入與 upsert 同時進行
+            self.upserter.run((ids[i], chunks[i], payloads[i]) for i in new_idx)
+
+        stale = list(old_ids - set(ids))
+        self._delete(stale)
+        self.manifest["sources"][source] = {"hash": source_hash, "ids": ids}
+        return {"added": len(new_idx), "deleted": len(stale), "kept": len(ids) - len(new_idx)}
+
+    def sync_files(self, paths: Iterable[str], chunk_fn: Callable, batched: bool = False) -> Dict[str, int]:
+        """
+        同步一批檔案：未變動的檔案只計算雜湊，不讀取切塊；已消失的檔案會刪除其 point。
+        batched=True 時 chunk_fn 接收所有變動檔案的內容列表，回傳對齊的切塊列表 (可跨檔批次嵌入)。
+        """
+        start = time.perf_counter()
+        totals = {"added": 0, "deleted": 0, "kept": 0, "skipped_files": 0}
+        seen, changed = set(), []
+        for path in paths:
+            source = os.path.basename(path)
+            seen.add(source)
+            h = file_hash(path)
+            old = self.manifest["sources"].get(source)
+            if old and old["hash"] == h:
+                totals["kept"] += len(old["ids"])
+                totals["skipped_files"] += 1
+                continue
+            changed.append((source, h, path))
+
+        if batched and changed:
+            contents = [_read_text(path) for _, _, path in changed]
+            chunk_lists = chunk_fn(contents)
+        else:
+            chunk_lists = (chunk_fn(_read_text(path)) for _, _, path in changed)
+        for (source, h, _), chunks in zip(changed, chunk_lists):
+            stats = self.sync_source(source, chunks, source_hash=h)
+            for k, v in stats.items():
+                totals[k] += v
+
+        totals["deleted"] += self.prune(seen)
+        self.save_manifest()
+        totals["seconds"] = round(time.perf_counter() - start, 3)
+        return totals
+
+    def prune(self, keep_sources) -> int:
+        """刪除不在 keep_sources 中的來源及其 point"""
+        removed = 0
+        for source in list(self.manifest["sources"]):
+            if source not in keep_sources:
+                ids = self.manifest["sources"].pop(source)["ids"]
+                self._delete(ids)
+                removed += len(ids)
+        return removed
+
+    def _delete(self, ids: List[str]):
+        if ids:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=ids),
+            )
+
+    def point_count(self) -> int:
+        return sum(len(s["ids"]) for s in self.manifest["sources"].values())
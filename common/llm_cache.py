@@ -0,0 +1,230 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import warnings
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# --- 1. 預設配置 ---
+CACHE_PATH = Path(__file__).resolve().parents[1] / ".cache" / "llm_cache.sqlite"
+TTL_SECONDS = 7 * 24 * 3600   # 快取有效期限
+MAX_ENTRIES = 50_000          # 筆數上限，超過時刪除最久未使用的資料
+
+
+def make_key(base_url: str, model: str, messages: List[dict], params: Optional[dict] = None) -> str:
+    """以 (base_url, model, messages, 取樣參數) 的 SHA-256 作為快取鍵"""
+    raw = json.dumps(
+        {"base_url": base_url, "model": model, "messages": messages, "params": params or {}},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite 為底的 LLM 回應快取：
+    - TTL 過期 + 筆數上限 (LRU) 淘汰
+    - 相同 key 同時請求時只送出一次 (in-flight de-duplication)，其餘等待同一結果
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    # --- 2. 基本讀寫 ---
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return value
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    # --- 3. 查詢或計算 (含 in-flight 合併) ---
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> str:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        with self._inflight_lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+        if not owner:
+            self.coalesced += 1
+            return fut.result()
+
+        try:
+            # 前一個 owner 可能剛好在第一次查詢後寫入
+            value = self.get(key)
+            if value is None:
+                self.misses += 1
+                value = compute()
+                self.put(key, value)
+            else:
+                self.hits += 1
+            fut.set_result(value)
+            return value
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+# --- 4. ChatOpenAI.invoke 路徑 ---
+def _normalize_input(input_) -> List[dict]:
+    """字串 / PromptValue / 訊息列表 (BaseMessage、dict、(role, content)) 統一轉成訊息 dict 列表"""
+    from langchain_core.messages import HumanMessage, convert_to_messages, message_to_dict
+
+    if isinstance(input_, str):
+        messages = [HumanMessage(content=input_)]
+    elif hasattr(input_, "to_messages"):
+        messages = input_.to_messages()
+    else:
+        messages = convert_to_messages(input_)
+    out = []
+    for m in messages:
+        data = message_to_dict(m)["data"]
+        data.pop("id", None)  # 每次呼叫都不同的訊息 ID 不列入快取鍵
+        out.append({"type": m.type, **data})
+    return out
+
+
+def _restore_message(value: str):
+    """快取值為 message_to_dict 的 JSON；早期版本只存文字內容，仍以 AIMessage 還原"""
+    from langchain_core.messages import AIMessage, messages_from_dict
+
+    try:
+        data = json.loads(value)
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and "type" in data and "data" in data:
+        return messages_from_dict([data])[0]
+    return AIMessage(content=value)
+
+
+# 透過 __getattr__ 轉給原模型、不經過快取的方法 (使用時提出警告)
+_UNCACHED = {"stream", "astream", "ainvoke", "batch", "abatch", "with_structured_output"}
+
+
+class CachedChatModel:
+    """
+    包裝 ChatOpenAI：invoke() 先查快取，命中時回傳完整的 AIMessage (含 tool_calls、metadata)，不打上游。
+    快取鍵包含模型的取樣參數、bind() 綁定的參數與 invoke(**kwargs) (stop、tools ...)。
+    bind() / bind_tools() 回傳仍經過快取的 CachedChatModel；其餘屬性直接轉給原本的模型。
+    """
+
+    def __init__(self, llm, cache: LLMCache):
+        self.llm = llm
+        self.cache = cache
+
+    def _key(self, input_, kwargs: Optional[dict] = None) -> str:
+        target = getattr(self.llm, "bound", self.llm)  # RunnableBinding (bind / bind_tools) 的底層模型
+        params = {
+            "temperature": getattr(target, "temperature", None),
+            "max_tokens": getattr(target, "max_tokens", None),
+            "top_p": getattr(target, "top_p", None),
+            "bound": dict(getattr(self.llm, "kwargs", None) or {}),
+            # config (callbacks、tags) 不影響輸出，不列入
+            "call": {k: v for k, v in sorted((kwargs or {}).items()) if k != "config"},
+        }
+        return make_key(
+            str(getattr(target, "openai_api_base", "")),
+            str(getattr(target, "model_name", "")),
+            _normalize_input(input_),
+            params,
+        )
+
+    def invoke(self, input_, *args, **kwargs):
+        from langchain_core.messages import message_to_dict
+
+        def compute() -> str:
+            return json.dumps(message_to_dict(self.llm.invoke(input_, *args, **kwargs)), ensure_ascii=False)
+
+        return _restore_message(self.cache.get_or_compute(self._key(input_, kwargs), compute))
+
+    def bind(self, **kwargs) -> "CachedChatModel":
+        return CachedChatModel(self.llm.bind(**kwargs), self.cache)
+
+    def bind_tools(self, tools, **kwargs) -> "CachedChatModel":
+        return CachedChatModel(self.llm.bind_tools(tools, **kwargs), self.cache)
+
+    def __getattr__(self, name):
+        if name in _UNCACHED:
+            warnings.warn(f"CachedChatModel.{name} 不經過快取，直接呼叫原模型", stacklevel=2)
+        return getattr(self.llm, name)
+
+
+# --- 5. requests.post(VLM_URL) 路徑 ---
+def cached_chat_completion(session, url: str, payload: dict, cache: LLMCache, timeout: float = 120) -> Dict[str, Any]:
+    """OpenAI 相容 /chat/completions 的快取版本，回傳與原 API 相同結構的 JSON"""
+    params = {k: v for k, v in payload.items() if k not in ("model", "messages")}
+    key = make_key(url, payload.get("model", ""), payload.get("messages", []), params)
+
+    def compute() -> str:
+        res = session.post(url, json=payload, timeout=timeout)
+        res.raise_for_status()
+        body = res.json()
+        # 部分伺服器以 HTTP 200 回傳錯誤內容，沒有 choices 的回應不寫入快取
+        if not isinstance(body, dict) or not body.get("choices"):
+            raise RuntimeError(f"LLM 回應缺少 choices：{res.text[:200]}")
+        return res.text
+
+    return json.loads(cache.get_or_compute(key, compute))
@@ -0,0 +1,70 @@
+import threading
+import time
+from typing import List
+
+import numpy as np
+
+# --- 1. 預設配置 ---
+ENCODE_BATCH_SIZE = 64  # SentenceTransformer 內部每次前向的句數
+MIN_POOL_TEXTS = 256    # 少於此數量時多行程池的啟動 / 傳輸成本不划算，直接在本行程編碼
+
+
+class LocalEncoder:
+    """
+    SentenceTransformer 批次編碼包裝：
+    - 一次 encode 整批文字，回傳 float32 ndarray (到 Qdrant 邊界才轉成 list)
+    - processes > 1 時以 SentenceTransformer 的多行程池分散到多個 CPU 核心
+    - 累計 chunks/sec 供調整 batch_size 參考
+    model 可為 SentenceTransformer、LazyModel 或 model_server.RemoteEncoder
+    """
+
+    def __init__(self, model, batch_size: int = ENCODE_BATCH_SIZE, processes: int = 0, normalize: bool = False):
+        self.model = model
+        self.batch_size = batch_size
+        self.processes = processes
+        self.normalize = normalize
+        self._pool = None
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self.seconds = 0.0
+
+    def _get_pool(self):
+        if self._pool is None and self.processes > 1 and hasattr(self.model, "start_multi_process_pool"):
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+        return self._pool
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        pool = self._get_pool() if len(texts) >= MIN_POOL_TEXTS else None
+        if pool is not None:
+            vectors = self.model.encode_multi_process(
+                texts, pool, batch_size=self.batch_size, normalize_embeddings=self.normalize
+            )
+        else:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize,
+                show_progress_bar=False,
+            )
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self.chunks += len(texts)
+            self.seconds += time.perf_counter() - start
+        return vectors
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return self.encode(texts)
+
+    def stats(self) -> dict:
+        return {
+            "chunks": self.chunks,
+            "seconds": round(self.seconds, 3),
+            "chunks_per_sec": round(self.chunks / self.seconds, 1) if self.seconds else 0.0,
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
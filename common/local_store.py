@@ -0,0 +1,326 @@
+import atexit
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+from qdrant_client.http.models import QueryResponse  # qdrant_client.models.QueryResponse 是 fastembed 的型別
+
+# --- 1. 預設配置 ---
+LOCAL_STORE_DIR = Path(__file__).resolve().parents[1] / ".cache" / "local_store"
+BACKEND_ENV = "RAG_VECTOR_BACKEND"   # 設為 "local" 時改用本機後端
+DEFAULT_VECTOR = ""                  # 未命名向量的內部名稱
+
+
+def make_client(url: str = "http://localhost:6333", path=LOCAL_STORE_DIR):
+    """依環境變數選擇後端：預設 QdrantClient，RAG_VECTOR_BACKEND=local 時使用 LocalVectorStore"""
+    if os.getenv(BACKEND_ENV, "").lower() == "local":
+        return LocalVectorStore(path=path)
+    return QdrantClient(url=url)
+
+
+# --- 2. Payload 過濾 (支援 must / should / must_not + MatchValue / MatchAny) ---
+def _match_condition(payload: dict, cond) -> bool:
+    if isinstance(cond, models.Filter):
+        return _match_filter(payload, cond)
+    if isinstance(cond, models.HasIdCondition):
+        raise NotImplementedError("本機後端不支援 HasIdCondition")
+    value = payload.get(cond.key)
+    match = cond.match
+    if isinstance(match, models.MatchValue):
+        return value == match.value
+    if isinstance(match, models.MatchAny):
+        return value in match.any
+    if isinstance(match, models.MatchExcept):
+        return value not in match.except_
+    raise NotImplementedError(f"本機後端不支援的條件：{type(match).__name__}")
+
+
+def _as_conditions(conds) -> list:
+    if conds is None:
+        return []
+    return conds if isinstance(conds, list) else [conds]
+
+
+def _match_filter(payload: dict, flt: models.Filter) -> bool:
+    if not all(_match_condition(payload, c) for c in _as_conditions(flt.must)):
+        return False
+    should = _as_conditions(flt.should)
+    if should and not any(_match_condition(payload, c) for c in should):
+        return False
+    return not any(_match_condition(payload, c) for c in _as_conditions(flt.must_not))
+
+
+class _Collection:
+    """單一 collection：一個連續的 float32 矩陣 + 每個向量名稱對應的度量方式"""
+
+    def __init__(self, distances: Dict[str, models.Distance], dim: int):
+        self.distances = distances
+        self.dim = dim
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.size = 0
+        self.ids: list = []
+        self.payloads: List[dict] = []
+        self.row_of: dict = {}
+
+    def _reserve(self, n: int):
+        if n <= len(self.vectors) and self.vectors.flags.writeable:
+            return
+        capacity = max(n, 2 * len(self.vectors), 64)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        norms = np.empty(capacity, dtype=np.float32)
+        vectors[: self.size] = self.vectors[: self.size]
+        norms[: self.size] = self.norms[: self.size]
+        self.vectors, self.norms = vectors, norms
+
+    def upsert(self, ids: list, matrix: np.ndarray, payloads: List[dict]):
+        self._reserve(self.size + len(ids))
+        norms = np.linalg.norm(matrix, axis=1)
+        for pid, vec, norm, payload in zip(ids, matrix, norms, payloads):
+            row = self.row_of.get(pid)
+            if row is None:
+                row = self.size
+                self.size += 1
+                self.ids.append(pid)
+                self.payloads.append(payload)
+                self.row_of[pid] = row
+            else:
+                self.payloads[row] = payload
+            self.vectors[row] = vec
+            self.norms[row] = norm
+
+    def delete(self, ids: list):
+        # 以最後一列補洞，讓矩陣維持連續
+        self._reserve(self.size)
+        for pid in ids:
+            row = self.row_of.pop(pid, None)
+            if row is None:
+                continue
+            last = self.size - 1
+            if row != last:
+                self.vectors[row] = self.vectors[last]
+                self.norms[row] = self.norms[last]
+                self.ids[row] = self.ids[last]
+                self.payloads[row] = self.payloads[last]
+                self.row_of[self.ids[row]] = row
+            self.ids.pop()
+            self.payloads.pop()
+            self.size -= 1
+
+    def mask(self, flt: Optional[models.Filter]) -> Optional[np.ndarray]:
+        if flt is None:
+            return None
+        return np.fromiter((_match_filter(p, flt) for p in self.payloads), dtype=bool, count=self.size)
+
+    def scores(self, queries: np.ndarray, using: str) -> np.ndarray:
+        """一次矩陣乘法算出 (查詢數, 點數) 的分數；分數越大越相似 (Euclid 取負距離)"""
+        matrix = self.vectors[: self.size]
+        dots = queries @ matrix.T
+        distance = self.distances[using]
+        if distance == models.Distance.DOT:
+            return dots
+        q_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        if distance == models.Distance.COSINE:
+            return dots / np.maximum(q_norms * self.norms[: self.size], 1e-12)
+        if distance == models.Distance.EUCLID:
+            sq = q_norms ** 2 + self.norms[: self.size] ** 2 - 2 * dots
+            return -np.sqrt(np.maximum(sq, 0))
+        raise NotImplementedError(f"本機後端不支援的度量：{distance}")
+
+
+class LocalVectorStore:
+    """
+    本機精確搜尋後端，介面與 QdrantClient 相同 (create_collection / upsert / query_points ...)：
+    - 向量存在連續的 NumPy float32 矩陣，多筆查詢以一次矩陣乘法 + argpartition 取 top-k
+    - named vectors 共用同一份矩陣，只是度量方式不同 (多度量比較只存一份)
+    - 指定 path 時以 .npy 持久化，載入時以 memory-map 開啟
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+        self._dirty = set()
+        if self.path and self.path.exists():
+            for sub in self.path.iterdir():
+                if (sub / "meta.json").exists():
+                    self._collections[sub.name] = self._load(sub)
+        if self.path:
+            atexit.register(self.save)
+
+    # --- 3. Collection 管理 ---
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    def create_collection(self, collection_name: str, vectors_config, **kwargs) -> bool:
+        if isinstance(vectors_config, dict):
+            sizes = {p.size for p in vectors_config.values()}
+            if len(sizes) != 1:
+                raise ValueError("本機後端的 named vectors 需有相同維度")
+            distances = {name: p.distance for name, p in vectors_config.items()}
+            dim = sizes.pop()
+        else:
+            distances = {DEFAULT_VECTOR: vectors_config.distance}
+            dim = vectors_config.size
+        with self._lock:
+            self._collections[collection_name] = _Collection(distances, dim)
+            self._dirty.add(collection_name)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            existed = self._collections.pop(collection_name, None) is not None
+            self._dirty.discard(collection_name)
+            if self.path and (self.path / collection_name).exists():
+                shutil.rmtree(self.path / collection_name)
+        return existed
+
+    def count(self, collection_name: str, **kwargs) -> models.CountResult:
+        return models.CountResult(count=self._collections[collection_name].size)
+
+    # --- 4. 寫入 ---
+    @staticmethod
+    def _single_vector(vector) -> list:
+        if isinstance(vector, dict):
+            values = list(vector.values())
+            if any(v != values[0] for v in values[1:]):
+                raise ValueError("本機後端的 named vectors 需共用同一向量")
+            return values[0]
+        return vector
+
+    def upsert(self, collection_name: str, points: Sequence[models.PointStruct], wait: bool = True, **kwargs):
+        if not points:
+            return None
+        matrix = np.asarray([self._single_vector(p.vector) for p in points], dtype=np.float32)
+        with self._lock:
+            self._collections[collection_name].upsert(
+                [p.id for p in points], matrix, [p.payload or {} for p in points]
+            )
+            self._dirty.add(collection_name)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True, **kwargs):
+        ids = points_selector.points if isinstance(points_selector, models.PointIdsList) else points_selector
+        with self._lock:
+            self._collections[collection_name].delete(list(ids))
+            self._dirty.add(collection_name)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    # --- 5. 查詢 ---
+    def _search(
+        self,
+        collection_name: str,
+        queries: np.ndarray,
+        limit: int,
+        using: Optional[str],
+        query_filter: Optional[models.Filter],
+        with_payload: bool,
+    ) -> List[QueryResponse]:
+        col = self._collections[collection_name]
+        using = DEFAULT_VECTOR if using is None else using
+        if col.size == 0:
+            return [QueryResponse(points=[]) for _ in queries]
+
+        scores = col.scores(queries, using)
+        mask = col.mask(query_filter)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        k = min(limit, col.size)
+        # argpartition 取 top-k 後只對 k 筆排序
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        is_euclid = col.distances[using] == models.Distance.EUCLID
+        responses = []
+        for row_ids, row_scores in zip(top, scores[np.arange(len(queries))[:, None], top]):
+            points = []
+            for idx, score in zip(row_ids, row_scores):
+                if not np.isfinite(score):
+                    continue
+                points.append(models.ScoredPoint(
+                    id=col.ids[idx],
+                    version=0,
+                    score=float(-score if is_euclid else score),
+                    payload=col.payloads[idx] if with_payload else None,
+                ))
+            responses.append(QueryResponse(points=points))
+        return responses
+
+    def query_points(
+        self,
+        collection_name: str,
+        query: Union[List[float], np.ndarray],
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        using: Optional[str] = None,
+        with_payload: bool = True,
+        **kwargs,
+    ) -> QueryResponse:
+        queries = np.asarray([query], dtype=np.float32)
+        with self._lock:
+            return self._search(collection_name, queries, limit, using, query_filter, with_payload)[0]
+
+    def query_batch_points(self, collection_name: str, requests: Sequence[models.QueryRequest], **kwargs):
+        """同一組 (using, filter, limit) 的查詢合併成一次矩陣乘法"""
+        results: List[Optional[QueryResponse]] = [None] * len(requests)
+        groups: Dict[tuple, List[int]] = {}
+        for i, r in enumerate(requests):
+            key = (r.using, r.limit or 10, r.filter.model_dump_json() if r.filter else None)
+            groups.setdefault(key, []).append(i)
+        with self._lock:
+            for (using, limit, _), idxs in groups.items():
+                queries = np.asarray([requests[i].query for i in idxs], dtype=np.float32)
+                flt = requests[idxs[0]].filter
+                with_payload = requests[idxs[0]].with_payload is not False
+                for i, resp in zip(idxs, self._search(collection_name, queries, limit, using, flt, with_payload)):
+                    results[i] = resp
+        return results
+
+    # --- 6. 持久化 ---
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            for name in list(self._dirty):
+                col = self._collections.get(name)
+                if col is None:
+                    continue
+                d = self.path / name
+                d.mkdir(parents=True, exist_ok=True)
+                matrix = np.ascontiguousarray(col.vectors[: col.size])
+                np.save(d / "vectors.tmp.npy", matrix)
+                os.replace(d / "vectors.tmp.npy", d / "vectors.npy")
+                meta = {
+                    "dim": col.dim,
+                    "distances": {k: v.value for k, v in col.distances.items()},
+                    "ids": col.ids,
+                    "payloads": col.payloads,
+                }
+                with open(d / "meta.tmp.json", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(d / "meta.tmp.json", d / "meta.json")
+            self._dirty.clear()
+
+    @staticmethod
+    def _load(d: Path) -> _Collection:
+        with open(d / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        col = _Collection({k: models.Distance(v) for k, v in meta["distances"].items()}, meta["dim"])
+        # 以唯讀 memory-map 載入，第一次寫入時才複製到記憶體
+        col.vectors = np.load(d / "vectors.npy", mmap_mode="r")
+        col.norms = np.linalg.norm(col.vectors, axis=1).astype(np.float32)
+        col.size = len(col.vectors)
+        col.ids = meta["ids"]
+        col.payloads = meta["payloads"]
+        col.row_of = {pid: i for i, pid in enumerate(col.ids)}
+        return col
+
+    def close(self):
+        self.save()
@@ -0,0 +1,42 @@
+from typing import Dict, List, Optional
+
+from qdrant_client import models
+
+# --- 1. 三種度量方式 ---
+METRICS = {
+    "Cosine": models.Distance.COSINE,
+    "Dot": models.Distance.DOT,
+    "Euclidean": models.Distance.EUCLID,
+}
+
+
+def vector_name(metric: str) -> str:
+    return metric.lower()
+
+
+def multi_metric_config(size: int, metrics: Dict[str, models.Distance] = METRICS) -> Dict[str, models.VectorParams]:
+    """單一 collection 的 named vectors 設定：每種度量一個名稱，共用同一份輸入向量"""
+    return {vector_name(m): models.VectorParams(size=size, distance=d) for m, d in metrics.items()}
+
+
+def query_all_metrics(
+    client,
+    collection_name: str,
+    query_vector: List[float],
+    limit: int = 3,
+    query_filter: Optional[models.Filter] = None,
+    metrics: Dict[str, models.Distance] = METRICS,
+) -> Dict[str, List[models.ScoredPoint]]:
+    """以一次 query_batch_points 取得所有度量的結果，回傳 {度量名稱: points}"""
+    requests = [
+        models.QueryRequest(
+            query=query_vector,
+            using=vector_name(m),
+            filter=query_filter,
+            limit=limit,
+            with_payload=True,
+        )
+        for m in metrics
+    ]
+    responses = client.query_batch_points(collection_name=collection_name, requests=requests)
+    return {m: r.points for m, r in zip(metrics, responses)}
@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# --- 1. 行程內模型登錄表 ---
+# 每個名稱在同一個行程內只載入一次；不同名稱可同時載入，互不阻塞
+_LOADERS: Dict[str, Callable[[], Any]] = {}
+_MODELS: Dict[str, Any] = {}
+_LOCKS: Dict[str, threading.Lock] = {}
+_GUARD = threading.Lock()
+
+
+def register(name: str, loader: Callable[[], Any]):
+    """登記載入函式，實際載入延後到第一次 get()"""
+    with _GUARD:
+        _LOADERS.setdefault(name, loader)
+
+
+def get(name: str, loader: Optional[Callable[[], Any]] = None) -> Any:
+    if name in _MODELS:
+        return _MODELS[name]
+    with _GUARD:
+        if loader is not None:
+            _LOADERS.setdefault(name, loader)
+        if name not in _LOADERS:
+            raise KeyError(f"未登記的模型：{name}")
+        lock = _LOCKS.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _MODELS:
+            _MODELS[name] = _LOADERS[name]()
+    return _MODELS[name]
+
+
+def loaded() -> List[str]:
+    return list(_MODELS)
+
+
+def unload(name: str):
+    _MODELS.pop(name, None)
+
+
+class LazyModel:
+    """代理物件：第一次存取屬性時才向登錄表取得 (載入) 模型"""
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self._name = name
+        register(name, loader)
+
+    @property
+    def loaded(self) -> bool:
+        return self._name in _MODELS
+
+    def load(self) -> Any:
+        return get(self._name)
+
+    def __getattr__(self, attr):
+        return getattr(get(self._name), attr)
+
+
+# --- 2. 常用模型 (套件於載入時才 import，避免拖慢腳本啟動) ---
+def resolve_model_path(model_path: str) -> str:
+    """本機資料夾轉成絕對路徑 ("./" 與 "HW/day6" 視為同一模型)；Hugging Face 模型名稱維持原樣"""
+    return os.path.abspath(model_path) if os.path.exists(model_path) else model_path
+
+
+def reranker_name(model_path: str, backend: str = "torch") -> str:
+    return f"reranker:{backend}:{resolve_model_path(model_path)}"
+
+
+def encoder_name(model_name: str) -> str:
+    return f"sentence-transformer:{model_name}"
+
+
+def lazy_reranker(model_path: str, backend: str = "torch", **kwargs) -> LazyModel:
+    model_path = resolve_model_path(model_path)
+
+    def load():
+        from common.reranker import Reranker
+        return Reranker.from_pretrained(model_path, backend=backend, **kwargs)
+    return LazyModel(reranker_name(model_path, backend), load)
+
+
+def lazy_sentence_transformer(model_name: str, **kwargs) -> LazyModel:
+    def load():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, **kwargs)
+    return LazyModel(encoder_name(model_name), load)
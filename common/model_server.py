@@ -0,0 +1,197 @@
+"""
+常駐的本機模型伺服器：多個腳本共用同一份已載入的 Reranker / SentenceTransformer
+
+啟動：python -m common.model_server [--port 8765] [--reranker HW/day6] [--encoder paraphrase-multilingual-MiniLM-L12-v2]
+腳本端以 reranker() / encoder() 取得模型：伺服器在線時走 HTTP，否則退回行程內延遲載入
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+import requests
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common import model_registry
+from common.http import make_session
+
+# --- 1. 預設配置 ---
+HOST = "127.0.0.1"
+PORT = 8765
+# 設為空字串可停用遠端模型，一律在行程內載入
+SERVER_URL = os.environ.get("MODEL_SERVER_URL", f"http://{HOST}:{PORT}")
+HEALTH_TIMEOUT = 0.3
+
+
+def encode_array(arr: np.ndarray) -> dict:
+    """float32 陣列以 base64 傳輸，避免轉成 JSON 浮點數列表"""
+    arr = np.ascontiguousarray(arr, dtype=np.float32)
+    return {"shape": list(arr.shape), "data": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+
+def decode_array(obj: dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(obj["data"]), dtype=np.float32).reshape(obj["shape"])
+
+
+# --- 2. 伺服器 ---
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, body: dict):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok", "models": model_registry.loaded()})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if self.path == "/rerank":
+                model = model_registry.lazy_reranker(req["model"], req.get("backend", "torch"))
+                self._reply(200, {"scores": model.score(req["query"], req["docs"])})
+            elif self.path == "/encode":
+                model = model_registry.lazy_sentence_transformer(req["model"])
+                vectors = model.encode(
+                    req["texts"],
+                    batch_size=req.get("batch_size", 32),
+                    convert_to_numpy=True,
+                    normalize_embeddings=bool(req.get("normalize_embeddings", False)),
+                    show_progress_bar=False,
+                )
+                self._reply(200, encode_array(vectors))
+            else:
+                self._reply(404, {"error": "not found"})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str = HOST, port: int = PORT):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    print(f"🧠 模型伺服器啟動：http://{host}:{port}，已載入：{model_registry.loaded()}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+# --- 3. 客戶端 ---
+class ModelServerClient:
+    def __init__(self, url: str = SERVER_URL, timeout: float = 120):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = make_session()
+
+    def available(self) -> bool:
+        if not self.url:
+            return False
+        try:
+            # 不經過 session 的重試，伺服器未啟動時立即退回本機載入
+            return requests.get(f"{self.url}/health", timeout=HEALTH_TIMEOUT).ok
+        except Exception:
+            return False
+
+    def _post(self, path: str, payload: dict) -> dict:
+        res = self.session.post(f"{self.url}{path}", json=payload, timeout=self.timeout)
+        body = res.json()
+        if res.status_code != 200:
+            raise RuntimeError(f"模型伺服器錯誤 ({path})：{body.get('error')}")
+        return body
+
+    def rerank_scores(self, model_path: str, query: str, docs: Sequence[str], backend: str = "torch") -> List[float]:
+        return self._post("/rerank", {"model": model_path, "backend": backend, "query": query, "docs": list(docs)})["scores"]
+
+    def encode(self, model_name: str, texts: Sequence[str], batch_size: int = 32,
+               normalize_embeddings: bool = False) -> np.ndarray:
+        payload = {"model": model_name, "texts": list(texts), "batch_size": batch_size,
+                   "normalize_embeddings": normalize_embeddings}
+        return decode_array(self._post("/encode", payload))
+
+
+class RemoteReranker:
+    """與 common.reranker.Reranker 相同的 score / rerank 介面，推論交給模型伺服器"""
+
+    def __init__(self, client: ModelServerClient, model_path: str, backend: str = "torch"):
+        self.client = client
+        self.model_path = model_path
+        self.backend = backend
+
+    def score(self, query: str, docs: Sequence[str]) -> List[float]:
+        return self.client.rerank_scores(self.model_path, query, docs, self.backend) if docs else []
+
+    def rerank(self, query: str, docs: Sequence[str], top_n: int = 3) -> List[str]:
+        scores = self.score(query, docs)
+        best = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_n]
+        return [docs[i] for i in best]
+
+
+class RemoteEncoder:
+    """
+    提供 SentenceTransformer.encode 的常用子集，回傳 float32 ndarray
+    不支援的參數直接報錯，避免伺服器在線與否得到不同的向量
+    """
+
+    def __init__(self, client: ModelServerClient, model_name: str):
+        self.client = client
+        self.model_name = model_name
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True, show_progress_bar=None, **kwargs) -> np.ndarray:
+        if kwargs:
+            raise TypeError(f"RemoteEncoder.encode 不支援的參數：{', '.join(sorted(kwargs))}")
+        if not convert_to_numpy:
+            raise TypeError("RemoteEncoder.encode 只能回傳 NumPy 陣列 (convert_to_numpy=True)")
+        single = isinstance(sentences, str)
+        vectors = self.client.encode(
+            self.model_name, [sentences] if single else sentences, batch_size, normalize_embeddings
+        )
+        return vectors[0] if single else vectors
+
+
+def reranker(model_path: str, backend: str = "torch", url: str = SERVER_URL):
+    # 伺服器以自己的工作目錄解析相對路徑，因此送出前先轉成絕對路徑
+    model_path = model_registry.resolve_model_path(model_path)
+    client = ModelServerClient(url)
+    if client.available():
+        return RemoteReranker(client, model_path, backend)
+    return model_registry.lazy_reranker(model_path, backend)
+
+
+def encoder(model_name: str, url: str = SERVER_URL):
+    client = ModelServerClient(url)
+    if client.available():
+        return RemoteEncoder(client, model_name)
+    return model_registry.lazy_sentence_transformer(model_name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--reranker", action="append", default=[], help="預先載入的 reranker 模型資料夾")
+    parser.add_argument("--reranker-backend", default="torch")
+    parser.add_argument("--encoder", action="append", default=[], help="預先載入的 SentenceTransformer 名稱")
+    args = parser.parse_args()
+
+    for path in args.reranker:
+        model_registry.lazy_reranker(path, args.reranker_backend).load()
+    for name in args.encoder:
+        model_registry.lazy_sentence_transformer(name).load()
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# --- 1. 預設配置 ---
+CACHE_PATH = Path(__file__).resolve().parents[1] / ".cache" / "page_cache.sqlite"
+TTL_SECONDS = {
+    "page": 24 * 3600,         # 網頁文字 / 截圖：新聞頁會更新，保留一天
+    "summary": 7 * 24 * 3600,  # VLM 摘要：同一頁面內容 + 同一問題
+}
+TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "mc_cid", "mc_eid", "ref", "ref_src", "spm"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    快取鍵 / 去重用的網址：去掉 #fragment 與追蹤參數 (utm_* 等)、查詢參數排序、
+    scheme 與主機名稱轉小寫、去掉結尾的 /
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def summary_kind(question: str) -> str:
+    """摘要依問題而異：kind = summary:<問題雜湊>"""
+    return "summary:" + hashlib.sha256(question.encode("utf-8")).hexdigest()[:16]
+
+
+class PageCache:
+    """
+    以網址為鍵的網頁產物快取 (SQLite)，同一來源重複調查時不再重新載入、重新摘要：
+    - page：{final_url, title, text, image_ratio, image(base64), mime}
+    - summary:<問題雜湊>：VLM / LLM 對該頁的摘要
+    各類別有獨立的 TTL，過期資料在讀取時刪除
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl: Optional[dict] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = {**TTL_SECONDS, **(ttl or {})}
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "url TEXT NOT NULL, kind TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (url, kind))"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, kind: str) -> float:
+        return self.ttl.get(kind.split(":", 1)[0], TTL_SECONDS["page"])
+
+    def get(self, url: str, kind: str) -> Optional[str]:
+        url = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM artifacts WHERE url = ? AND kind = ?", (url, kind)
+            ).fetchone()
+            if row is not None and time.time() - row[1] > self._ttl(kind):
+                self._db.execute("DELETE FROM artifacts WHERE url = ? AND kind = ?", (url, kind))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, url: str, kind: str, value: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO artifacts (url, kind, value, created) VALUES (?, ?, ?, ?)",
+                (normalize_url(url), kind, value, time.time()),
+            )
+            self._db.commit()
+
+    def get_json(self, url: str, kind: str) -> Optional[dict]:
+        value = self.get(url, kind)
+        return json.loads(value) if value is not None else None
+
+    def put_json(self, url: str, kind: str, value: dict):
+        self.put(url, kind, json.dumps(value, ensure_ascii=False))
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT kind, COUNT(*) FROM artifacts GROUP BY kind").fetchall()
+        pages = sum(n for kind, n in rows if kind == "page")
+        return {"pages": pages, "summaries": sum(n for _, n in rows) - pages, "hits": self.hits, "misses": self.misses}
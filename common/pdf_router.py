@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Sequence
+
+from common.converters import CONVERTERS
+
+# --- 1. 預設配置 ---
+MIN_CHARS = 20      # 文字層少於此字元數視為掃描頁 (純影像或文字轉成外框)
+MIN_RULINGS = 4     # 線段 + 矩形少於此數量時不做表格偵測 (find_tables 較慢)
+PAGE_KINDS = ("text", "table", "scanned")
+ROUTES = {
+    "text": "pdfplumber",   # 有文字層：直接擷取，最便宜
+    "table": "docling",     # 表格：保留結構
+    "scanned": "rapidocr",  # 無文字層：OCR (可改為 VLM)
+}
+
+
+def classify_page(page, num_chars: int) -> str:
+    """依文字層字元數與 pdfplumber 頁面物件判斷類型：text / table / scanned"""
+    if num_chars < MIN_CHARS:
+        return "scanned"
+    if len(page.lines) + len(page.rects) >= MIN_RULINGS and page.find_tables():
+        return "table"
+    return "text"
+
+
+def classify_pdf(path) -> Dict[int, str]:
+    """
+    文字層字元數以 PDFium 計算 (原生、很快)；掃描頁不再交給 pdfplumber 解析，
+    避免大量向量路徑的頁面拖慢檢查
+    """
+    import pdfplumber
+    import pypdfium2 as pdfium
+
+    kinds = {}
+    doc = pdfium.PdfDocument(str(path))
+    try:
+        with pdfplumber.open(path) as pdf:
+            for i in range(len(doc)):
+                textpage = doc[i].get_textpage()
+                num_chars = len(textpage.get_text_range().strip())
+                textpage.close()
+                if num_chars < MIN_CHARS:
+                    kinds[i + 1] = "scanned"
+                    continue
+                page = pdf.pages[i]
+                kinds[i + 1] = classify_page(page, num_chars)
+                page.close()
+    finally:
+        doc.close()
+    return kinds
+
+
+class PageRouter:
+    """
+    逐頁選擇最便宜且能處理該頁的轉換器：
+    - 先以 pdfplumber 檢查每頁 (文字層、表格線、是否為掃描頁)
+    - 同一轉換器的頁一起交給其 pages()，轉換器在第一次用到時才建立
+    本身也提供 pages()，可搭配 ConversionCache 逐頁快取
+    """
+    page_separator = "\n\n"
+
+    def __init__(self, routes: Optional[Dict[str, str]] = None, options: Optional[Dict[str, dict]] = None):
+        self.routes = {**ROUTES, **(routes or {})}
+        self.options = options or {}  # {轉換器名稱: 工廠參數}
+        self._converters: Dict[str, object] = {}
+        self.last_plan: Dict[int, str] = {}
+
+    def _converter(self, name: str):
+        if name not in self._converters:
+            self._converters[name] = CONVERTERS[name](**self.options.get(name, {}))
+        return self._converters[name]
+
+    def plan(self, path, page_numbers: Optional[Sequence[int]] = None) -> Dict[int, str]:
+        """回傳 {頁碼: 轉換器名稱}"""
+        kinds = classify_pdf(path)
+        wanted = kinds if page_numbers is None else {n: kinds[n] for n in page_numbers}
+        self.last_plan = {n: self.routes[k] for n, k in wanted.items()}
+        return self.last_plan
+
+    def _convert(self, path: str, plan: Dict[int, str]) -> Dict[int, str]:
+        groups: Dict[str, List[int]] = {}
+        for n, name in plan.items():
+            groups.setdefault(name, []).append(n)
+        out: Dict[int, str] = {}
+        for name, numbers in groups.items():
+            for n, text in self._converter(name).pages(path, numbers).items():
+                out[n] = text.strip()
+        return out
+
+    def pages(self, path: str, page_numbers: Sequence[int]) -> Dict[int, str]:
+        return self._convert(path, self.plan(path, page_numbers))
+
+    def __call__(self, path: str) -> str:
+        pages = self._convert(path, self.plan(path))
+        return self.page_separator.join(pages[n] for n in sorted(pages))
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from qdrant_client import models
+
+# --- 1. 預設配置 ---
+BATCH_SIZE = 128      # 每批嵌入 / 上傳的切塊數
+QUEUE_SIZE = 4        # 每個階段之間最多暫存幾批 (決定記憶體上限)
+UPSERT_WORKERS = 2    # 同時進行的 upsert 請求數
+
+Record = Tuple[Any, str, dict]  # (point id, text, payload)
+_DONE = object()
+
+
+def batched(iterable: Iterable, n: int) -> Iterator[list]:
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, n))
+        if not batch:
+            return
+        yield batch
+
+
+def _as_list(vec) -> List[float]:
+    # NumPy 向量只在送進 Qdrant 前才轉成 list
+    if hasattr(vec, "tolist"):
+        return vec.tolist()
+    return vec if isinstance(vec, list) else list(vec)
+
+
+class StreamingUpserter:
+    """
+    串流式批次匯入：read → chunk → embed batch → upsert batch
+    - 各階段以有界佇列相連，記憶體用量只與 batch_size * queue_size 有關
+    - 嵌入與上傳同時進行，upsert 以 wait=False 並行送出；run() 返回前以一次 wait=True 確認全部已寫入
+    - 本機模式 QdrantClient(":memory:" / path) 非執行緒安全，請設 upsert_workers=1
+    """
+
+    def __init__(
+        self,
+        client,
+        collection_name: str,
+        embed_fn: Callable[[List[str]], Sequence],
+        batch_size: int = BATCH_SIZE,
+        queue_size: int = QUEUE_SIZE,
+        upsert_workers: int = UPSERT_WORKERS,
+        wait: bool = False,
+        vector_names: Optional[List[str]] = None,
+        upsert_batch_size: Optional[int] = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.embed_fn = embed_fn
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.upsert_workers = upsert_workers
+        self.wait = wait
+        self.vector_names = vector_names  # named vectors：同一向量寫入多個名稱 (多度量)
+        # 大批嵌入 (例如本機模型一次 encode 上千塊) 時，上傳可再切成較小的請求
+        self.upsert_batch_size = upsert_batch_size or batch_size
+
+    # --- 2. 佇列工具 (發生錯誤時可中止，避免互相卡住) ---
+    def _put(self, q: queue.Queue, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, e: Exception):
+        if self._error is None:
+            self._error = e
+        self._stop.set()
+
+    # --- 3. 各階段 ---
+    def _embed_stage(self, embed_q: queue.Queue, upsert_q: queue.Queue):
+        try:
+            while True:
+                batch = self._get(embed_q)
+                if batch is _DONE:
+                    break
+                ids, texts, payloads = zip(*batch)
+                vectors = _as_list(self.embed_fn(list(texts)))  # 整批一次轉換，而非逐列
+                for lo in range(0, len(ids), self.upsert_batch_size):
+                    hi = lo + self.upsert_batch_size
+                    self._put(upsert_q, (ids[lo:hi], vectors[lo:hi], payloads[lo:hi]))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.upsert_workers):
+                self._put(upsert_q, _DONE)
+
+    def _upsert_stage(self, upsert_q: queue.Queue):
+        try:
+            while True:
+                item = self._get(upsert_q)
+                if item is _DONE:
+                    break
+                ids, vectors, payloads = item
+                self._upsert(item, wait=self.wait)
+                with self._lock:
+                    self._count += len(ids)
+                    self._last = item
+        except Exception as e:
+            self._fail(e)
+
+    def _upsert(self, item, wait: bool):
+        ids, vectors, payloads = item
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                models.PointStruct(id=pid, vector=self._vector(vec), payload=payload)
+                for pid, vec, payload in zip(ids, vectors, payloads)
+            ],
+            wait=wait,
+        )
+
+    def _vector(self, vec):
+        vec = _as_list(vec)
+        if self.vector_names:
+            return {name: vec for name in self.vector_names}
+        return vec
+
+    # --- 4. 執行 ---
+    def run(self, records: Iterable[Record]) -> dict:
+        """消耗 records 產生器並完成匯入，回傳 {"points", "seconds", "points_per_sec"}"""
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error = None
+        self._count = 0
+        self._last = None
+        start = time.perf_counter()
+
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        upsert_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        threads = [threading.Thread(target=self._embed_stage, args=(embed_q, upsert_q), daemon=True)]
+        threads += [
+            threading.Thread(target=self._upsert_stage, args=(upsert_q,), daemon=True)
+            for _ in range(self.upsert_workers)
+        ]
+        for t in threads:
+            t.start()
+
+        try:
+            for batch in batched(records, self.batch_size):
+                if not self._put(embed_q, batch):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(embed_q, _DONE)
+            for t in threads:
+                t.join()
+
+        if self._error is not None:
+            raise self._error
+        if not self.wait and self._last is not None:
+            # Qdrant 依收到順序套用同一 collection 的更新：所有請求都已送達後，
+            # 再以 wait=True 重送最後一批 (冪等)，返回時先前的 wait=False 寫入都已可查詢
+            self._upsert(self._last, wait=True)
+        seconds = time.perf_counter() - start
+        return {
+            "points": self._count,
+            "seconds": round(seconds, 3),
+            "points_per_sec": round(self._count / seconds, 1) if seconds else 0.0,
+        }
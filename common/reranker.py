@@ -0,0 +1,128 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import torch
+
+# --- 1. 預設配置 ---
+MAX_LENGTH = 512
+BATCH_SIZE = 16           # 每個 micro-batch 的 pair 數
+SCORE_CACHE_SIZE = 20_000 # (query, doc) 分數快取筆數
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def _pair_key(query: str, doc: str) -> str:
+    return hashlib.sha256(f"{query}\x00{doc}".encode("utf-8")).hexdigest()
+
+
+def load_cross_encoder(model_path: str, backend: str = "torch"):
+    """
+    載入 cross-encoder：
+    - torch：原始 fp32
+    - int8 ：對 nn.Linear 做 dynamic int8 quantization (CPU)
+    - onnx ：以 optimum 匯出並用 ONNX Runtime 推論 (需 pip install optimum[onnxruntime])
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的 backend：{backend}，可用：{BACKENDS}")
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError as e:
+            raise ImportError("backend='onnx' 需要安裝 optimum[onnxruntime]") from e
+        return tokenizer, ORTModelForSequenceClassification.from_pretrained(model_path, export=True)
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+    if backend == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+
+class Reranker:
+    """
+    Cross-encoder 重排服務：
+    - 依 token 長度排序後切 micro-batch，每批只補齊到該批最長，減少 padding 浪費
+    - torch.inference_mode 推論，可選 int8 / ONNX Runtime 後端
+    - (query, doc) 分數以 LRU 快取，重複的候選不再推論
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        model,
+        max_length: int = MAX_LENGTH,
+        batch_size: int = BATCH_SIZE,
+        cache_size: int = SCORE_CACHE_SIZE,
+    ):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_pretrained(cls, model_path: str, backend: str = "torch", **kwargs) -> "Reranker":
+        tokenizer, model = load_cross_encoder(model_path, backend)
+        return cls(tokenizer, model, **kwargs)
+
+    # --- 2. 推論 ---
+    def _forward(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        encoded = self.tokenizer(
+            [q for q, _ in pairs], [d for _, d in pairs], truncation=True, max_length=self.max_length
+        )
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        order = sorted(range(len(pairs)), key=lengths.__getitem__)
+
+        scores = [0.0] * len(pairs)
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                features = [{k: v[i] for k, v in encoded.items()} for i in idx]
+                batch = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+                logits = self.model(**batch).logits.view(-1).float()
+                for i, s in zip(idx, logits.tolist()):
+                    scores[i] = s
+        return scores
+
+    def score(self, query: str, docs: Sequence[str]) -> List[float]:
+        """回傳與 docs 對齊的分數"""
+        keys = [_pair_key(query, d) for d in docs]
+        scores: List[Optional[float]] = [None] * len(docs)
+        with self._lock:
+            for i, k in enumerate(keys):
+                if k in self._cache:
+                    self._cache.move_to_end(k)
+                    scores[i] = self._cache[k]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        self.hits += len(docs) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            fresh = self._forward([(query, docs[i]) for i in missing])
+            with self._lock:
+                for i, s in zip(missing, fresh):
+                    scores[i] = s
+                    self._cache[keys[i]] = s
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(self, query: str, docs: Sequence[str], top_n: int = 3) -> List[str]:
+        if not docs:
+            return []
+        scores = self.score(query, docs)
+        best = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_n]
+        return [docs[i] for i in best]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# --- 預設配置 ---
+MAX_CONCURRENCY = 4
+
+
+def run_grouped(
+    items: Sequence[T],
+    key_fn: Callable[[T], Hashable],
+    worker_fn: Callable[[T, list], R],
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> List[R]:
+    """
+    依 key_fn 分組執行：
+    - 同一組內依原順序逐一執行，worker_fn 會收到該組共用的 state 列表 (例如對話歷史)
+    - 不同組之間以執行緒池並行，最多 max_concurrency 組同時進行
+    - 回傳結果依 items 的原始順序排列
+    總耗時取決於最長的一組，而非總筆數
+    """
+    groups: Dict[Hashable, List[int]] = {}
+    for i, item in enumerate(items):
+        groups.setdefault(key_fn(item), []).append(i)
+
+    results: List[R] = [None] * len(items)
+
+    def run_group(indices: List[int]):
+        state: list = []
+        for i in indices:
+            results[i] = worker_fn(items[i], state)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        # 長的對話先開始，避免最後才排到最長的一組
+        ordered = sorted(groups.values(), key=len, reverse=True)
+        for fut in [pool.submit(run_group, idx) for idx in ordered]:
+            fut.result()
+    return results
@@ -0,0 +1,102 @@
+import re
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+# --- 1. 預設配置 (與 langchain_experimental SemanticChunker 相同) ---
+SENTENCE_SPLIT_REGEX = r"(?<=[.?!])\s+"
+BUFFER_SIZE = 1
+THRESHOLD_TYPES = ("percentile", "standard_deviation", "interquartile", "gradient")
+
+
+def combine_sentences(sentences: Sequence[str], buffer_size: int = BUFFER_SIZE) -> List[str]:
+    """每句前後各帶 buffer_size 句作為嵌入用的上下文"""
+    n = len(sentences)
+    return [
+        " ".join(sentences[max(0, i - buffer_size): min(n, i + 1 + buffer_size)])
+        for i in range(n)
+    ]
+
+
+def adjacent_cosine_distances(vectors: np.ndarray) -> np.ndarray:
+    """相鄰兩列的 cosine distance，向量化計算"""
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    unit = vectors / norms[:, None]
+    return 1.0 - np.einsum("ij,ij->i", unit[:-1], unit[1:])
+
+
+def breakpoint_indices(distances: np.ndarray, threshold_type: str, amount: float) -> np.ndarray:
+    if threshold_type == "percentile":
+        return np.flatnonzero(distances > np.percentile(distances, amount))
+    if threshold_type == "standard_deviation":
+        return np.flatnonzero(distances > distances.mean() + amount * distances.std())
+    if threshold_type == "interquartile":
+        q1, q3 = np.percentile(distances, [25, 75])
+        return np.flatnonzero(distances > distances.mean() + amount * (q3 - q1))
+    if threshold_type == "gradient":
+        gradient = np.gradient(distances, np.arange(len(distances)))
+        return np.flatnonzero(gradient > np.percentile(gradient, amount))
+    raise ValueError(f"未知的 threshold_type：{threshold_type}，可用：{THRESHOLD_TYPES}")
+
+
+class SemanticSplitter:
+    """
+    原生語義切塊，切點規則與 SemanticChunker 相同，但：
+    - 所有文字 (跨檔案) 的句子只呼叫一次 embed_fn，由 EmbeddingClient 分批並行並走快取
+    - 相鄰距離與門檻以 NumPy 向量化計算
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        threshold_type: str = "percentile",
+        threshold_amount: float = 95,
+        buffer_size: int = BUFFER_SIZE,
+        sentence_split_regex: str = SENTENCE_SPLIT_REGEX,
+    ):
+        if threshold_type not in THRESHOLD_TYPES:
+            raise ValueError(f"未知的 threshold_type：{threshold_type}，可用：{THRESHOLD_TYPES}")
+        self.embed_fn = embed_fn
+        self.threshold_type = threshold_type
+        self.threshold_amount = threshold_amount
+        self.buffer_size = buffer_size
+        self.sentence_split = re.compile(sentence_split_regex)
+
+    def _needs_embedding(self, sentences: List[str]) -> bool:
+        # 與 SemanticChunker 相同：句數太少時不切，直接原樣回傳
+        return len(sentences) > 2 or (len(sentences) == 2 and self.threshold_type != "gradient")
+
+    def split_many(self, texts: Sequence[str]) -> List[List[str]]:
+        """對每段文字各自切塊，回傳與 texts 對齊的切塊列表"""
+        per_text = [self.sentence_split.split(t) for t in texts]
+
+        # 收集所有需要嵌入的組合句，一次送出
+        combined, owners = [], []
+        for i, sentences in enumerate(per_text):
+            if self._needs_embedding(sentences):
+                combined.extend(combine_sentences(sentences, self.buffer_size))
+                owners.append((i, len(sentences)))
+        # 以 float64 計算，與 SemanticChunker 的門檻比較結果一致
+        vectors = np.asarray(self.embed_fn(combined), dtype=np.float64) if combined else None
+
+        results = [list(s) if not self._needs_embedding(s) else None for s in per_text]
+        offset = 0
+        for i, n in owners:
+            distances = adjacent_cosine_distances(vectors[offset:offset + n])
+            offset += n
+            results[i] = self._group(per_text[i], breakpoint_indices(distances, self.threshold_type, self.threshold_amount))
+        return results
+
+    @staticmethod
+    def _group(sentences: List[str], breakpoints: np.ndarray) -> List[str]:
+        chunks, start = [], 0
+        for b in breakpoints:
+            chunks.append(" ".join(sentences[start:b + 1]))
+            start = b + 1
+        if start < len(sentences):
+            chunks.append(" ".join(sentences[start:]))
+        return chunks
+
+    def split(self, text: str) -> List[str]:
+        return self.split_many([text])[0]
@@ -0,0 +1,59 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+class StageTimer:
+    """記錄各階段耗時 (秒)，同名階段會累加"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def summary(self) -> dict:
+        return {k: round(v, 3) for k, v in self.stages.items()}
+
+    def save(self, path):
+        with open(Path(path), "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+class LatencyTracker:
+    """記錄每次呼叫的延遲樣本 (毫秒)，輸出 p50 / p95，用於調整 top_k 等參數"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.samples.setdefault(name, []).append(elapsed)
+
+    def summary(self) -> dict:
+        out = {}
+        for name, values in self.samples.items():
+            arr = np.asarray(values)
+            out[name] = {
+                "count": len(values),
+                "mean_ms": round(float(arr.mean()), 2),
+                "p50_ms": round(float(np.percentile(arr, 50)), 2),
+                "p95_ms": round(float(np.percentile(arr, 95)), 2),
+            }
+        return out
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 與各腳本相同：把 repo 根目錄加入 sys.path，才能 import common.*
+sys.path.append(str(Path(__file__).resolve().parents[1]))
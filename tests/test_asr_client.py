@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from common.asr_client import AsrClient, AsrTimeout
+from common.asr_stub import start_stub
+
+
+@pytest.fixture
+def stub():
+    server = start_stub(port=0, delay=0.2)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def wavs(tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"clip_{i}.wav"
+        path.write_bytes(b"RIFF" + bytes(100 * (i + 1)))
+        paths.append(str(path))
+    return paths
+
+
+def fast_client(url, **kwargs):
+    return AsrClient(base_url=url, poll_initial=0.05, poll_max=0.1, **kwargs)
+
+
+def test_transcribe_many_keeps_order_and_contents(stub, wavs):
+    results = fast_client(stub.url, concurrency=3).transcribe_many(wavs)
+
+    assert [r["wav_path"] for r in results] == wavs
+    for r in results:
+        assert r["txt"].startswith("stub transcript")
+        assert r["txt"] in r["srt"]
+        assert "-->" in r["srt"]
+    assert len({r["task_id"] for r in results}) == len(wavs)
+    assert stub.stats()["tasks"] == len(wavs)
+
+
+def test_missing_file_returns_error_without_stopping_others(stub, wavs, tmp_path):
+    paths = [wavs[0], str(tmp_path / "missing.wav"), wavs[1]]
+    results = fast_client(stub.url).transcribe_many(paths)
+
+    assert results[1]["wav_path"] == paths[1]
+    assert "error" in results[1]
+    assert results[0]["txt"] and results[2]["txt"]
+
+
+def test_concurrency_cap(stub, wavs):
+    class CountingClient(AsrClient):
+        active = peak = 0
+
+        async def _transcribe(self, client, wav_path):
+            CountingClient.active += 1
+            CountingClient.peak = max(CountingClient.peak, CountingClient.active)
+            try:
+                return await super()._transcribe(client, wav_path)
+            finally:
+                CountingClient.active -= 1
+
+    client = CountingClient(base_url=stub.url, concurrency=2, poll_initial=0.05, poll_max=0.1)
+    results = client.transcribe_many(wavs)
+
+    assert all("error" not in r for r in results)
+    assert CountingClient.peak == 2
+
+
+def test_timeout_on_first_format_skips_the_rest(wavs):
+    server = start_stub(port=0, delay=60)
+    try:
+        client = fast_client(server.url, poll_timeout=0.3)
+        start = time.perf_counter()
+        with pytest.raises(AsrTimeout):
+            asyncio.run(client.atranscribe(wavs[0]))
+        seconds = time.perf_counter() - start
+        results = client.transcribe_many(wavs[:2])
+        polls = server.stats()["polls"]
+    finally:
+        server.shutdown()
+
+    assert seconds < 1.0
+    # 批次模式：逾時的音檔回報錯誤，不會被當成空白轉錄
+    assert [r["error"] for r in results] == ["timeout", "timeout"]
+    assert all("txt" not in r and r["task_id"] for r in results)
+    assert polls == client.polls
@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from common.bm25 import BM25Index, cjk_tokenize
+
+WORDS = ["台水", "水費", "停水", "公告", "電費", "帳單", "meter", "apply", "bill", "water", "power"]
+
+
+def sample_docs(n=200, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))) for _ in range(n)]
+
+
+QUERIES = ["水費 帳單", "停水公告", "water bill", "meter meter", "電費怎麼算", "unknown"]
+
+
+def test_cjk_tokenize():
+    assert cjk_tokenize("Water 水費單") == ["water", "水", "費", "單", "水費", "費單"]
+    assert cjk_tokenize("水費", ngrams=(2,)) == ["水費"]
+    assert cjk_tokenize("A-1, b2!") == ["a", "1", "b2"]
+
+
+def test_scores_match_bm25okapi():
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    docs = sample_docs()
+    expected = rank_bm25.BM25Okapi([cjk_tokenize(d) for d in docs])
+    index = BM25Index.build(docs)
+    for q in QUERIES:
+        np.testing.assert_allclose(index.scores(q), expected.get_scores(cjk_tokenize(q)), rtol=1e-4, atol=1e-4)
+
+
+def test_search_orders_by_score():
+    docs = sample_docs()
+    index = BM25Index.build(docs)
+    for q in QUERIES:
+        scores = index.scores(q)
+        hits = index.search(q, k=10)
+        assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+        assert all(s > 0 for _, s in hits)
+        if hits:
+            assert hits[0][1] == pytest.approx(float(scores.max()))
+    assert index.search("unknown") == []
+    assert BM25Index.build([]).search("水費") == []
+
+
+def test_save_load_and_cache(tmp_path):
+    docs = sample_docs(50)
+    index = BM25Index.build(docs)
+    index.save(tmp_path / "idx")
+    loaded = BM25Index.load(tmp_path / "idx")
+    for q in QUERIES:
+        assert loaded.search(q) == index.search(q)
+
+    first = BM25Index.load_or_build(docs, cache_dir=tmp_path / "cache", name="t")
+    second = BM25Index.load_or_build(docs, cache_dir=tmp_path / "cache", name="t")
+    assert isinstance(second.data, np.memmap)
+    assert second.search("水費") == first.search("水費")
+    # 文件內容改變時重建到另一個目錄
+    BM25Index.load_or_build(docs[:-1], cache_dir=tmp_path / "cache", name="t")
+    assert len(list((tmp_path / "cache").iterdir())) == 2
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from common.chunking import CJK_SEPARATORS, Chunker
+
+WORDS = ["台水", "水費", "停水", "公告", "apply", "meter", "帳單", "。", "\n", "\n\n", " "]
+
+
+def sample_text(n=3000, seed=0):
+    rng = random.Random(seed)
+    return "".join(rng.choice(WORDS) for _ in range(n))
+
+
+@pytest.mark.parametrize("size,overlap", [(100, 0), (200, 40), (400, 80)])
+@pytest.mark.parametrize("separators", [None, CJK_SEPARATORS])
+def test_recursive_matches_langchain(size, overlap, separators):
+    splitters = pytest.importorskip("langchain_text_splitters")
+    kwargs = {"separators": list(separators)} if separators else {}
+    expected = splitters.RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap, **kwargs)
+    chunker = Chunker("recursive", size=size, overlap=overlap, **({"separators": separators} if separators else {}))
+    for seed in range(3):
+        text = sample_text(seed=seed)
+        assert chunker.split(text) == expected.split_text(text)
+
+
+def test_fixed_and_sliding():
+    text = "abcdefghij"
+    assert Chunker("fixed", size=4).split(text) == ["abcd", "efgh", "ij"]
+    assert Chunker("sliding", size=4, overlap=2).split(text) == ["abcd", "cdef", "efgh", "ghij"]
+    # 最後一塊已被前一塊涵蓋時不再產生
+    assert Chunker("sliding", size=5, overlap=2).split("abcdefgh") == ["abcde", "defgh"]
+
+
+def test_spans_are_offsets_into_the_text():
+    text = sample_text(500)
+    for strategy in ("fixed", "sliding", "recursive", "sentence"):
+        chunker = Chunker(strategy, size=50, overlap=10 if strategy != "fixed" else 0)
+        for s, e in chunker.spans(text):
+            assert 0 <= s < e <= len(text)
+
+
+def test_sentence_merges_up_to_size():
+    text = "第一句。第二句比較長一點！第三句？"
+    assert Chunker("sentence", size=100).split(text) == [text]
+    assert Chunker("sentence", size=8).split(text) == ["第一句。", "第二句比較長一點！", "第三句？"]
+
+
+def test_iter_file_matches_in_memory(tmp_path):
+    text = sample_text(5000)
+    path = tmp_path / "doc.txt"
+    path.write_text(text, encoding="utf-8")
+    for chunker in (Chunker("fixed", size=64), Chunker("sliding", size=64, overlap=16)):
+        # 區塊小於檔案且不對齊 UTF-8 字元邊界，驗證增量解碼與跨區塊銜接
+        streamed = [(s, e, c) for s, e, c in chunker.iter_file(path, block_bytes=1000)]
+        assert [c for _, _, c in streamed] == chunker.split(text)
+        assert all(text[s:e] == c for s, e, c in streamed)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        Chunker("unknown")
+    with pytest.raises(ValueError):
+        Chunker("sliding", size=10, overlap=10)
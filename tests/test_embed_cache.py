@@ -0,0 +1,107 @@
+import numpy as np
+
+from common.embed_cache import EmbeddingCache, make_key
+
+
+def vec(i, dim=4):
+    return [float(i)] * dim
+
+
+def test_roundtrip_and_persistence(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    keys = [make_key("m", True, None, f"text {i}") for i in range(3)]
+    cache.put_many({k: vec(i) for i, k in enumerate(keys)})
+    assert cache.get_many(keys + ["missing"]) == {k: vec(i) for i, k in enumerate(keys)}
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+    cache.flush()
+
+    reopened = EmbeddingCache(tmp_path)
+    assert reopened.get_many(keys) == {k: vec(i) for i, k in enumerate(keys)}
+
+
+def test_lru_eviction_reuses_slot(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=2)
+    cache.put_many({"a": vec(1), "b": vec(2)})
+    cache.get_many(["a"])
+    cache.put_many({"c": vec(3)})
+    assert cache.get_many(["a", "b", "c"]) == {"a": vec(1), "c": vec(3)}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_slot_reused_before_flush_is_not_served(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=2)
+    cache.put_many({"a": vec(1), "b": vec(2)})
+    cache.flush()
+    # 淘汰 a 並沿用其 slot，但 index.json 尚未寫回 (模擬程式中斷)
+    cache.put_many({"c": vec(3)})
+    cache._vectors.flush()
+    cache._keys.flush()
+
+    reopened = EmbeddingCache(tmp_path, max_entries=10)
+    assert reopened.get_many(["a", "b"]) == {"b": vec(2)}
+    # 新資料使用新的 slot，不覆寫仍有效的 b，也不覆寫屬於 c 的 slot
+    reopened.put_many({"d": vec(4)})
+    assert reopened.get_many(["b", "d"]) == {"b": vec(2), "d": vec(4)}
+    assert reopened._index["d"] == 2
+
+
+def test_cleared_cache_reuse_detected_on_read(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many({"a": vec(1), "b": vec(2)})
+    cache.flush()
+    cache.clear()
+    cache.put_many({"c": vec(3)})  # 沿用 a 的 slot 0
+    cache._vectors.flush()
+    cache._keys.flush()
+
+    stale = EmbeddingCache(tmp_path)
+    assert stale.get_many(["a", "b"]) == {"b": vec(2)}
+    assert len(stale) == 1
+
+
+def test_legacy_cache_without_key_hashes_is_rebuilt(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many({"a": vec(1)})
+    cache.flush()
+    (tmp_path / "keys.u8").unlink()
+
+    reopened = EmbeddingCache(tmp_path)
+    assert reopened.get_many(["a"]) == {}
+    reopened.put_many({"a": vec(5)})
+    assert np.allclose(reopened.get_many(["a"])["a"], vec(5))
+
+
+def test_mismatched_slot_is_not_reclaimed(tmp_path):
+    # 兩個行程共用快取目錄：第二個行程重用了第一個行程仍在索引中的 slot
+    first = EmbeddingCache(tmp_path)
+    first.put_many({"a": vec(1)})
+    first.flush()
+    second = EmbeddingCache(tmp_path)
+    second.clear()
+    second.put_many({"b": vec(2)})  # 寫入 slot 0
+    second._vectors.flush()
+    second._keys.flush()
+
+    assert first.get_many(["a"]) == {}
+    first.put_many({"c": vec(3)})
+    assert first._index["c"] != 0
+    assert second.get_many(["b"]) == {"b": vec(2)}
+
+
+def test_missing_vector_file_is_a_cold_start(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    cache.put_many({"a": vec(1)})
+    cache.flush()
+    (tmp_path / "vectors.f32").unlink()
+
+    reopened = EmbeddingCache(tmp_path)
+    assert len(reopened) == 0 and reopened.get_many(["a"]) == {}
+    reopened.put_many({"a": vec(5, dim=3)})
+    assert reopened.get_many(["a"]) == {"a": vec(5, dim=3)}
+
+
+def test_full_cache_evicts_instead_of_growing(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=3)
+    cache.put_many({k: vec(i) for i, k in enumerate("abcde")})
+    assert len(cache) == 3 and cache._capacity == 3
+    assert cache.get_many(list("abcde")) == {"c": vec(2), "d": vec(3), "e": vec(4)}
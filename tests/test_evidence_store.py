@@ -0,0 +1,64 @@
+import threading
+import zlib
+
+import numpy as np
+
+from common.evidence_store import EvidenceStore, estimate_tokens, split_facts
+
+
+def fake_embed(texts):
+    """依字元雜湊的確定性向量 (不需網路)"""
+    out = []
+    for t in texts:
+        v = np.zeros(64)
+        for ch in t:
+            v[zlib.crc32(ch.encode()) % 64] += 1.0
+        out.append(v.tolist())
+    return out
+
+
+def facts(prefix, n):
+    return "\n".join(f"- {prefix} 第 {i} 項事實：水費每度 {i} 元。" for i in range(n))
+
+
+def test_split_and_dedup():
+    assert split_facts("- 第一項事實內容。\n短\n第二項事實內容！") == ["第一項事實內容。", "第二項事實內容！"]
+    store = EvidenceStore(fake_embed)
+    assert store.add("a", "台水水費每兩個月計收一次。") == 1
+    assert store.add("b", "台水水費每兩個月計收一次。\n停水公告提前一天發布。") == 1
+    assert store.stats() == {"sources": 2, "facts": 2, "duplicates": 1}
+    assert "停水公告" in store.view(1000)
+    assert "省略" in store.view(estimate_tokens(store.view(1000)) // 2)
+
+
+def test_compress_failure_keeps_pending_facts():
+    def fail(text):
+        raise RuntimeError("llm down")
+
+    store = EvidenceStore(fake_embed, compress=fail, source_budget=20)
+    store.add("a", facts("A", 5))
+    assert store.sources["a"]["summary"] == ""
+    assert len(store.sources["a"]["pending"]) == 5
+    assert "A 第 4 項" in store.view(1000)
+
+
+def test_facts_stay_visible_while_compressing():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_compress(text):
+        started.set()
+        release.wait(5)
+        return "壓縮後的摘要"
+
+    store = EvidenceStore(fake_embed, compress=slow_compress, source_budget=20)
+    worker = threading.Thread(target=store.add, args=("a", facts("A", 5)))
+    worker.start()
+    started.wait(5)
+    # 壓縮進行中：原事實仍可見，新加入的事實不會被覆蓋
+    assert "A 第 4 項" in store.view(1000)
+    store.add("a", "壓縮期間新增的一項事實。")
+    release.set()
+    worker.join()
+
+    assert store.sources["a"]["summary"] == "壓縮後的摘要"
+    assert store.sources["a"]["pending"] == ["壓縮期間新增的一項事實。"]
@@ -0,0 +1,36 @@
+import pytest
+
+from common.fusion import reciprocal_rank_fusion, weighted_score_fusion
+
+DENSE = [("a", 0.9), ("b", 0.8), ("c", 0.1)]
+SPARSE = [("c", 12.0), ("a", 7.0), ("d", 1.0)]
+
+
+def test_rrf_uses_ranks_only():
+    fused = dict(reciprocal_rank_fusion([DENSE, SPARSE], k=60))
+    assert fused["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fused["c"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused["d"] == pytest.approx(1 / 63)
+    # 分數尺度不影響結果
+    scaled = [[(d, s * 1000) for d, s in DENSE], SPARSE]
+    assert reciprocal_rank_fusion(scaled) == reciprocal_rank_fusion([DENSE, SPARSE])
+
+
+def test_rrf_weights_and_limit():
+    fused = reciprocal_rank_fusion([DENSE, SPARSE], weights=[0.0, 1.0], limit=2)
+    assert [d for d, _ in fused] == ["c", "a"]
+    assert [d for d, _ in reciprocal_rank_fusion([DENSE, SPARSE])] == ["a", "c", "b", "d"]
+
+
+def test_weighted_score_fusion_normalizes():
+    fused = dict(weighted_score_fusion([DENSE, SPARSE]))
+    assert fused["a"] == pytest.approx(1.0 + 6 / 11)
+    assert fused["b"] == pytest.approx(0.7 / 0.8)
+    assert fused["c"] == pytest.approx(1.0)
+    assert fused["d"] == pytest.approx(0.0)
+    assert [d for d, _ in weighted_score_fusion([DENSE, SPARSE], weights=[1.0, 0.0], limit=1)] == ["a"]
+
+
+def test_empty_and_constant_rankings():
+    assert reciprocal_rank_fusion([]) == []
+    assert weighted_score_fusion([[], [("x", 3.0), ("y", 3.0)]]) == [("x", 0.0), ("y", 0.0)]
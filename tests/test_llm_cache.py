@@ -0,0 +1,192 @@
+import threading
+import time
+
+import pytest
+
+from common.llm_cache import CachedChatModel, LLMCache, cached_chat_completion, make_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(tmp_path / "llm.sqlite")
+
+
+def test_make_key_depends_on_every_part():
+    messages = [{"role": "user", "content": "hi"}]
+    base = make_key("http://a", "m", messages, {"temperature": 0})
+    assert base == make_key("http://a", "m", [dict(m) for m in messages], {"temperature": 0})
+    assert base != make_key("http://b", "m", messages, {"temperature": 0})
+    assert base != make_key("http://a", "n", messages, {"temperature": 0})
+    assert base != make_key("http://a", "m", [{"role": "user", "content": "hello"}], {"temperature": 0})
+    assert base != make_key("http://a", "m", messages, {"temperature": 1})
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite", ttl=0.2, max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"  # a 變成最近使用
+    cache.put("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and cache.get("c") == "3"
+    time.sleep(0.25)
+    assert cache.get("a") is None
+    # 重新開啟仍讀得到持久化的資料
+    cache.put("d", "4")
+    assert LLMCache(tmp_path / "llm.sqlite").get("d") == "4"
+
+
+def test_get_or_compute_coalesces_concurrent_misses(cache):
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["value"] * 5 and len(calls) == 1
+    assert cache.get_or_compute("k", compute) == "value" and len(calls) == 1
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] + stats["coalesced"] == 5
+
+
+def test_compute_error_is_not_cached(cache):
+    def fail():
+        raise RuntimeError("upstream")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", fail)
+    assert cache.get("k") is None
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+class FakeChat:
+    """只記錄呼叫的假 ChatOpenAI"""
+
+    openai_api_base = "http://fake"
+    model_name = "fake"
+    temperature = 0.0
+    max_tokens = None
+    top_p = None
+
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, input_, *args, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        self.calls.append((input_, kwargs))
+        tool_calls = [{"name": "lookup", "args": {"q": "水費"}, "id": "call_1"}] if "tools" in kwargs else []
+        return AIMessage(content=f"answer {len(self.calls)}", tool_calls=tool_calls,
+                         response_metadata={"finish_reason": "stop"})
+
+
+def test_cached_chat_model_normalizes_input(cache):
+    pytest.importorskip("langchain_core")
+    from langchain_core.messages import HumanMessage
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = FakeChat()
+    model = CachedChatModel(llm, cache)
+    prompt = ChatPromptTemplate.from_messages([("human", "{q}")]).invoke({"q": "水費怎麼算"})
+
+    first = model.invoke("水費怎麼算")
+    # 字串、PromptValue、訊息物件、dict、tuple 都是同一個請求
+    for same in (prompt, [HumanMessage(content="水費怎麼算")],
+                 [{"role": "user", "content": "水費怎麼算"}], [("human", "水費怎麼算")]):
+        assert model.invoke(same).content == first.content
+    assert len(llm.calls) == 1
+
+    model.invoke("停水公告")
+    assert len(llm.calls) == 2
+
+
+def test_cached_chat_model_keys_on_invoke_kwargs(cache):
+    pytest.importorskip("langchain_core")
+    llm = FakeChat()
+    model = CachedChatModel(llm, cache)
+
+    model.invoke("hi")
+    model.invoke("hi", stop=["\n"])
+    model.invoke("hi", temperature=0.7)
+    assert len(llm.calls) == 3
+    # config (tags、callbacks) 不列入快取鍵
+    model.invoke("hi", temperature=0.7, config={"tags": ["x"]})
+    assert model.invoke("hi", stop=["\n"]).content == "answer 2"
+    assert len(llm.calls) == 3
+
+
+def test_cached_chat_model_restores_full_message(cache):
+    pytest.importorskip("langchain_core")
+    llm = FakeChat()
+    model = CachedChatModel(llm, cache)
+
+    for _ in range(2):
+        msg = model.invoke("hi", tools=["lookup"])
+        assert msg.tool_calls[0]["name"] == "lookup" and msg.tool_calls[0]["args"] == {"q": "水費"}
+        assert msg.response_metadata == {"finish_reason": "stop"}
+    assert len(llm.calls) == 1
+
+
+def test_bind_keeps_the_cache(cache):
+    pytest.importorskip("langchain_core")
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    llm = FakeListChatModel(responses=["a", "b", "c"])
+    model = CachedChatModel(llm, cache)
+    stop_x, stop_y = model.bind(stop=["x"]), model.bind(stop=["y"])
+    assert isinstance(stop_x, CachedChatModel)
+    assert [stop_x.invoke("hi").content, stop_y.invoke("hi").content, stop_x.invoke("hi").content] == ["a", "b", "a"]
+    with pytest.warns(UserWarning):
+        model.stream
+
+
+class FakeResponse:
+    def __init__(self, body):
+        import json
+
+        self.text = json.dumps(body)
+        self._body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, *bodies):
+        self.bodies = list(bodies)
+
+    def post(self, url, json=None, timeout=None):
+        return FakeResponse(self.bodies.pop(0))
+
+
+def test_chat_completion_error_envelope_is_not_cached(cache):
+    ok = {"choices": [{"message": {"role": "assistant", "content": "答案"}}]}
+    session = FakeSession({"error": {"message": "overloaded"}}, ok)
+    payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+    with pytest.raises(RuntimeError):
+        cached_chat_completion(session, "http://fake", payload, cache)
+    assert cached_chat_completion(session, "http://fake", payload, cache) == ok
+    assert cached_chat_completion(session, "http://fake", payload, cache) == ok  # 命中快取
+
+
+def test_plain_content_entries_still_load(cache):
+    pytest.importorskip("langchain_core")
+    llm = FakeChat()
+    model = CachedChatModel(llm, cache)
+    cache.put(model._key("hi", {}), "舊格式的純文字回答")
+    assert model.invoke("hi").content == "舊格式的純文字回答"
+    assert llm.calls == []
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient, models
+
+from common.local_store import LocalVectorStore
+
+DIM = 8
+DISTANCES = [models.Distance.COSINE, models.Distance.DOT, models.Distance.EUCLID]
+TOPICS = ["water", "power", "gas"]
+
+
+def make_points(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    return [
+        models.PointStruct(id=i, vector=vectors[i].tolist(), payload={"topic": TOPICS[i % 3], "n": i})
+        for i in range(n)
+    ]
+
+
+def queries(k=5, seed=1):
+    return np.random.default_rng(seed).normal(size=(k, DIM)).astype(np.float32)
+
+
+def both(distance, points):
+    """同一份資料分別寫入 Qdrant (in-memory) 與本機後端"""
+    clients = [QdrantClient(":memory:"), LocalVectorStore()]
+    for c in clients:
+        c.create_collection("t", vectors_config=models.VectorParams(size=DIM, distance=distance))
+        c.upsert("t", points=points)
+    return clients
+
+
+def assert_same(expected, actual):
+    assert [p.id for p in actual.points] == [p.id for p in expected.points]
+    np.testing.assert_allclose([p.score for p in actual.points], [p.score for p in expected.points], rtol=1e-4, atol=1e-4)
+    assert [p.payload for p in actual.points] == [p.payload for p in expected.points]
+
+
+@pytest.mark.parametrize("distance", DISTANCES)
+def test_query_points_matches_qdrant(distance):
+    qdrant, local = both(distance, make_points())
+    for q in queries():
+        assert_same(qdrant.query_points("t", query=q.tolist(), limit=7), local.query_points("t", query=q.tolist(), limit=7))
+
+
+@pytest.mark.parametrize("distance", DISTANCES)
+def test_filter_matches_qdrant(distance):
+    qdrant, local = both(distance, make_points())
+    flt = models.Filter(
+        must=[models.FieldCondition(key="topic", match=models.MatchAny(any=["water", "gas"]))],
+        must_not=[models.FieldCondition(key="n", match=models.MatchValue(value=0))],
+    )
+    for q in queries():
+        expected = qdrant.query_points("t", query=q.tolist(), query_filter=flt, limit=5)
+        actual = local.query_points("t", query=q.tolist(), query_filter=flt, limit=5)
+        assert_same(expected, actual)
+        assert all(p.payload["topic"] != "power" and p.id != 0 for p in actual.points)
+
+
+def test_batch_named_vectors_and_delete():
+    points = make_points()
+    config = {"cos": models.VectorParams(size=DIM, distance=models.Distance.COSINE),
+              "dot": models.VectorParams(size=DIM, distance=models.Distance.DOT)}
+    named = [models.PointStruct(id=p.id, vector={"cos": p.vector, "dot": p.vector}, payload=p.payload) for p in points]
+    clients = [QdrantClient(":memory:"), LocalVectorStore()]
+    for c in clients:
+        c.create_collection("t", vectors_config=config)
+        c.upsert("t", points=named)
+        c.delete("t", points_selector=models.PointIdsList(points=[1, 2, 3]))
+
+    requests = [models.QueryRequest(query=q.tolist(), using=using, limit=4, with_payload=True)
+                for q in queries() for using in ("cos", "dot")]
+    qdrant, local = clients
+    for expected, actual in zip(qdrant.query_batch_points("t", requests=requests),
+                                local.query_batch_points("t", requests=requests)):
+        assert_same(expected, actual)
+    assert local.count("t").count == qdrant.count("t").count == len(points) - 3
+
+
+def test_save_and_reload(tmp_path):
+    store = LocalVectorStore(path=tmp_path)
+    store.create_collection("t", vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    store.upsert("t", points=make_points())
+    q = queries(1)[0].tolist()
+    before = store.query_points("t", query=q, limit=5)
+    store.save()
+
+    reloaded = LocalVectorStore(path=tmp_path)
+    assert_same(before, reloaded.query_points("t", query=q, limit=5))
+    # 載入後 (memory-map) 仍可寫入
+    reloaded.upsert("t", points=[models.PointStruct(id=999, vector=q, payload={"topic": "new"})])
+    assert reloaded.query_points("t", query=q, limit=1).points[0].id == 999
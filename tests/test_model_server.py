@@ -0,0 +1,50 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+pytest.importorskip("requests")
+
+from common import model_registry, model_server
+
+
+class FakeSentenceTransformer:
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=None):
+        vectors = np.array([[len(t), 1.0, 2.0] for t in texts], dtype=np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    fake = FakeSentenceTransformer()
+    monkeypatch.setattr(model_registry, "lazy_sentence_transformer", lambda name: fake)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), model_server._Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield model_server.encoder("fake", url=url), fake
+    server.shutdown()
+    server.server_close()
+
+
+def test_remote_encoder_matches_local(remote):
+    encoder, fake = remote
+    assert isinstance(encoder, model_server.RemoteEncoder)
+    texts = ["水費", "停水公告怎麼查"]
+    for normalize in (False, True):
+        expected = fake.encode(texts, normalize_embeddings=normalize)
+        actual = encoder.encode(texts, batch_size=8, convert_to_numpy=True,
+                                normalize_embeddings=normalize, show_progress_bar=False)
+        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+    np.testing.assert_allclose(encoder.encode("水費"), fake.encode(["水費"])[0])
+
+
+def test_remote_encoder_rejects_unsupported_kwargs(remote):
+    encoder, _ = remote
+    with pytest.raises(TypeError):
+        encoder.encode(["a"], precision="int8")
+    with pytest.raises(TypeError):
+        encoder.encode(["a"], convert_to_numpy=False)
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from common.scheduler import run_grouped
+
+
+def test_results_in_input_order_and_groups_sequential():
+    items = [("a", 1), ("b", 1), ("a", 2), ("c", 1), ("b", 2), ("a", 3)]
+
+    def worker(item, history):
+        cid, turn = item
+        history.append(turn)
+        return cid, list(history)
+
+    results = run_grouped(items, key_fn=lambda it: it[0], worker_fn=worker, max_concurrency=3)
+    assert [r[0] for r in results] == [cid for cid, _ in items]
+    # 同一組依原順序執行，且共用同一份 state
+    assert results[0] == ("a", [1]) and results[2] == ("a", [1, 2]) and results[5] == ("a", [1, 2, 3])
+    assert results[4] == ("b", [1, 2])
+
+
+def test_groups_run_concurrently_up_to_the_cap():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def worker(item, state):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return item
+
+    items = [(g, i) for g in range(6) for i in range(2)]
+    start = time.perf_counter()
+    run_grouped(items, key_fn=lambda it: it[0], worker_fn=worker, max_concurrency=3)
+    seconds = time.perf_counter() - start
+    assert peak[0] == 3
+    assert seconds < 0.05 * len(items) * 0.75
+
+
+def test_worker_exception_propagates():
+    def worker(item, state):
+        raise RuntimeError("boom")
+
+    try:
+        run_grouped([1], key_fn=lambda it: it, worker_fn=worker)
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("expected RuntimeError")
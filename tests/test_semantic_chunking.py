@@ -0,0 +1,59 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from common.semantic_chunking import THRESHOLD_TYPES, SemanticSplitter
+
+TEXTS = [
+    "Water bills are due monthly. Late fees apply after ten days. The meter is read every two months. "
+    "Power outages are announced a day early! Crews restore lines quickly. Gas leaks must be reported at once? "
+    "Call the hotline for help. Water quality reports are published yearly.",
+    "Short text.",
+    "Two sentences here. And the second one.",
+]
+
+
+def fake_embed(texts):
+    """依字詞雜湊的確定性向量 (不需網路)"""
+    out = []
+    for t in texts:
+        v = np.zeros(64)
+        for w in t.lower().split():
+            v[zlib.crc32(w.encode()) % 64] += 1.0
+        out.append(v.tolist())
+    return out
+
+
+@pytest.mark.parametrize("threshold_type", THRESHOLD_TYPES)
+def test_matches_semantic_chunker(threshold_type):
+    experimental = pytest.importorskip("langchain_experimental.text_splitter")
+    from langchain_core.embeddings import Embeddings
+
+    class FakeEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            return fake_embed(texts)
+
+        def embed_query(self, text):
+            return fake_embed([text])[0]
+
+    expected = experimental.SemanticChunker(FakeEmbeddings(), breakpoint_threshold_type=threshold_type)
+    splitter = SemanticSplitter(fake_embed, threshold_type=threshold_type,
+                                threshold_amount=expected.breakpoint_threshold_amount)
+    assert splitter.split_many(TEXTS) == [expected.split_text(t) for t in TEXTS]
+
+
+def test_split_many_embeds_once():
+    calls = []
+
+    def counting_embed(texts):
+        calls.append(len(texts))
+        return fake_embed(texts)
+
+    SemanticSplitter(counting_embed).split_many(TEXTS)
+    assert len(calls) == 1
+
+
+def test_unknown_threshold_type():
+    with pytest.raises(ValueError):
+        SemanticSplitter(fake_embed, threshold_type="median")